@@ -0,0 +1,210 @@
+# api/routes.py
+# JSON API（/api/v1）：清單以游標分頁，欄位可用 ?fields= 指定
+from datetime import datetime
+
+from flask import Response, current_app, jsonify, request, abort, stream_with_context
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+from . import api_bp
+from .serializers import (
+    RECIPE_FIELDS, RECIPE_LIST_DEFAULT, REVIEW_FIELDS,
+    parse_fields, recipe_query, serialize_recipes, review_query, serialize_reviews,
+)
+from extensions import db
+from models import Recipe, Category, Ingredient, Review
+from pagination import keyset_page, RECENT, Sort
+from recipes import catalog, facets
+from recipes.filters import apply_filters
+import autocomplete
+import search
+import shopping
+
+MAX_LIMIT = 100
+REVIEWS_NEWEST = Sort(columns=(Review.id,), attrs=("id",), parsers=(int,))
+
+
+@api_bp.errorhandler(HTTPException)
+def _json_error(e):
+    return jsonify(error=e.description), e.code
+
+
+def _fields(allowed, default):
+    try:
+        return parse_fields(request.args.get("fields"), allowed, default)
+    except ValueError as exc:
+        abort(400, str(exc))
+
+
+def _limit():
+    limit = request.args.get("limit", 24, type=int)
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _page_payload(page, data):
+    return jsonify(data=data, next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
+
+
+# =========================
+# 食譜
+# =========================
+@api_bp.route("/recipes")
+def recipes():
+    fields = _fields(RECIPE_FIELDS, RECIPE_LIST_DEFAULT)
+
+    # 批次取得：?ids=1,2,3（依傳入順序回傳，不存在的略過）
+    raw_ids = request.args.get("ids")
+    if raw_ids:
+        try:
+            ids = list(dict.fromkeys(int(i) for i in raw_ids.split(",") if i.strip()))
+        except ValueError:
+            abort(400, "ids must be comma-separated integers")
+        if len(ids) > MAX_LIMIT:
+            abort(400, f"at most {MAX_LIMIT} ids per request")
+        rows = {row.id: row for row in recipe_query(fields).filter(Recipe.id.in_(ids))}
+        ordered = [rows[i] for i in ids if i in rows]
+        return jsonify(data=serialize_recipes(ordered, fields))
+
+    query = apply_filters(
+        recipe_query(fields),
+        category_id=request.args.get("category_id", type=int),
+        allergen_ids=request.args.getlist("allergen_id", type=int),
+        cook_time=request.args.get("cook_time"),
+    )
+    sort = RECENT
+    q = (request.args.get("q") or "").strip()
+    if q:
+        query, score = search.match(query, q)
+        if score is not None:
+            query = query.add_columns(score.label("search_rank"))
+            sort = search.relevance_sort(score)
+
+    page = keyset_page(
+        query,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=_limit(),
+        sort=sort,
+    )
+    return _page_payload(page, serialize_recipes(page.items, fields))
+
+
+@api_bp.route("/recipes/facets")
+def recipe_facets():
+    """與 /recipes 相同的篩選參數，回傳各分類、各過敏原（排除後）與各烹調時間區間的食譜數。"""
+    allergens = [
+        dict(id=aid, bit=bit) for aid, bit in
+        db.session.query(Ingredient.id, Ingredient.allergen_bit).filter_by(is_allergen=True)
+    ]
+    counts = facets.get(
+        (request.args.get("q") or "").strip(),
+        request.args.get("category_id", type=int),
+        request.args.getlist("allergen_id", type=int),
+        request.args.get("cook_time"),
+        allergens,
+    )
+    return jsonify(data=dict(
+        total=counts.total,
+        categories=[dict(id=cid, count=n) for cid, n in counts.categories.items()],
+        allergens=[dict(id=aid, without_count=n) for aid, n in counts.allergens.items()],
+        cook_time=[dict(key=key, count=n) for key, n in counts.cook_time.items()],
+    ))
+
+
+@api_bp.route("/recipes/<int:rid>")
+def recipe(rid: int):
+    fields = _fields(RECIPE_FIELDS, RECIPE_FIELDS)
+    row = recipe_query(fields).filter(Recipe.id == rid).first()
+    if row is None:
+        abort(404, "recipe not found")
+    return jsonify(data=serialize_recipes([row], fields)[0])
+
+
+@api_bp.route("/recipes/<int:rid>/reviews")
+def recipe_reviews(rid: int):
+    fields = _fields(REVIEW_FIELDS, REVIEW_FIELDS)
+    if db.session.query(Recipe.id).filter(Recipe.id == rid).scalar() is None:
+        abort(404, "recipe not found")
+    page = keyset_page(
+        review_query(fields).filter(Review.recipe_id == rid),
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=_limit(),
+        sort=REVIEWS_NEWEST,
+    )
+    return _page_payload(page, serialize_reviews(page.items, fields))
+
+
+# =========================
+# 分類 / 過敏原
+# =========================
+@api_bp.route("/categories")
+def categories():
+    rows = (
+        db.session.query(Category.id, Category.name, db.func.count(Recipe.id))
+        .outerjoin(Recipe, Recipe.cate_id == Category.id)
+        .group_by(Category.id, Category.name)
+        .order_by(Category.id)
+    )
+    return jsonify(data=[{"id": cid, "name": name, "recipe_count": n} for cid, name, n in rows])
+
+
+@api_bp.route("/allergens")
+def allergens():
+    rows = (
+        db.session.query(Ingredient.id, Ingredient.name)
+        .filter(Ingredient.is_allergen.is_(True))
+        .order_by(Ingredient.id)
+    )
+    return jsonify(data=[{"id": iid, "name": name} for iid, name in rows])
+
+
+# =========================
+# 名稱自動完成：/autocomplete/ingredients?q=醬&limit=10（依使用次數排序）
+# =========================
+@api_bp.route("/autocomplete/<kind>")
+def autocomplete_names(kind: str):
+    index = autocomplete.indexes.get(kind)
+    if index is None:
+        abort(404, f"kind must be one of {', '.join(autocomplete.indexes)}")
+    limit = max(1, min(request.args.get("limit", 10, type=int), autocomplete.MAX_RESULTS))
+    suggestions = index.suggest(request.args.get("q", ""), limit)
+    return jsonify(data=[s._asdict() for s in suggestions])
+
+
+# =========================
+# 購物清單：?recipes=12:2,15:0.5,18（食譜 id:份量倍數）
+# =========================
+@api_bp.route("/shopping-list")
+def shopping_list():
+    try:
+        plan = shopping.parse_plan(request.args.get("recipes"))
+    except ValueError as exc:
+        abort(400, f"recipes must look like 12:2,15:0.5,18 ({exc})")
+    if not plan:
+        abort(400, "recipes is required")
+
+    found = {rid for (rid,) in db.session.query(Recipe.id).filter(Recipe.id.in_(list(plan)))}
+    items = shopping.shopping_list({rid: m for rid, m in plan.items() if rid in found})
+    return jsonify(
+        data=[item._asdict() for item in items],
+        recipes=[{"id": rid, "multiplier": m} for rid, m in plan.items() if rid in found],
+        missing_recipes=[rid for rid in plan if rid not in found],
+    )
+
+
+# =========================
+# 匯出整個目錄（JSONL 串流，限 ADMIN_USERNAMES）：?after_id= 接續中斷的下載
+# =========================
+@api_bp.route("/export.jsonl")
+def export_catalog():
+    if not (current_user.is_authenticated and current_user.username in current_app.config.get("ADMIN_USERNAMES", ())):
+        abort(404)  # 不透露端點存在
+    after_id = request.args.get("after_id", 0, type=int)
+    filename = f"recipes-{datetime.utcnow():%Y%m%d}.jsonl"
+    # 串流期間 session 與伺服器端游標都要保持開啟，由 stream_with_context 維持請求 context
+    return Response(
+        stream_with_context(catalog.export_lines(after_id=after_id)),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,131 @@
+# api/serializers.py
+# 以欄位為單位組查詢，不載入 ORM 物件；支援 ?fields= 只取需要的欄位
+from extensions import db
+from models import Recipe, Category, User, Ingredient, Need, CookInstruction, Review
+
+# 欄位名稱 → 需要 SELECT 的欄位（以 label 命名，直接從 Row 取值）
+RECIPE_COLUMNS = {
+    "id": (Recipe.id.label("id"),),
+    "name": (Recipe.name.label("name"),),
+    "description": (Recipe.description.label("description"),),
+    "cook_time_min": (Recipe.cook_time_min.label("cook_time_min"),),
+    "image_url": (Recipe.image_url.label("image_url"),),
+    "created_at": (Recipe.created_at.label("created_at"),),
+    "updated_at": (Recipe.updated_at.label("updated_at"),),
+    "category": (Category.id.label("category_id"), Category.name.label("category_name")),
+    "author": (User.username.label("author_username"),),
+    "rating": (Recipe.review_count.label("review_count"), Recipe.rating_sum.label("rating_sum")),
+}
+# 一對多欄位：整頁的食譜以一次 IN 查詢補上
+RECIPE_COLLECTIONS = ("needs", "steps")
+
+RECIPE_FIELDS = tuple(RECIPE_COLUMNS) + RECIPE_COLLECTIONS
+RECIPE_LIST_DEFAULT = ("id", "name", "description", "cook_time_min", "image_url", "created_at", "category", "rating")
+
+REVIEW_COLUMNS = {
+    "id": (Review.id.label("id"),),
+    "rating": (Review.rating.label("rating"),),
+    "comment": (Review.comment.label("comment"),),
+    "user": (User.username.label("username"),),
+}
+REVIEW_FIELDS = tuple(REVIEW_COLUMNS)
+
+
+def parse_fields(raw, allowed, default) -> tuple:
+    """`?fields=a,b,c` → ('a', 'b', 'c')；不認得的欄位丟 ValueError。"""
+    if not raw:
+        return tuple(default)
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def recipe_query(fields):
+    """只 SELECT 需要的欄位；id 與 created_at 永遠包含（游標分頁用）。"""
+    columns = [Recipe.id.label("id"), Recipe.created_at.label("created_at")]
+    for f in fields:
+        if f in RECIPE_COLUMNS and f not in ("id", "created_at"):
+            columns.extend(RECIPE_COLUMNS[f])
+    query = db.session.query(*columns).select_from(Recipe)
+    if "category" in fields:
+        query = query.join(Category, Category.id == Recipe.cate_id)
+    if "author" in fields:
+        query = query.join(User, User.id == Recipe.user_id)
+    return query
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _recipe_scalars(row, fields) -> dict:
+    out = {}
+    for f in fields:
+        if f in ("created_at", "updated_at"):
+            out[f] = _iso(getattr(row, f))
+        elif f == "category":
+            out[f] = {"id": row.category_id, "name": row.category_name}
+        elif f == "author":
+            out[f] = {"username": row.author_username}
+        elif f == "rating":
+            count = row.review_count
+            out[f] = {"count": count, "average": round(row.rating_sum / count, 2) if count else 0.0}
+        elif f in RECIPE_COLUMNS:
+            out[f] = getattr(row, f)
+    return out
+
+
+def serialize_recipes(rows, fields) -> list:
+    data = [_recipe_scalars(row, fields) for row in rows]
+    ids = [row.id for row in rows]
+    if not ids:
+        return data
+
+    if "needs" in fields:
+        needs = {}
+        for rid, iid, name, qty, unit in (
+            db.session.query(Need.recipe_id, Ingredient.id, Ingredient.name, Need.quantity, Need.unit)
+            .join(Ingredient, Ingredient.id == Need.ingredient_id)
+            .filter(Need.recipe_id.in_(ids))
+        ):
+            needs.setdefault(rid, []).append(
+                {"ingredient_id": iid, "name": name, "quantity": qty, "unit": unit}
+            )
+        for item, rid in zip(data, ids):
+            item["needs"] = needs.get(rid, [])
+
+    if "steps" in fields:
+        steps = {}
+        for rid, step in (
+            db.session.query(CookInstruction.recipe_id, CookInstruction.step)
+            .filter(CookInstruction.recipe_id.in_(ids))
+            .order_by(CookInstruction.recipe_id, CookInstruction.position)
+        ):
+            steps.setdefault(rid, []).append(step)
+        for item, rid in zip(data, ids):
+            item["steps"] = steps.get(rid, [])
+
+    return data
+
+
+def review_query(fields):
+    columns = [Review.id.label("id")]
+    for f in fields:
+        if f != "id":
+            columns.extend(REVIEW_COLUMNS[f])
+    query = db.session.query(*columns).select_from(Review)
+    if "user" in fields:
+        query = query.join(User, User.id == Review.user_id)
+    return query
+
+
+def serialize_reviews(rows, fields) -> list:
+    out = []
+    for row in rows:
+        item = {}
+        for f in fields:
+            item[f] = {"username": row.username} if f == "user" else getattr(row, f)
+        out.append(item)
+    return out
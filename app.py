@@ -1,11 +1,21 @@
 from flask import Flask
-from config import Config
+from werkzeug.middleware.proxy_fix import ProxyFix
+from config import get_config
 from extensions import db, migrate, login_manager
+from cache import cache
+import http_cache
+import streaming
+import jobs
+import images
+import database
+import instrumentation
+from ratelimit import limiter
 from recipes import recipes_bp
 
 # 藍圖
 from auth.routes import auth_bp
 from routes import main_bp
+from api import api_bp
 
 import os  # ADD
 
@@ -13,8 +23,8 @@ import os  # ADD
 def create_app():
     app = Flask(__name__)
 
-    # CHANGE: 先載入原本的 Config 設定
-    app.config.from_object(Config)
+    # CHANGE: 先載入設定（APP_ENV=production 時為 ProductionConfig）
+    app.config.from_object(get_config())
 
     # CHANGE: 如果有設定 DATABASE_URL（例如在 Render 上），就覆寫資料庫連線字串
     database_url = os.getenv("DATABASE_URL")
@@ -22,14 +32,29 @@ def create_app():
         app.config["SQLALCHEMY_DATABASE_URI"] = database_url
 
     # init extensions
+    instrumentation.init_app(app)  # 最先註冊，量到的時間包含其他 before/after_request
+    database.init_app(app)  # 連線池 / 逾時，必須在 db.init_app 之前
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    cache.init_app(app)
+    http_cache.init_app(app)
+    streaming.init_app(app)
+    jobs.init_app(app)
+    images.init_app(app)
+    limiter.init_app(app)
+
+    # 反向代理後面時，以 X-Forwarded-For 還原用戶端 IP（限流依 IP 計算）
+    hops = app.config.get("TRUSTED_PROXY_HOPS", 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
     # register blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(main_bp)
     app.register_blueprint(recipes_bp, url_prefix="/recipes")
+    app.register_blueprint(api_bp, url_prefix="/api/v1")
+    app.register_blueprint(images.media_bp, url_prefix="/media")
 
     return app
 
@@ -1,18 +1,39 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 
 from . import auth_bp
 from .forms import LoginForm, RegisterForm
 from extensions import db
 from models import User
+from ratelimit import limiter
+
+
+def _login_wait(username: str) -> int:
+    """每個 IP、每個帳號各一個權杖桶；回傳需等待的秒數（0 表示放行）。IP 被擋時不消耗帳號的權杖。"""
+    cfg = current_app.config
+    return limiter.hit(
+        f"login-ip:{request.remote_addr}", cfg["LOGIN_IP_BURST"], cfg["LOGIN_IP_PER_MINUTE"]
+    ) or limiter.hit(
+        f"login-user:{username.strip().lower()}", cfg["LOGIN_USER_BURST"], cfg["LOGIN_USER_PER_MINUTE"]
+    )
 
 
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     form = LoginForm(request.form)
     if request.method == "POST" and form.validate():
+        # 先限流再驗證密碼：被擋下的嘗試不會進到昂貴的雜湊計算
+        wait = _login_wait(form.username.data)
+        if wait:
+            flash(f"嘗試次數過多，請 {wait} 秒後再試", "danger")
+            return render_template("auth/login.html", form=form), 429, {"Retry-After": str(wait)}
+
         user = User.query.filter_by(username=form.username.data).first()
         if user and user.check_password(form.password.data):
+            if user.password_needs_rehash():
+                # 雜湊參數已調整：趁有明文密碼時以新參數重新雜湊
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user)
             flash("登入成功", "success")
             next_url = request.args.get("next") or url_for("main.dashboard")
@@ -0,0 +1,165 @@
+# autocomplete.py
+# 食材 / 分類名稱自動完成：記憶體中的排序陣列 + bisect 前綴查詢，依使用次數排序
+#
+# 名稱以 NFKC + casefold 正規化後排序（全形英數轉半形、不分大小寫；中文字不變），
+# 前綴 p 的候選就是 [bisect_left(p), bisect_left(p + U+10FFFF)) 這一段。
+# 段內筆數不多時直接取使用次數最高的幾筆；超過 SCAN_LIMIT 筆的前綴（例如「醬」、「a」這種常見開頭）
+# 在建立索引時預先算好前 MAX_RESULTS 名，查詢時不必掃描整段。
+#
+# 每個行程各有一份索引：本行程新增的名稱立即加入，
+# 使用次數與其他 worker 新增的名稱在 AUTOCOMPLETE_REBUILD_SECONDS 後整份重建時更新。
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from flask import current_app
+
+from extensions import db
+from models import Category, Ingredient, Need, Recipe
+
+MAX_RESULTS = 20   # 每次查詢最多回傳幾筆（也是預先計算的名次數）
+SCAN_LIMIT = 256   # 前綴對應的筆數超過這個數量時預先計算前幾名
+_END = "\U0010ffff"
+
+
+class Suggestion(NamedTuple):
+    id: int
+    name: str
+    usage: int  # 食材：用到它的食譜數；分類：分類下的食譜數
+
+
+def normalize(name: str) -> str:
+    return unicodedata.normalize("NFKC", name).casefold().strip()
+
+
+class PrefixIndex:
+    def __init__(self, source):
+        self.source = source  # 回傳 [(id, name, usage), ...] 的函式
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.built_at = None
+        self._keys = []     # 正規化後的名稱（遞增）
+        self._entries = []  # 與 _keys 對應的 Suggestion
+        self._usage = []    # 與 _keys 對應的使用次數（nlargest 的 key）
+        self._ids = set()
+        self._top = {}      # 筆數超過 SCAN_LIMIT 的前綴 -> 前 MAX_RESULTS 名的 Suggestion
+
+    # =========================
+    # 建立 / 維護
+    # =========================
+    def build(self, rows=None):
+        """整份重建；rows 省略時由 source 讀取。"""
+        fresh = PrefixIndex(self.source)
+        items = sorted(
+            (normalize(name), -usage, name, iid)
+            for iid, name, usage in (self.source() if rows is None else rows)
+        )
+        fresh._keys = [key for key, _, _, _ in items]
+        fresh._entries = [Suggestion(iid, name, -neg) for _, neg, name, iid in items]
+        fresh._usage = [s.usage for s in fresh._entries]
+        fresh._ids = {s.id for s in fresh._entries}
+        fresh._precompute("", 0, len(fresh._keys))
+        fresh.built_at = time.monotonic()
+
+        with self._lock:
+            self.__dict__.update({k: v for k, v in fresh.__dict__.items() if k not in ("_lock", "source")})
+
+    def _precompute(self, prefix: str, lo: int, hi: int):
+        """[lo, hi) 是前綴 prefix 的範圍；筆數夠多就記下前幾名，並依下一個字元往下分段。"""
+        if hi - lo <= SCAN_LIMIT:
+            return
+        if prefix:
+            self._top[prefix] = [self._entries[i] for i in self._best(lo, hi, MAX_RESULTS)]
+        depth = len(prefix)
+        i = lo
+        while i < hi:
+            key = self._keys[i]
+            if len(key) <= depth:  # 名稱剛好等於前綴
+                i += 1
+                continue
+            child = key[:depth + 1]
+            end = bisect_left(self._keys, child + _END, i, hi)
+            self._precompute(child, i, end)
+            i = end
+
+    def _best(self, lo: int, hi: int, limit: int) -> list:
+        # 使用次數相同時保留排序陣列中的順序（較短、字典序較前的名稱在前）
+        return heapq.nlargest(limit, range(lo, hi), key=self._usage.__getitem__)
+
+    def _ensure_fresh(self):
+        max_age = current_app.config.get("AUTOCOMPLETE_REBUILD_SECONDS", 300)
+        if self.built_at is None or time.monotonic() - self.built_at > max_age:
+            self.build()
+
+    def add(self, rows, usage: int = 1):
+        """新名稱（已 commit）加入索引：rows 為 [(id, name), ...]，已存在的 id 略過；索引尚未建立時不需處理。"""
+        with self._lock:
+            if self.built_at is None:
+                return
+            for iid, name in rows:
+                if iid in self._ids:
+                    continue
+                key = normalize(name)
+                entry = Suggestion(iid, name, usage)
+                i = bisect_right(self._keys, key)
+                self._keys.insert(i, key)
+                self._entries.insert(i, entry)
+                self._usage.insert(i, usage)
+                self._ids.add(iid)
+                for n in range(1, len(key) + 1):
+                    top = self._top.get(key[:n])
+                    if top is not None and (len(top) < MAX_RESULTS or usage > top[-1].usage):
+                        top.append(entry)
+                        top.sort(key=lambda s: -s.usage)
+                        del top[MAX_RESULTS:]
+
+    # =========================
+    # 查詢
+    # =========================
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        """以 prefix 開頭的名稱，依使用次數由高到低。"""
+        self._ensure_fresh()
+        key = normalize(prefix)
+        if not key:
+            return []
+        limit = min(limit, MAX_RESULTS)
+        with self._lock:
+            top = self._top.get(key)
+            if top is not None:
+                return top[:limit]
+            lo = bisect_left(self._keys, key)
+            hi = bisect_left(self._keys, key + _END, lo)
+            return [self._entries[i] for i in self._best(lo, hi, limit)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"names": len(self._keys), "precomputed_prefixes": len(self._top)}
+
+
+def _ingredient_rows():
+    return (
+        db.session.query(Ingredient.id, Ingredient.name, db.func.count(Need.recipe_id))
+        .outerjoin(Need, Need.ingredient_id == Ingredient.id)
+        .group_by(Ingredient.id, Ingredient.name)
+        .all()
+    )
+
+
+def _category_rows():
+    return (
+        db.session.query(Category.id, Category.name, db.func.count(Recipe.id))
+        .outerjoin(Recipe, Recipe.cate_id == Category.id)
+        .group_by(Category.id, Category.name)
+        .all()
+    )
+
+
+indexes = {
+    "ingredients": PrefixIndex(_ingredient_rows),
+    "categories": PrefixIndex(_category_rows),
+}
@@ -0,0 +1,129 @@
+# benchmarks/bench_allergen_filter.py
+# 多過敏原排除：每個過敏原一個 NOT IN 子查詢 vs. allergen_mask 位元條件
+#
+#   python benchmarks/bench_allergen_filter.py [recipes]     # 預設 100000
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 一律使用暫存 SQLite，避免動到 .env 指定的資料庫
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Category, Ingredient, Recipe, Need  # noqa: E402
+from pagination import keyset_page  # noqa: E402
+from recipes.filters import apply_filters  # noqa: E402
+
+BATCH = 5000
+ROUNDS = 10
+PLAIN_INGREDIENTS = 200
+PER_RECIPE = 6
+# 各過敏原出現在多少比例的食譜中（常見 → 少見）
+ALLERGEN_SHARE = [0.40, 0.20, 0.10, 0.05, 0.05, 0.02]
+
+
+def populate(total: int):
+    rng = random.Random(42)
+    u = User(username="bench", email="bench@example.com", password_hash="x")
+    c = Category(name="bench")
+    db.session.add_all([u, c])
+    allergens = [Ingredient(name=f"allergen-{i}", is_allergen=True) for i in range(len(ALLERGEN_SHARE))]
+    db.session.add_all(allergens)
+    db.session.commit()
+    db.session.execute(
+        Ingredient.__table__.insert(), [dict(name=f"plain-{i}") for i in range(PLAIN_INGREDIENTS)]
+    )
+    plain_ids = [iid for (iid,) in db.session.query(Ingredient.id).filter(Ingredient.allergen_bit.is_(None))]
+
+    base = datetime(2020, 1, 1)
+    for start in range(0, total, BATCH):
+        recipes, needs = [], []
+        for rid in range(start + 1, min(start + BATCH, total) + 1):
+            mask = 0
+            ingredient_ids = rng.sample(plain_ids, PER_RECIPE)
+            for a, share in zip(allergens, ALLERGEN_SHARE):
+                if rng.random() < share:
+                    ingredient_ids.append(a.id)
+                    mask |= 1 << a.allergen_bit
+            recipes.append(dict(
+                id=rid, name=f"recipe-{rid}", cook_time_min=rid % 90,
+                created_at=base + timedelta(minutes=rid), updated_at=base,
+                user_id=u.id, cate_id=c.id, allergen_mask=mask,
+            ))
+            needs.extend(dict(recipe_id=rid, ingredient_id=iid, quantity=1, unit="g") for iid in ingredient_ids)
+        db.session.execute(Recipe.__table__.insert(), recipes)
+        db.session.execute(Need.__table__.insert(), needs)
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+    return [a.id for a in allergens]
+
+
+def subquery_filter(query, allergen_ids):
+    # 過去的做法延伸到多選：每個過敏原各一個 NOT IN 子查詢
+    for aid in allergen_ids:
+        query = query.filter(
+            ~Recipe.id.in_(db.session.query(Need.recipe_id).filter(Need.ingredient_id == aid))
+        )
+    return query
+
+
+def median_ms(fn) -> float:
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main(total: int):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        allergen_ids = populate(total)
+        print(f"{total} recipes populated in {time.perf_counter() - t0:.1f}s\n")
+
+        ids_query = db.session.query(Recipe.id, Recipe.created_at)
+        print(f"{'excluded':>8} {'matches':>8} {'page subq ms':>13} {'page mask ms':>13} "
+              f"{'count subq ms':>14} {'count mask ms':>14}")
+        for k in (1, 3, len(allergen_ids)):
+            chosen = allergen_ids[:k]
+            old = subquery_filter(ids_query, chosen)
+            new = apply_filters(ids_query, allergen_ids=chosen)
+
+            # 兩種做法結果必須一致
+            assert [r.id for r in keyset_page(old).items] == [r.id for r in keyset_page(new).items]
+            matches = old.count()
+            assert matches == new.count()
+
+            print(
+                f"{k:>8} {matches:>8} "
+                f"{median_ms(lambda: keyset_page(old)):>13.2f} "
+                f"{median_ms(lambda: keyset_page(new)):>13.2f} "
+                f"{median_ms(lambda: old.count()):>14.2f} "
+                f"{median_ms(lambda: new.count()):>14.2f}"
+            )
+
+        print("\nquery plan (mask, first page):")
+        stmt = new.order_by(Recipe.created_at.desc(), Recipe.id.desc()).limit(25).statement
+        sql = str(stmt.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        for row in db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql)):
+            print("  ", row[-1])
+
+
+if __name__ == "__main__":
+    try:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+    finally:
+        if os.path.exists(_db_path):
+            os.remove(_db_path)
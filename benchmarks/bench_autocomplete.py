@@ -0,0 +1,91 @@
+# benchmarks/bench_autocomplete.py
+# 自動完成前綴索引的建立時間與查詢延遲（不需資料庫）：合成中英文名稱，使用次數依 Zipf 分布
+#
+#   python benchmarks/bench_autocomplete.py                 # 10 萬個名稱
+#   python benchmarks/bench_autocomplete.py --names 300000 --queries 50000
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+import autocomplete  # noqa: E402
+import datagen  # noqa: E402
+
+
+def synthetic_names(count: int, rng: random.Random) -> list:
+    """約八成為中文詞彙與常用字的組合，其餘為英文（含大小寫、全形）。"""
+    words = datagen.INGREDIENT_NAMES + datagen.STYLES + datagen.CATEGORY_NAMES
+    chars = sorted({c for w in words for c in w})
+    names = set()
+    while len(names) < count:
+        roll = rng.random()
+        if roll < 0.4:
+            name = rng.choice(datagen.STYLES) + rng.choice(datagen.INGREDIENT_NAMES) + rng.choice(datagen.DISHES)
+            name += "".join(rng.choices(chars, k=rng.randint(0, 2)))
+        elif roll < 0.8:
+            name = "".join(rng.choices(chars, k=rng.randint(2, 5)))
+        else:
+            word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+            name = word.capitalize() if rng.random() < 0.5 else word
+            if rng.random() < 0.05:
+                name = name.translate({c: c + 0xFEE0 for c in range(0x21, 0x7F)})  # 全形
+        names.add(name)
+    return sorted(names)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = synthetic_names(args.names, rng)
+    popularity = datagen.Zipf(range(len(names)), 1.1, rng)
+    order = list(range(len(names)))
+    rng.shuffle(order)
+    usage = {i: 0 for i in range(len(names))}
+    for _ in range(len(names) * 3):
+        usage[order[popularity.one()]] += 1
+    rows = [(i + 1, name, usage[i]) for i, name in enumerate(names)]
+
+    app = Flask(__name__)
+    app.config["AUTOCOMPLETE_REBUILD_SECONDS"] = 10 ** 9
+    index = autocomplete.PrefixIndex(lambda: rows)
+    with app.app_context():
+        started = time.perf_counter()
+        index.build()
+        build_seconds = time.perf_counter() - started
+
+        # 查詢前綴：從名稱（依熱門程度抽樣）取前 1–3 個字，模擬逐字輸入
+        queries = []
+        for _ in range(args.queries):
+            name = names[order[popularity.one()]] if rng.random() < 0.7 else rng.choice(names)
+            queries.append(name[:rng.randint(1, min(3, len(name)))])
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            index.suggest(q, args.limit)
+            latencies.append((time.perf_counter() - t0) * 1e6)
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    stats = index.stats()
+    print(f"{stats['names']} 個名稱，建立 {build_seconds * 1000:.0f} ms，預先計算 {stats['precomputed_prefixes']} 個前綴")
+    print(f"{'queries':>8} {'p50 µs':>8} {'p95 µs':>8} {'p99 µs':>8} {'max µs':>8}")
+    print(f"{len(latencies):>8} {pct(0.50):>8.1f} {pct(0.95):>8.1f} {pct(0.99):>8.1f} {latencies[-1]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
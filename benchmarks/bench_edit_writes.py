@@ -0,0 +1,96 @@
+# benchmarks/bench_edit_writes.py
+# 編輯食譜時實際寫入的列數：差異更新 vs. 過去的整批刪除重建
+#
+#   python benchmarks/bench_edit_writes.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+
+STEPS = [f"步驟 {i}" for i in range(10)]
+INGREDIENTS = [(f"食材{i}", i + 1, "g") for i in range(15)]
+
+
+class WriteCounter:
+    """統計 INSERT / UPDATE / DELETE 的敘述數與影響列數。"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = 0
+        self.rows = 0
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb in ("INSERT", "UPDATE", "DELETE"):
+            self.statements += 1
+            self.rows += max(cursor.rowcount, 0)
+
+    def __enter__(self):
+        event.listen(self.engine, "after_cursor_execute", self._after)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "after_cursor_execute", self._after)
+
+
+def form(steps, ingredients, name="測試食譜"):
+    return dict(
+        name=name, description="說明", cook_time_min=10, category="主食",
+        steps_text="\n".join(steps),
+        ingredients_text="\n".join(f"{n},{q},{u}" for n, q, u in ingredients),
+    )
+
+
+def rebuild_rows(old_steps, old_needs, steps, needs) -> int:
+    # 過去的 edit：刪掉所有步驟與 Need，步驟新增→刪除→再新增，Need 重新新增（不含食譜本體）
+    return old_steps + old_needs + len(steps) * 3 + len(needs)
+
+
+def main():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+    client = app.test_client()
+    client.post("/auth/register", data=dict(username="bench", email="bench@example.com", password="secret"))
+    client.post("/auth/login", data=dict(username="bench", password="secret"))
+    client.post("/recipes/new", data=form(STEPS, INGREDIENTS))
+
+    scenarios = [
+        ("no-op save", STEPS, INGREDIENTS),
+        ("edit one step", STEPS[:4] + ["改過的步驟"] + STEPS[5:], INGREDIENTS),
+        ("append one step", STEPS + ["最後一步"], INGREDIENTS),
+        ("drop last step", STEPS[:-1], INGREDIENTS),
+        ("change one quantity", STEPS, INGREDIENTS[:3] + [(INGREDIENTS[3][0], 99, "g")] + INGREDIENTS[4:]),
+        ("add one ingredient", STEPS, INGREDIENTS + [("新食材", 1, "顆")]),
+        ("remove one ingredient", STEPS, INGREDIENTS[1:]),
+    ]
+
+    print(f"{'scenario':<24} {'statements':>10} {'rows':>6} {'rebuild rows':>13}")
+    for label, steps, ingredients in scenarios:
+        # 每個情境都從原始內容開始
+        client.post("/recipes/1/edit", data=form(STEPS, INGREDIENTS))
+        with WriteCounter(engine) as wc:
+            resp = client.post("/recipes/1/edit", data=form(steps, ingredients))
+        assert resp.status_code == 302, resp.status_code
+        baseline = rebuild_rows(len(STEPS), len(INGREDIENTS), steps, ingredients)
+        print(f"{label:<24} {wc.statements:>10} {wc.rows:>6} {baseline:>13}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        if os.path.exists(_db_path):
+            os.remove(_db_path)
@@ -0,0 +1,88 @@
+# benchmarks/bench_pagination.py
+# 食譜清單分頁效能：資料量放大時，每頁延遲應維持平穩
+#
+#   python benchmarks/bench_pagination.py 1000 10000 100000
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 一律使用暫存 SQLite，避免動到 .env 指定的資料庫
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Category, Recipe  # noqa: E402
+from pagination import encode_cursor, keyset_page  # noqa: E402
+
+BATCH = 5000
+ROUNDS = 20
+
+
+def grow_to(total: int, user_id: int, cate_id: int):
+    have = db.session.query(db.func.count(Recipe.id)).scalar()
+    base = datetime(2020, 1, 1)
+    for start in range(have, total, BATCH):
+        rows = [
+            dict(
+                name=f"recipe-{i}",
+                description=f"第 {i} 道測試食譜",
+                cook_time_min=i % 90,
+                created_at=base + timedelta(minutes=i),
+                user_id=user_id,
+                cate_id=cate_id,
+            )
+            for i in range(start, min(start + BATCH, total))
+        ]
+        db.session.execute(Recipe.__table__.insert(), rows)
+    db.session.commit()
+
+
+def median_ms(fn) -> float:
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main(sizes):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        u = User(username="bench", email="bench@example.com", password_hash="x")
+        c = Category(name="bench")
+        db.session.add_all([u, c])
+        db.session.commit()
+
+        client = app.test_client()
+
+        def get(url):
+            resp = client.get(url)
+            assert resp.status_code == 200, resp.status_code
+
+        # page ms：只量分頁查詢本身；endpoint ms：整個 /recipes/（含側欄統計與渲染）
+        print(f"{'recipes':>10} {'first page ms':>14} {'deep page ms':>13} {'endpoint ms':>12}")
+        for n in sizes:
+            grow_to(n, u.id, c.id)
+            # 深層頁：從中間的一筆開始往後翻
+            mid = encode_cursor(Recipe.query.order_by(Recipe.id).offset(n // 2).first())
+            first = median_ms(lambda: keyset_page(Recipe.query))
+            deep = median_ms(lambda: keyset_page(Recipe.query, after=mid))
+            endpoint = median_ms(lambda: get(f"/recipes/?after={mid}"))
+            print(f"{n:>10} {first:>14.2f} {deep:>13.2f} {endpoint:>12.2f}")
+
+
+if __name__ == "__main__":
+    try:
+        main([int(a) for a in sys.argv[1:]] or [1000, 10000, 100000])
+    finally:
+        if os.path.exists(_db_path):
+            os.remove(_db_path)
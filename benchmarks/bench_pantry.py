@@ -0,0 +1,111 @@
+# benchmarks/bench_pantry.py
+# 手邊食材配對：記憶體反向索引 vs. 每次以 SQL 對 need 做 GROUP BY
+#
+#   python benchmarks/bench_pantry.py [recipes]     # 預設 100000
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 一律使用暫存 SQLite，避免動到 .env 指定的資料庫
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+
+from sqlalchemy import func  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Category, Ingredient, Recipe, Need  # noqa: E402
+from pantry import PantryIndex  # noqa: E402
+
+BATCH = 5000
+ROUNDS = 30
+INGREDIENTS = 1000
+TOP_K = 24
+
+
+def populate(total: int, rng: random.Random):
+    u = User(username="bench", email="bench@example.com", password_hash="x")
+    c = Category(name="bench")
+    db.session.add_all([u, c])
+    db.session.commit()
+    db.session.execute(Ingredient.__table__.insert(), [dict(name=f"ing-{i}") for i in range(INGREDIENTS)])
+    ids = [iid for (iid,) in db.session.query(Ingredient.id).order_by(Ingredient.id)]
+    # 常見食材（鹽、油…）出現在很多食譜：依 Zipf 分布抽樣
+    weights = [1 / (rank + 1) for rank in range(len(ids))]
+    for start in range(0, total, BATCH):
+        recipes, needs = [], []
+        for rid in range(start + 1, min(start + BATCH, total) + 1):
+            recipes.append(dict(id=rid, name=f"recipe-{rid}", cook_time_min=0, user_id=u.id, cate_id=c.id))
+            chosen = set(rng.choices(ids, weights, k=rng.randint(5, 15)))
+            needs.extend(dict(recipe_id=rid, ingredient_id=iid, quantity=1, unit="g") for iid in chosen)
+        db.session.execute(Recipe.__table__.insert(), recipes)
+        db.session.execute(Need.__table__.insert(), needs)
+    db.session.commit()
+    return ids, weights
+
+
+def sql_match(have, k=TOP_K):
+    # 對照組：每次請求都掃 need 計算覆蓋率
+    matched = func.sum(db.case((Need.ingredient_id.in_(have), 1), else_=0))
+    needed = func.count()
+    rows = (
+        db.session.query(Need.recipe_id, matched, needed)
+        .group_by(Need.recipe_id)
+        .having(matched > 0)
+        .order_by((matched * 1.0 / needed).desc(), matched.desc(), Need.recipe_id.desc())
+        .limit(k)
+    )
+    return [(rid, m, n) for rid, m, n in rows]
+
+
+def percentiles(fn):
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main(total: int):
+    rng = random.Random(7)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ids, weights = populate(total, rng)
+
+        index = PantryIndex()
+        t0 = time.perf_counter()
+        index.build()
+        print(f"{total} recipes, index built in {time.perf_counter() - t0:.2f}s: {index.stats()}\n")
+
+        print(f"{'pantry':>6} {'index p50 ms':>13} {'index p95 ms':>13} {'sql p50 ms':>11}")
+        for size in (3, 10, 25):
+            have = set(rng.choices(ids, weights, k=size * 2))
+            have = list(have)[:size]
+            got = [(m.recipe_id, m.matched, m.needed) for m in index.match(have, k=TOP_K)]
+            assert got == sql_match(have), "索引結果與 SQL 不一致"
+            p50, p95 = percentiles(lambda: index.match(have, k=TOP_K))
+            sql_p50, _ = percentiles(lambda: sql_match(have))
+            print(f"{size:>6} {p50:>13.2f} {p95:>13.2f} {sql_p50:>11.2f}")
+
+        # 維護成本：編輯一道食譜的食材
+        rid = total // 2
+        t0 = time.perf_counter()
+        for _ in range(100):
+            index.update_recipe(rid, rng.sample(ids, 8))
+        print(f"\nupdate_recipe: {(time.perf_counter() - t0) * 10:.3f} ms/call")
+
+
+if __name__ == "__main__":
+    try:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+    finally:
+        if os.path.exists(_db_path):
+            os.remove(_db_path)
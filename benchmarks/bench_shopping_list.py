@@ -0,0 +1,105 @@
+# benchmarks/bench_shopping_list.py
+# 購物清單：以欄為單位換算 + 排序分組加總 vs. 逐列在 Python 換算
+#
+#   python benchmarks/bench_shopping_list.py [recipes]     # 預設 20000
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 一律使用暫存 SQLite，避免動到 .env 指定的資料庫
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Category, Ingredient, Recipe, Need  # noqa: E402
+import shopping  # noqa: E402
+
+BATCH = 5000
+ROUNDS = 20
+INGREDIENTS = 500
+UNITS = ["g", "kg", "ml", "杯", "大匙", "小匙", "顆", "片", "少許", " G ", "公斤"]
+
+
+def populate(total: int, rng: random.Random):
+    u = User(username="bench", email="bench@example.com", password_hash="x")
+    c = Category(name="bench")
+    db.session.add_all([u, c])
+    db.session.commit()
+    db.session.execute(Ingredient.__table__.insert(), [dict(name=f"ing-{i}") for i in range(INGREDIENTS)])
+    ids = [iid for (iid,) in db.session.query(Ingredient.id)]
+    for start in range(0, total, BATCH):
+        recipes, needs = [], []
+        for rid in range(start + 1, min(start + BATCH, total) + 1):
+            recipes.append(dict(id=rid, name=f"recipe-{rid}", cook_time_min=0, user_id=u.id, cate_id=c.id))
+            needs.extend(
+                dict(recipe_id=rid, ingredient_id=iid, quantity=rng.randint(1, 500), unit=rng.choice(UNITS))
+                for iid in rng.sample(ids, 10)
+            )
+        db.session.execute(Recipe.__table__.insert(), recipes)
+        db.session.execute(Need.__table__.insert(), needs)
+    db.session.commit()
+
+
+def per_row_list(plan: dict):
+    # 對照組：逐列正規化單位、查換算表、累加（輸出與 shopping_list 相同）
+    totals, counts = defaultdict(float), defaultdict(int)
+    rows = (
+        db.session.query(Need.recipe_id, Need.ingredient_id, Ingredient.name, Need.quantity, Need.unit)
+        .join(Ingredient, Ingredient.id == Need.ingredient_id)
+        .filter(Need.recipe_id.in_(list(plan)))
+    )
+    for rid, iid, name, qty, unit in rows:
+        key = unit.strip().lower()
+        canonical, factor = shopping.UNIT_TABLE.get(key, (key, 1.0))
+        totals[(name, canonical, iid)] += qty * factor * plan[rid]
+        counts[(name, canonical, iid)] += 1
+    items = []
+    for (name, unit, iid), quantity in sorted(totals.items()):
+        n = counts[(name, unit, iid)]
+        quantity, unit = shopping._display(quantity, unit)
+        items.append(shopping.ShoppingItem(iid, name, round(quantity, 2), unit, n))
+    return items
+
+
+def median_ms(fn) -> float:
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main(total: int):
+    rng = random.Random(3)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        populate(total, rng)
+
+        print(f"{'recipes':>8} {'items':>6} {'columnar ms':>12} {'per-row ms':>12}")
+        for n in (7, 50, 200):
+            plan = {rid: rng.choice([0.5, 1, 2]) for rid in rng.sample(range(1, total + 1), n)}
+            items = shopping.shopping_list(plan)
+
+            assert items == per_row_list(plan), "結果與逐列計算不一致"
+
+            columnar = median_ms(lambda: shopping.shopping_list(plan))
+            per_row = median_ms(lambda: per_row_list(plan))
+            print(f"{n:>8} {len(items):>6} {columnar:>12.2f} {per_row:>12.2f}")
+
+
+if __name__ == "__main__":
+    try:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
+    finally:
+        if os.path.exists(_db_path):
+            os.remove(_db_path)
@@ -0,0 +1,98 @@
+# benchmarks/bench_streaming.py
+# 食譜清單串流渲染（LISTING_STREAM）與一般渲染的首位元組時間（TTFB）與完整回應時間比較
+#
+# 以合成資料（datagen.py）建立暫存 SQLite，於本行程啟動 HTTP 伺服器，以 http.client 量測：
+# TTFB 為送出請求到收到第一個回應位元組（狀態列）的時間；一般渲染要整頁渲染完才會送出
+#
+#   python benchmarks/bench_streaming.py                          # 每頁 24 / 100 / 500 張卡片
+#   python benchmarks/bench_streaming.py --per-page 50 1000 --recipes 20000 --gzip
+import argparse
+import http.client
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 一律使用暫存 SQLite，避免動到 .env 指定的資料庫
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ["RATELIMIT_ENABLED"] = "false"
+os.environ["INSTRUMENTATION_ENABLED"] = "false"
+
+from werkzeug.serving import make_server  # noqa: E402
+
+import datagen  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-page", type=int, nargs="+", default=[24, 100, 500])
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--gzip", action="store_true", help="請求帶 Accept-Encoding: gzip（串流模式在應用程式端壓縮）")
+    parser.add_argument("--cache", action="store_true", help="啟用卡片快取（預設停用，量每張卡片的渲染）")
+    return parser.parse_args()
+
+
+def fetch(port: int, path: str, headers: dict):
+    """回傳 (TTFB 秒數, 完整回應秒數, 位元組數)。"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    t0 = time.perf_counter()
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    ttfb = time.perf_counter() - t0
+    size = len(resp.read())
+    total = time.perf_counter() - t0
+    conn.close()
+    return ttfb, total, size
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    args = parse_args()
+    os.environ["CACHE_BACKEND"] = "memory" if args.cache else "null"
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        datagen.generate(recipes=args.recipes, users=max(10, args.recipes // 20), log=lambda *_: None)
+        print(f"合成 {args.recipes} 道食譜（{time.perf_counter() - started:.1f} 秒）")
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # 不印每個請求的存取紀錄
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+
+    print(f"{'per_page':>8} {'mode':>8} {'TTFB ms':>9} {'total ms':>9} {'KB':>7}")
+    try:
+        for per_page in args.per_page:
+            app.config["LISTING_PER_PAGE"] = per_page
+            for mode, stream in (("render", False), ("stream", True)):
+                app.config["LISTING_STREAM"] = stream
+                for _ in range(3):  # 暖機
+                    fetch(server.port, "/recipes/", headers)
+                samples = [fetch(server.port, "/recipes/", headers) for _ in range(args.rounds)]
+                ttfb = median([s[0] for s in samples]) * 1000
+                total = median([s[1] for s in samples]) * 1000
+                print(f"{per_page:>8} {mode:>8} {ttfb:>9.1f} {total:>9.1f} {samples[0][2] / 1024:>7.0f}")
+    finally:
+        server.shutdown()
+        os.unlink(_db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# benchmarks/bench_suite.py
+# 端到端效能基準：以合成資料（datagen.py）建立資料庫，透過 Flask test client 執行常用請求，
+# 輸出每個情境的延遲百分位與 SQL 數量（JSON），可與其他 commit 的結果比較
+#
+#   python benchmarks/bench_suite.py --recipes 20000 --out before.json
+#   python benchmarks/bench_suite.py --recipes 20000 --compare before.json
+#   python benchmarks/bench_suite.py --database postgresql://.../bench   # 已 migrate 的空資料庫
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", help="資料庫 URL（預設為暫存 SQLite）")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--ingredients", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=50, help="每個情境量測的請求數")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="啟用伺服器端快取（預設停用，量資料庫與渲染本身）")
+    parser.add_argument("--only", help="只執行名稱包含這個字串的情境")
+    parser.add_argument("--out", help="結果 JSON 寫入檔案（預設印到標準輸出）")
+    parser.add_argument("--compare", help="與先前的結果 JSON 比較")
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+_db_path = None
+if ARGS.database:
+    os.environ["SQLALCHEMY_DATABASE_URI"] = ARGS.database
+else:
+    _db_path = tempfile.mktemp(suffix=".db")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ["CACHE_BACKEND"] = "memory" if ARGS.cache else "null"
+os.environ["RATELIMIT_ENABLED"] = "false"
+os.environ["INSTRUMENTATION_ENABLED"] = "false"
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Ingredient, Recipe  # noqa: E402
+import datagen  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_scenarios(client, fixtures, rng):
+    """回傳 [(名稱, 送出一次請求並回傳 response 的函式, 預期狀態碼), ...]。"""
+    hot = datagen.Zipf(fixtures["recipe_ids"], 1.1, rng)
+    created = fixtures["created"]
+    allergens = "&".join(f"allergen_id={i}" for i in fixtures["allergen_ids"][:2])
+    category = fixtures["category_id"]
+
+    def recipe_form(name):
+        return dict(
+            name=name, description="效能基準測試用的食譜", cook_time_min=rng.randint(5, 90),
+            category="主食", steps_text="洗菜\n切菜\n下鍋\n調味",
+            ingredients_text="雞蛋,2,顆\n洋蔥,1,顆\n醬油,1,大匙\n鹽,1,小匙\n蒜頭,3,瓣",
+        )
+
+    def new():
+        resp = client.post("/recipes/new", data=recipe_form(f"基準新增 {len(created)} {rng.random():.6f}"))
+        if resp.status_code == 302:
+            created.append(int(resp.headers["Location"].rstrip("/").rsplit("/", 1)[1]))
+        return resp
+
+    def edit():
+        rid = rng.choice(created or fixtures["recipe_ids"])
+        form = recipe_form(f"基準編輯 {rid}")
+        form["ingredients_text"] = "雞蛋,3,顆\n洋蔥,1,顆\n牛奶,200,ml\n鹽,1,小匙"
+        return client.post(f"/recipes/{rid}/edit", data=form)
+
+    return [
+        ("index", lambda: client.get("/recipes/"), 200),
+        ("index_search", lambda: client.get(f"/recipes/?q={rng.choice(['紅燒', '雞蛋', '咖哩', '清蒸魚'])}"), 200),
+        ("index_category", lambda: client.get(f"/recipes/?category_id={category}"), 200),
+        ("index_allergens", lambda: client.get(f"/recipes/?{allergens}"), 200),
+        ("index_combined", lambda: client.get(f"/recipes/?q=紅燒&category_id={category}&{allergens}"), 200),
+        ("show", lambda: client.get(f"/recipes/{hot.one()}"), 200),
+        ("new", new, 302),
+        ("edit", edit, 302),
+        ("review", lambda: client.post(
+            f"/recipes/{hot.one()}/reviews", data=dict(rating=rng.randint(1, 5), comment="基準測試")), 302),
+    ]
+
+
+def run():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = datagen.generate(
+            users=ARGS.users, recipes=ARGS.recipes, ingredients=ARGS.ingredients,
+            seed=ARGS.seed, log=lambda msg: None,
+        )
+        generate_seconds = time.perf_counter() - started
+        fixtures = dict(
+            username=db.session.query(User.username).filter(User.username.like("gen%")).order_by(User.id).first()[0],
+            recipe_ids=[rid for (rid,) in db.session.query(Recipe.id).order_by(Recipe.review_count.desc())],
+            category_id=db.session.query(Recipe.cate_id).group_by(Recipe.cate_id)
+            .order_by(db.func.count().desc()).first()[0],
+            allergen_ids=[iid for (iid,) in db.session.query(Ingredient.id).filter(Ingredient.is_allergen)
+                          .order_by(Ingredient.id)],
+            created=[],
+        )
+        dialect = db.engine.dialect.name
+        engine = db.engine
+
+    client = app.test_client()
+    resp = client.post("/auth/login", data=dict(username=fixtures["username"], password=datagen.PASSWORD))
+    assert resp.status_code == 302, f"登入失敗：{resp.status_code}"
+
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    rng = random.Random(ARGS.seed)
+    results = {}
+    for name, request, expected in build_scenarios(client, fixtures, rng):
+        if ARGS.only and ARGS.only not in name:
+            continue
+        for _ in range(ARGS.warmup):
+            request()
+        latencies, queries = [], []
+        for _ in range(ARGS.rounds):
+            counter.count = 0
+            t0 = time.perf_counter()
+            resp = request()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            queries.append(counter.count)
+            assert resp.status_code == expected, f"{name}: {resp.status_code}"
+        results[name] = dict(
+            requests=len(latencies),
+            p50_ms=round(percentile(latencies, 0.50), 3),
+            p95_ms=round(percentile(latencies, 0.95), 3),
+            p99_ms=round(percentile(latencies, 0.99), 3),
+            mean_ms=round(sum(latencies) / len(latencies), 3),
+            queries=percentile(queries, 0.50),
+            queries_max=max(queries),
+        )
+        print(f"  {name:<16} p50 {results[name]['p50_ms']:8.2f} ms  queries {results[name]['queries']}",
+              file=sys.stderr)
+    event.remove(engine, "before_cursor_execute", counter)
+
+    return dict(
+        meta=dict(
+            commit=git_commit(),
+            timestamp=datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            python=platform.python_version(),
+            dialect=dialect,
+            cache=ARGS.cache,
+            rounds=ARGS.rounds,
+            data=counts,
+            generate_seconds=round(generate_seconds, 2),
+        ),
+        scenarios=results,
+    )
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\n與 {baseline['meta'].get('commit')} 比較（比值 < 1 表示變快）", file=sys.stderr)
+    print(f"  {'情境':<16} {'p50':>16} {'p95':>16} {'queries':>10}", file=sys.stderr)
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            print(f"  {name:<16} （基準中沒有）", file=sys.stderr)
+            continue
+        cells = [
+            f"{before[k]:.1f}→{now[k]:.1f} ×{now[k] / before[k]:.2f}" if before[k] else f"{now[k]:.1f}"
+            for k in ("p50_ms", "p95_ms")
+        ]
+        print(f"  {name:<16} {cells[0]:>16} {cells[1]:>16} {before['queries']:>4}→{now['queries']:<4}", file=sys.stderr)
+
+
+def main():
+    try:
+        result = run()
+    finally:
+        if _db_path and os.path.exists(_db_path):
+            os.remove(_db_path)
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
+    if ARGS.out:
+        with open(ARGS.out, "w", encoding="utf-8") as fh:
+            fh.write(payload + "\n")
+    else:
+        print(payload)
+    if ARGS.compare:
+        with open(ARGS.compare, encoding="utf-8") as fh:
+            compare(result, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
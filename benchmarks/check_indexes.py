@@ -0,0 +1,109 @@
+# benchmarks/check_indexes.py
+# 以 EXPLAIN 確認熱門查詢都有用到對應的索引
+#
+#   python benchmarks/check_indexes.py                      # 暫存 SQLite（以 migrations 建立，與實際升級的結構相同）
+#   python benchmarks/check_indexes.py postgresql://...     # 已 migrate 的 PostgreSQL
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_path = None
+if len(sys.argv) > 1:
+    os.environ["SQLALCHEMY_DATABASE_URI"] = sys.argv[1]
+else:
+    _db_path = tempfile.mktemp(suffix=".db")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+
+from datetime import datetime  # noqa: E402
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Category, CookInstruction, Ingredient, Need, Recipe, Review  # noqa: E402
+from pagination import RECENT  # noqa: E402
+
+
+def hot_queries():
+    """(名稱, 查詢, 預期索引)；查詢寫法與 routes 中相同。"""
+    before = (datetime(2030, 1, 1), 1)
+    return [
+        ("listing sort",
+         Recipe.query.order_by(*(c.desc() for c in RECENT.columns)).limit(25),
+         "ix_recipe_created_at_id"),
+        ("category filter + sort",
+         Recipe.query.filter_by(cate_id=1).order_by(*(c.desc() for c in RECENT.columns)).limit(25),
+         "ix_recipe_cate_created"),
+        ("dashboard (author) + sort",
+         Recipe.query.filter(Recipe.user_id == 1)
+         .filter(db.tuple_(Recipe.created_at, Recipe.id) < before)
+         .order_by(*(c.desc() for c in RECENT.columns)).limit(9),
+         "ix_recipe_user_created"),
+        ("category count group-by",
+         db.session.query(Category, db.func.count(Recipe.id))
+         .outerjoin(Recipe, Recipe.cate_id == Category.id)
+         .group_by(Category.id),
+         "ix_recipe_cate_created"),
+        ("allergen anti-join subquery",
+         db.session.query(Need.recipe_id).filter(Need.ingredient_id == 1),
+         "ix_need_ingredient_recipe"),
+        ("reviews in show",
+         Review.query.filter(Review.recipe_id == 1).order_by(Review.rating.desc()),
+         "uq_review_recipe_user"),
+        ("existing review lookup",
+         Review.query.filter_by(recipe_id=1, user_id=1),
+         "uq_review_recipe_user"),
+        ("reviews by user",
+         Review.query.filter(Review.user_id == 1),
+         "ix_review_user_id"),
+        ("ingredient name resolution",
+         Ingredient.query.filter(db.func.lower(Ingredient.name).in_(["蛋", "egg"])),
+         "ix_ingredient_name_lower"),
+        ("steps in show/edit",
+         CookInstruction.query.filter(CookInstruction.recipe_id == 1).order_by(CookInstruction.position),
+         "ix_cook_instruction_recipe_position"),
+    ]
+
+
+def explain(query) -> str:
+    conn = db.session.connection()
+    dialect = conn.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return "\n".join(str(r[-1]) for r in rows)
+    if dialect.name == "postgresql":
+        # 空表或小表時 planner 會偏好循序掃描，這裡只確認索引「可被使用」
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = conn.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+        return "\n".join(r[0] for r in rows)
+    raise SystemExit(f"unsupported dialect: {dialect.name}")
+
+
+def main() -> int:
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        if _db_path:
+            # 不用 create_all：要檢查的是 migration 實際建出的索引（例如 batch 重建表時是否弄丟）
+            upgrade(directory=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"))
+        for name, query, index in hot_queries():
+            plan = explain(query)
+            used = index in plan
+            failures += not used
+            print(f"[{'ok' if used else 'MISSING'}] {name}: {index}")
+            if not used:
+                print("    " + plan.replace("\n", "\n    "))
+        db.session.rollback()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        if _db_path and os.path.exists(_db_path):
+            os.remove(_db_path)
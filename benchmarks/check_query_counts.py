@@ -0,0 +1,111 @@
+# benchmarks/check_query_counts.py
+# 檢查各頁面送出的 SQL 數量：資料筆數變多時數量必須維持不變（沒有 N+1）
+#
+#   python benchmarks/check_query_counts.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_path = tempfile.mktemp(suffix=".db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+os.environ.pop("DATABASE_URL", None)
+# 量的是資料庫查詢本身，不讓快取命中影響計數
+os.environ["CACHE_BACKEND"] = "null"
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Category, Recipe, CookInstruction, Review  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def add_recipes(user, categories, n, start):
+    # 分類輪流指派，讓同一頁出現多個分類
+    for i in range(start, start + n):
+        r = Recipe(name=f"recipe-{i}", cook_time_min=i, author=user, category=categories[i % len(categories)])
+        r.steps.extend(CookInstruction(step=f"step {k}") for k in range(3))
+        db.session.add(r)
+    db.session.commit()
+
+
+def add_reviewers(recipe, n, start):
+    for i in range(start, start + n):
+        u = User(username=f"reviewer-{i}", email=f"reviewer-{i}@example.com", password_hash="x")
+        db.session.add(u)
+        db.session.add(Review(recipe=recipe, user=u, rating=1 + i % 5))
+    db.session.commit()
+
+
+def main() -> int:
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    endpoints = ["/recipes/", "/dashboard", "/recipes/1", "/recipes/1/edit"]
+
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+    client.post("/auth/register", data=dict(username="owner", email="owner@example.com", password="secret"))
+    client.post("/auth/login", data=dict(username="owner", password="secret"))
+
+    def measure():
+        # 請求在測試用 app context 之外送出，每個請求都是全新的 session
+        counts = {}
+        for url in endpoints:
+            with QueryCounter(engine) as qc:
+                resp = client.get(url)
+            assert resp.status_code == 200, (url, resp.status_code)
+            counts[url] = qc.count
+        return counts
+
+    # 小資料量：每頁 2 筆、1 則評論
+    with app.app_context():
+        owner = User.query.filter_by(username="owner").one()
+        categories = [Category(name=f"cat-{i}") for i in range(3)]
+        db.session.add_all(categories)
+        db.session.commit()
+        add_recipes(owner, categories[:1], 2, 0)
+        add_reviewers(db.session.get(Recipe, 1), 1, 0)
+    small = measure()
+
+    # 大資料量：清單/控制台滿頁，詳細頁多則評論，跨多個分類
+    with app.app_context():
+        owner = User.query.filter_by(username="owner").one()
+        add_recipes(owner, Category.query.all(), 30, 100)
+        add_reviewers(db.session.get(Recipe, 1), 12, 100)
+    large = measure()
+
+    failures = 0
+    print(f"{'endpoint':<18} {'small':>6} {'large':>6}")
+    for url in endpoints:
+        flag = "" if small[url] == large[url] else "  <-- grows with page size"
+        print(f"{url:<18} {small[url]:>6} {large[url]:>6}{flag}")
+        failures += small[url] != large[url]
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        if os.path.exists(_db_path):
+            os.remove(_db_path)
@@ -0,0 +1,95 @@
+# benchmarks/check_replica_routing.py
+# 以兩個 SQLite 檔模擬主資料庫與讀取副本，確認讀寫分流與 read-your-writes
+#
+#   python benchmarks/check_replica_routing.py
+#   python benchmarks/check_replica_routing.py postgresql://.../primary postgresql://.../replica   # 兩個本機 PostgreSQL
+#
+# 副本不會同步主資料庫的寫入，因此「讀得到剛寫的資料」就代表讀的是主資料庫。
+# 使用 PostgreSQL 時兩邊須已 migrate 並有相同的 seed 資料（使用者 sam / secret）。
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = None
+if len(sys.argv) > 2:
+    primary_url, replica_url = sys.argv[1], sys.argv[2]
+else:
+    _tmp = tempfile.mkdtemp()
+    primary_url = f"sqlite:///{_tmp}/primary.db"
+    replica_url = f"sqlite:///{_tmp}/replica.db"
+os.environ["SQLALCHEMY_DATABASE_URI"] = primary_url
+os.environ["DATABASE_REPLICA_URLS"] = replica_url
+os.environ["REPLICA_STICKY_SECONDS"] = "1"
+os.environ.pop("DATABASE_URL", None)
+# 快取會讓第二次讀取不碰資料庫，這裡只看查詢落在哪個資料庫
+os.environ["CACHE_BACKEND"] = "null"
+os.environ["USER_CACHE_TTL"] = "0"
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Category  # noqa: E402
+
+
+def main():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        primary, replica = db.engines[None], db.engines["replica:0"]
+        if _tmp:
+            db.create_all()
+            u = User(username="sam", email="sam@example.com")
+            u.set_password("secret")
+            db.session.add_all([u, Category(name="主食")])
+            db.session.commit()
+            primary.dispose()
+            shutil.copy(f"{_tmp}/primary.db", f"{_tmp}/replica.db")
+
+    hits = Counter()
+    event.listen(primary, "before_cursor_execute", lambda *a: hits.update(["primary"]))
+    event.listen(replica, "before_cursor_execute", lambda *a: hits.update(["replica"]))
+
+    def check(label, resp, status, expect):
+        got = {k: v for k, v in hits.items() if v}
+        ok = resp.status_code == status and set(got) == set(expect)
+        print(f"{'ok ' if ok else 'FAIL'} {label:<44} {resp.status_code}  {dict(got)}")
+        hits.clear()
+        return ok
+
+    writer, reader = app.test_client(), app.test_client()
+    results = [
+        check("匿名 GET /recipes/ → 副本", reader.get("/recipes/"), 200, {"replica"}),
+        check("POST /auth/login → 主資料庫", writer.post(
+            "/auth/login", data=dict(username="sam", password="secret")), 302, {"primary"}),
+        check("已登入 GET /dashboard（未寫入）→ 副本", writer.get("/dashboard"), 200, {"replica"}),
+        check("POST /recipes/new → 主資料庫", writer.post("/recipes/new", data=dict(
+            name="分流測試", description="", cook_time_min=5, category="主食",
+            steps_text="a", ingredients_text="蛋,1,顆")), 302, {"primary"}),
+    ]
+    with app.app_context():
+        rid = db.session.execute(db.text("SELECT max(id) FROM recipe")).scalar()
+    hits.clear()
+    results += [
+        check("寫入者 GET 新食譜 → 主資料庫（讀得到）", writer.get(f"/recipes/{rid}"), 200, {"primary"}),
+        check("其他人 GET 新食譜 → 副本（尚未同步）", reader.get(f"/recipes/{rid}"), 404, {"replica"}),
+    ]
+    time.sleep(1.1)
+    results.append(
+        check("寫入者 REPLICA_STICKY_SECONDS 後 → 副本", writer.get(f"/recipes/{rid}"), 404, {"replica"})
+    )
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        if _tmp:
+            shutil.rmtree(_tmp, ignore_errors=True)
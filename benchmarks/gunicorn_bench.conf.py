@@ -0,0 +1,26 @@
+# benchmarks/gunicorn_bench.conf.py
+# 壓測用 gunicorn 設定：沿用 gunicorn.conf.py，另外在每個查詢前等待 BENCH_DB_LATENCY_MS 毫秒，
+# 模擬連到遠端 PostgreSQL 的網路往返（本機 SQLite 沒有 I/O 等待，量不出執行緒的效果）
+#
+#   gunicorn -c benchmarks/gunicorn_bench.conf.py app:app
+#   WEB_CONCURRENCY=1 GUNICORN_WORKER_CLASS=sync gunicorn -c benchmarks/gunicorn_bench.conf.py app:app   # 對照組
+import os
+import time
+
+_conf = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+exec(compile(open(_conf).read(), _conf, "exec"))
+
+_base_post_fork = post_fork  # noqa: F821  # 由 gunicorn.conf.py 定義
+accesslog = None
+
+
+def post_fork(server, worker):
+    _base_post_fork(server, worker)
+    from sqlalchemy import event
+
+    from app import app
+    from extensions import db
+
+    delay = float(os.getenv("BENCH_DB_LATENCY_MS", "2")) / 1000
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: time.sleep(delay))
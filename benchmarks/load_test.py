@@ -0,0 +1,108 @@
+# benchmarks/load_test.py
+# 本機 HTTP 壓測：多個連線持續請求常用頁面，回報吞吐量與延遲百分位
+#
+#   SQLALCHEMY_DATABASE_URI=sqlite:////tmp/load.db python benchmarks/load_test.py seed 500
+#   SQLALCHEMY_DATABASE_URI=sqlite:////tmp/load.db gunicorn app:app            # 另一個終端機
+#   python benchmarks/load_test.py run http://127.0.0.1:8000 --connections 32 --seconds 20
+import argparse
+import http.client
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PATHS = ["/recipes/", "/recipes/{id}", "/api/v1/recipes"]
+
+
+def seed(total: int):
+    os.environ.pop("DATABASE_URL", None)
+    from app import create_app
+    from extensions import db
+    from models import User, Category, Recipe, CookInstruction
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        u = User(username="load", email="load@example.com")
+        u.set_password("secret")
+        cats = [Category(name=f"分類{i}") for i in range(8)]
+        db.session.add_all([u, *cats])
+        db.session.commit()
+        db.session.execute(Recipe.__table__.insert(), [
+            dict(id=i, name=f"食譜 {i}", description="壓測用", cook_time_min=5 + i % 60,
+                 user_id=u.id, cate_id=cats[i % len(cats)].id)
+            for i in range(1, total + 1)
+        ])
+        db.session.execute(CookInstruction.__table__.insert(), [
+            dict(recipe_id=i, step=f"步驟 {k}", position=k) for i in range(1, total + 1) for k in range(3)
+        ])
+        db.session.commit()
+    print(f"已建立 {total} 道食譜")
+
+
+def run(base: str, connections: int, seconds: float, max_id: int):
+    target = urlsplit(base)
+    deadline = time.monotonic() + seconds
+    latencies, errors, lock = [], [0], threading.Lock()
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local, failed = [], 0
+        while time.monotonic() < deadline:
+            path = rng.choice(PATHS).format(id=rng.randint(1, max_id))
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+                continue
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    print(f"{'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    print(f"{len(latencies) / seconds:>8.1f} {pct(0.50):>8.1f} {pct(0.95):>8.1f} {pct(0.99):>8.1f} {errors[0]:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_seed = sub.add_parser("seed", help="在 SQLALCHEMY_DATABASE_URI 建立壓測資料")
+    p_seed.add_argument("recipes", type=int, nargs="?", default=500)
+    p_run = sub.add_parser("run", help="對執行中的伺服器壓測")
+    p_run.add_argument("base", nargs="?", default="http://127.0.0.1:8000")
+    p_run.add_argument("--connections", type=int, default=32)
+    p_run.add_argument("--seconds", type=float, default=20)
+    p_run.add_argument("--max-id", type=int, default=500, help="/recipes/<id> 隨機取 1..max-id")
+    args = parser.parse_args()
+    if args.command == "seed":
+        seed(args.recipes)
+    else:
+        run(args.base, args.connections, args.seconds, args.max_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# cache.py
+# 伺服器端快取：預設為行程內 LRU + TTL，可改用 Redis 相容伺服器（多個 worker 共用、失效同步）
+#
+#   CACHE_BACKEND=memory | redis | null
+#   CACHE_REDIS_URL=redis://localhost:6379/0
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+class MemoryBackend:
+    """行程內 LRU；每筆資料帶到期時間，讀取時順便淘汰過期項目。"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend:
+    """Redis 相容伺服器；值以 JSON 儲存，TTL 交給伺服器處理。"""
+
+    def __init__(self, url: str, prefix: str = "recipes:"):
+        try:
+            import redis
+        except ImportError as exc:  # 選用套件
+            raise RuntimeError("CACHE_BACKEND=redis 需要安裝 redis 套件（pip install redis）") from exc
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl: int):
+        self._client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + k for k in keys))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+
+class NullBackend:
+    """不快取（測試或除錯用）。"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl: int):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class Cache:
+    """快取入口：依設定選擇 backend，並依 key 的命名空間（`card:12` → card）統計命中率。"""
+
+    def __init__(self):
+        self.backend = NullBackend()
+        self.default_ttl = 300
+        self._hits = Counter()
+        self._misses = Counter()
+
+    def init_app(self, app):
+        kind = app.config.get("CACHE_BACKEND", "memory")
+        if kind == "memory":
+            self.backend = MemoryBackend(app.config.get("CACHE_MAX_ENTRIES", 2048))
+        elif kind == "redis":
+            self.backend = RedisBackend(app.config["CACHE_REDIS_URL"])
+        elif kind == "null":
+            self.backend = NullBackend()
+        else:
+            raise RuntimeError(f"未知的 CACHE_BACKEND：{kind}")
+        self.default_ttl = app.config.get("CACHE_DEFAULT_TTL", 300)
+        app.extensions["cache"] = self
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def get(self, key):
+        value = self.backend.get(key)
+        (self._misses if value is None else self._hits)[self._namespace(key)] += 1
+        return value
+
+    def set(self, key, value, ttl: int = None):
+        self.backend.set(key, value, ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def get_or_set(self, key, compute, ttl: int = None):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> dict:
+        namespaces = sorted(set(self._hits) | set(self._misses))
+        return {ns: {"hits": self._hits[ns], "misses": self._misses[ns]} for ns in namespaces}
+
+
+cache = Cache()
@@ -8,3 +8,123 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///recipes.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "false").lower() == "true"
+
+    # 資料庫連線池與逾時（見 database.py，只套用於 PostgreSQL）
+    # 每個行程最多 DB_POOL_SIZE + DB_MAX_OVERFLOW 條連線；gunicorn 的 workers × 這個數字不可超過資料庫上限
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+    # 毫秒，0 表示不限制
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "0"))
+    DB_IDLE_TX_TIMEOUT_MS = int(os.getenv("DB_IDLE_TX_TIMEOUT_MS", "0"))
+    # 讀取副本（逗號分隔，可多台）：GET 請求讀副本；寫入後 REPLICA_STICKY_SECONDS 秒內該使用者仍讀主資料庫
+    DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # 經由 PgBouncer（transaction pooling）連線：不在應用程式端保留連線池，逾時改為每個 transaction 設定
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+    # 請求量測（instrumentation.py）：Server-Timing 標頭、慢請求 log、/metrics（Prometheus）
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "false").lower() == "true"
+    INSTRUMENTATION_SLOW_MS = int(os.getenv("INSTRUMENTATION_SLOW_MS", "500"))  # 0 停用慢請求 log
+    INSTRUMENTATION_TOP_STATEMENTS = int(os.getenv("INSTRUMENTATION_TOP_STATEMENTS", "5"))
+    # /metrics、/cache/stats：以 Authorization: Bearer <METRICS_TOKEN> 抓取，或以 ADMIN_USERNAMES 中的帳號登入檢視
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    ADMIN_USERNAMES = tuple(u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip())
+    # 抽樣以 cProfile 剖析的請求比例（0 停用），結果存到 PROFILE_DIR（預設 instance/profiles）
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+    # 部署版本（模板變更時讓 ETag 失效）；Render 會提供 RENDER_GIT_COMMIT
+    RELEASE = os.getenv("RELEASE", os.getenv("RENDER_GIT_COMMIT", "dev"))
+
+    # 快取：memory（行程內 LRU + TTL，預設）/ redis（多個 worker 共用）/ null（停用）
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+
+    # 密碼雜湊（Werkzeug 格式，如 scrypt:32768:8:1、pbkdf2:sha256:600000）；
+    # 與使用者現有雜湊不同時，下次登入成功會以新參數重新雜湊
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # 已登入使用者的快取秒數（0 停用）；使用者資料變更時立即失效
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+
+    # 登入限流（權杖桶）：每個 IP / 每個帳號可連續嘗試 BURST 次，之後每分鐘補充 PER_MINUTE 次
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+    RATELIMIT_STORAGE = os.getenv("RATELIMIT_STORAGE", "memory")  # memory / redis（多個 worker 共用）
+    RATELIMIT_REDIS_URL = os.getenv("RATELIMIT_REDIS_URL", CACHE_REDIS_URL)
+    LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+    LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+    LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "5"))
+    LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "2"))
+    # 前面有幾層反向代理（Render 等平台為 1）；用來從 X-Forwarded-For 取得真正的用戶端 IP
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+    # 封面圖片：原圖與縮圖存放位置（預設 instance/media）、縮圖寬度、上傳大小上限
+    MEDIA_ROOT = os.getenv("MEDIA_ROOT")
+    IMAGE_WIDTHS = (320, 640, 1280)
+    IMAGE_THREADS = int(os.getenv("IMAGE_THREADS", "4"))
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024
+
+    # 食譜清單每頁幾張卡片；LISTING_STREAM=true 時以串流渲染（streaming.py）：表頭與篩選列先送出，
+    # 卡片邊查詢邊送出，大頁面的首位元組時間不隨卡片數增加，但沒有 ETag / 304，Server-Timing 只量到送出標頭為止
+    LISTING_PER_PAGE = int(os.getenv("LISTING_PER_PAGE", "24"))
+    LISTING_STREAM = os.getenv("LISTING_STREAM", "false").lower() == "true"
+    # 串流回應累積多少位元組送出一次；用戶端接受 gzip 時是否在應用程式端壓縮（每次送出都 sync flush）
+    STREAM_BUFFER_BYTES = int(os.getenv("STREAM_BUFFER_BYTES", "8192"))
+    STREAM_GZIP = os.getenv("STREAM_GZIP", "true").lower() == "true"
+    # 篩選面板計數（recipes/facets.py）依篩選條件快取的秒數；寫入後數字最多延遲這麼久
+    FACETS_TTL = int(os.getenv("FACETS_TTL", "60"))
+
+    # 手邊食材配對的記憶體索引：每個 worker 多久從資料庫整份重建一次（反映其他 worker 的變動）
+    PANTRY_REBUILD_SECONDS = int(os.getenv("PANTRY_REBUILD_SECONDS", "300"))
+    # 食材 / 分類名稱自動完成的記憶體索引：多久整份重建一次（更新使用次數、反映其他 worker 新增的名稱）
+    AUTOCOMPLETE_REBUILD_SECONDS = int(os.getenv("AUTOCOMPLETE_REBUILD_SECONDS", "300"))
+
+    # 相似食譜（`flask recipes rebuild-similar`）：每道食譜保留幾個鄰居、食材與評分相似度的權重、
+    # 分數下限、計算時每個區塊的相似度矩陣最多幾格（float32，4M 格約 16 MB）
+    RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "6"))
+    RECOMMEND_INGREDIENT_WEIGHT = float(os.getenv("RECOMMEND_INGREDIENT_WEIGHT", "0.7"))
+    RECOMMEND_MIN_SCORE = float(os.getenv("RECOMMEND_MIN_SCORE", "0.05"))
+    RECOMMEND_CHUNK_CELLS = int(os.getenv("RECOMMEND_CHUNK_CELLS", "4000000"))
+    # 新增 / 編輯後延後幾秒才增量更新，期間的其他編輯併成一批，只載入一次特徵矩陣
+    RECOMMEND_UPDATE_DELAY_SECONDS = int(os.getenv("RECOMMEND_UPDATE_DELAY_SECONDS", "30"))
+
+    # 背景工作佇列（`flask worker`）：同時執行數、running 工作的租約秒數、重試退避基準、完成工作保留時間
+    # JOBS_INLINE=true（沒有部署 worker 時）：enqueue 直接在請求內執行，只有 recommend.update 這類太重的工作排入佇列，
+    # 以排程執行 `flask recipes update-similar --queued` 消化並清除；部署 `flask worker` 行程後網站行程設為 false
+    JOBS_INLINE = os.getenv("JOBS_INLINE", "true").lower() == "true"
+    JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "4"))
+    JOBS_LEASE_SECONDS = int(os.getenv("JOBS_LEASE_SECONDS", "300"))
+    JOBS_RETRY_BASE_SECONDS = int(os.getenv("JOBS_RETRY_BASE_SECONDS", "10"))
+    JOBS_KEEP_DONE_SECONDS = int(os.getenv("JOBS_KEEP_DONE_SECONDS", "86400"))
+
+
+class ProductionConfig(Config):
+    """正式環境：APP_ENV=production，或在 Render 上（有 RENDER 環境變數）時自動使用。"""
+
+    # 單一查詢、等鎖、閒置 transaction 的上限，避免一個慢請求佔住 worker 與連線
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+    DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000"))
+    DB_IDLE_TX_TIMEOUT_MS = int(os.getenv("DB_IDLE_TX_TIMEOUT_MS", "60000"))
+
+    # 平台的反向代理後面：還原用戶端 IP 與 https
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+    PREFERRED_URL_SCHEME = "https"
+    SESSION_COOKIE_SECURE = True
+    REMEMBER_COOKIE_SECURE = True
+
+
+CONFIGS = {"development": Config, "production": ProductionConfig}
+
+
+def get_config():
+    env = os.getenv("APP_ENV") or ("production" if os.getenv("RENDER") else "development")
+    try:
+        return CONFIGS[env]
+    except KeyError:
+        raise RuntimeError(f"未知的 APP_ENV：{env}") from None
@@ -0,0 +1,145 @@
+# database.py
+# 資料庫引擎設定：連線池、斷線偵測與 PostgreSQL 逾時（只對 PostgreSQL 生效，SQLite 維持 SQLAlchemy 預設），
+# 以及讀取副本（read replica）路由
+#
+# 一般模式：應用程式自己保有連線池，逾時以連線參數 `options=-c statement_timeout=...` 設定，
+#           整條連線有效、不需額外往返。
+# PgBouncer 模式（DB_PGBOUNCER=true，transaction pooling）：連線池交給 PgBouncer（NullPool），
+#           PgBouncer 不接受 options 啟動參數，且每個 transaction 可能落在不同的伺服器連線上，
+#           因此改在每個 transaction 開始時以 set_config(..., is_local => true) 設定。
+#
+# 讀取副本（DATABASE_REPLICA_URLS=url1,url2）：GET / HEAD 請求的查詢送到副本（每個請求固定一台），
+# 其餘請求、flush 與 INSERT / UPDATE / DELETE、請求以外（CLI、worker）一律使用主資料庫。
+# 寫入過的使用者在 REPLICA_STICKY_SECONDS 內的讀取也留在主資料庫（read-your-writes），
+# 記錄在簽章過的 session cookie，不依賴同一個 worker。
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, Insert, Update, Delete
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+REPLICA_PREFIX = "replica:"
+_STICKY_KEY = "_db_primary_until"
+
+# 設定鍵 -> PostgreSQL 參數（毫秒，0 表示不限制）
+_TIMEOUTS = {
+    "DB_STATEMENT_TIMEOUT_MS": "statement_timeout",
+    "DB_LOCK_TIMEOUT_MS": "lock_timeout",
+    "DB_IDLE_TX_TIMEOUT_MS": "idle_in_transaction_session_timeout",
+}
+
+
+def normalize_url(url: str) -> str:
+    # 平台提供的 postgres:// 已不被 SQLAlchemy 2 接受，未指定驅動時 SQLAlchemy 2.1 又預設 psycopg 3；
+    # 一律指定 requirements.txt 安裝的 psycopg2
+    scheme, sep, rest = url.partition("://")
+    if sep and scheme in ("postgres", "postgresql"):
+        return "postgresql+psycopg2://" + rest
+    return url
+
+
+def _timeouts(config) -> dict:
+    return {param: int(config.get(key) or 0) for key, param in _TIMEOUTS.items() if config.get(key)}
+
+
+def engine_options(config) -> dict:
+    """依設定產生 create_engine 參數；非 PostgreSQL 回傳空 dict。"""
+    if not config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        return {}
+    timeouts = _timeouts(config)
+    connect_args = {
+        "connect_timeout": config.get("DB_CONNECT_TIMEOUT", 5),
+        "application_name": config.get("DB_APPLICATION_NAME", "recipe_app"),
+    }
+
+    if config.get("DB_PGBOUNCER"):
+        options = {"poolclass": NullPool, "connect_args": connect_args}
+        if timeouts:
+            options["execution_options"] = {"pg_local_settings": timeouts}
+        return options
+
+    if timeouts:
+        connect_args["options"] = " ".join(f"-c {k}={v}" for k, v in timeouts.items())
+    return {
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 5),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+        "connect_args": connect_args,
+    }
+
+
+@event.listens_for(Engine, "begin")
+def _set_local_timeouts(conn):
+    # 只有 PgBouncer 模式的引擎帶有 pg_local_settings；一次往返設定所有參數，transaction 結束即失效
+    settings = conn.get_execution_options().get("pg_local_settings")
+    if settings:
+        conn.exec_driver_sql(
+            "SELECT " + ", ".join(f"set_config('{k}', '{v}', true)" for k, v in settings.items())
+        )
+
+
+# =========================
+# 讀取副本路由
+# =========================
+class RoutingSession(Session):
+    """依請求決定主資料庫或副本；沒有設定副本時行為與 Flask-SQLAlchemy 的 Session 相同。"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._read_from_replica(clause):
+            replica = self.info.get("replica")
+            if replica is None:
+                # 同一個 session（請求）固定一台副本，前後查詢看到的資料一致
+                keys = [k for k in self._db.engines if isinstance(k, str) and k.startswith(REPLICA_PREFIX)]
+                replica = self.info["replica"] = random.choice(keys)
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_from_replica(self, clause) -> bool:
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)) or self.info.get("wrote"):
+            return False
+        if not has_request_context() or not g.get("db_read_only"):
+            return False
+        return getattr(clause, "_for_update_arg", None) is None  # SELECT ... FOR UPDATE 要鎖主資料庫
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_wrote(session, flush_context):
+    # 寫過之後，這個 session 剩下的讀取都走主資料庫
+    session.info["wrote"] = True
+    if has_request_context():
+        g.db_wrote = True
+
+
+def _route_request():
+    g.db_read_only = (
+        request.method in ("GET", "HEAD")
+        and http_session.get(_STICKY_KEY, 0) < time.time()
+    )
+
+
+def _stick_to_primary(response):
+    if g.get("db_wrote"):
+        http_session[_STICKY_KEY] = time.time() + current_app.config.get("REPLICA_STICKY_SECONDS", 5)
+    return response
+
+
+def init_app(app):
+    """必須在 db.init_app 之前呼叫（Flask-SQLAlchemy 在 init_app 時建立引擎）。"""
+    cfg = app.config
+    cfg["SQLALCHEMY_DATABASE_URI"] = normalize_url(cfg["SQLALCHEMY_DATABASE_URI"])
+    # 明確寫在 SQLALCHEMY_ENGINE_OPTIONS 的值優先
+    cfg["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options(cfg), **cfg.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+
+    replicas = [u.strip() for u in (cfg.get("DATABASE_REPLICA_URLS") or "").split(",") if u.strip()]
+    if replicas:
+        cfg["SQLALCHEMY_BINDS"] = {
+            **(cfg.get("SQLALCHEMY_BINDS") or {}),
+            **{f"{REPLICA_PREFIX}{i}": normalize_url(u) for i, u in enumerate(replicas)},
+        }
+        app.before_request(_route_request)
+        app.after_request(_stick_to_primary)
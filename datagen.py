@@ -0,0 +1,237 @@
+# datagen.py
+# 合成資料產生器：大量使用者、分類、食材、食譜（含 Need、步驟、評論與檢索文件），供本機重現效能問題
+#
+#   flask recipes generate --users 2000 --recipes 100000
+#
+# 分布：作者、分類、食材與食譜的熱門程度都依 Zipf（排名 k 的權重 1/k^s），少數熱門、多數冷門；
+# 文字以中文詞彙組合。寫入一律以 Core 批次進行（PostgreSQL 用 COPY，其他資料庫用 INSERT executemany），
+# 不經過 ORM 事件，因此評分彙總、過敏原位元遮罩與檢索文件都在這裡直接算好一起寫入。
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, text
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import User, Category, Ingredient, Recipe, Need, CookInstruction, Review, RecipeSearch, MAX_ALLERGEN_BITS
+from recipes import bulk
+import search
+
+PASSWORD = "secret"  # 產生的使用者一律使用這組密碼
+
+CATEGORY_NAMES = [
+    "主食", "湯品", "甜點", "家常菜", "便當菜", "素食", "早餐", "下酒菜", "小吃", "烘焙", "飲品", "涼拌",
+    "火鍋", "氣炸鍋", "電鍋料理", "異國料理", "減脂餐", "宴客菜", "醬料", "兒童餐",
+]
+INGREDIENT_NAMES = [
+    "雞蛋", "洋蔥", "蒜頭", "青蔥", "薑", "醬油", "米酒", "鹽", "糖", "白胡椒", "雞胸肉", "雞腿", "豬五花",
+    "梅花肉", "牛肋條", "牛絞肉", "鮭魚", "鯛魚", "蝦仁", "蛤蜊", "花枝", "豆腐", "豆干", "高麗菜", "青江菜",
+    "菠菜", "空心菜", "紅蘿蔔", "馬鈴薯", "番茄", "玉米", "香菇", "杏鮑菇", "金針菇", "九層塔", "香菜",
+    "辣椒", "花椒", "八角", "麻油", "香油", "沙拉油", "奶油", "鮮奶油", "牛奶", "起司", "麵粉", "太白粉",
+    "白米", "糯米", "麵條", "烏龍麵", "米粉", "冬粉", "年糕", "地瓜", "南瓜", "芋頭", "山藥", "蓮藕",
+    "花生", "芝麻", "核桃", "蜂蜜", "檸檬", "蘋果", "香蕉", "草莓", "芒果", "味噌", "豆瓣醬", "沙茶醬",
+    "蠔油", "烏醋", "白醋", "番茄醬", "咖哩塊", "椰奶", "培根", "火腿", "蝦米", "小魚乾", "海帶", "紫菜",
+]
+ALLERGEN_NAMES = {"雞蛋", "牛奶", "鮮奶油", "起司", "奶油", "蝦仁", "蛤蜊", "花枝", "花生", "核桃", "芝麻", "麵粉", "蝦米"}
+STYLES = ["紅燒", "清蒸", "三杯", "麻油", "糖醋", "椒鹽", "蒜香", "醬爆", "宮保", "香煎", "涼拌", "滷", "焗烤", "咖哩", "泰式", "日式"]
+DISHES = ["", "飯", "麵", "湯", "燉鍋", "丼", "炒飯", "煎餅", "沙拉", "捲"]
+DESCRIPTIONS = [
+    "家常又下飯的{a}料理，{b}吃起來特別香。",
+    "只要{t}分鐘就能上桌，忙碌的平日晚餐首選。",
+    "以{a}和{b}為主角，口味清爽不油膩。",
+    "小朋友也愛吃的{a}，可以一次多做冷凍保存。",
+    "宴客也很體面的一道菜，{b}的鮮味是關鍵。",
+]
+STEP_TEMPLATES = [
+    "{a}洗淨後切成適口大小", "{a}用少許鹽和米酒醃十分鐘", "熱鍋下油，爆香{b}", "加入{a}拌炒至表面上色",
+    "倒入醬汁，轉小火燜煮{n}分鐘", "{b}先汆燙備用", "將{a}與{b}一起下鍋翻炒均勻", "加水淹過食材，煮滾後撈去浮沫",
+    "起鍋前撒上蔥花", "以太白粉水勾芡", "放入烤箱以 200 度烤{n}分鐘", "盛盤後淋上香油即可",
+]
+UNITS = [("g", 50, 600), ("ml", 15, 500), ("大匙", 1, 4), ("小匙", 1, 3), ("顆", 1, 6), ("杯", 1, 3), ("少許", 1, 1)]
+COMMENTS = ["", "", "很好吃！", "家人都說讚", "步驟清楚，第一次做就成功", "有點太鹹了", "下次會少放一點糖", "已經做了三次"]
+RATINGS = [1, 2, 3, 4, 5]
+RATING_WEIGHTS = [5, 8, 17, 35, 35]
+
+
+# =========================
+# 分布
+# =========================
+class Zipf:
+    """在 items 上依 Zipf 分布抽樣：items 的順序即熱門排名。"""
+
+    def __init__(self, items, s: float, rng: random.Random):
+        self.items = list(items)
+        self.rng = rng
+        self.cum = list(accumulate(1.0 / (k ** s) for k in range(1, len(self.items) + 1)))
+
+    def one(self):
+        return self.rng.choices(self.items, cum_weights=self.cum)[0]
+
+    def distinct(self, k: int) -> list:
+        # k 遠小於 items 時以拒絕抽樣取不重複的 k 個
+        k = min(k, len(self.items))
+        picked = {}
+        while len(picked) < k:
+            for item in self.rng.choices(self.items, cum_weights=self.cum, k=k - len(picked)):
+                picked.setdefault(item, None)
+        return list(picked)
+
+
+# =========================
+# 輔助
+# =========================
+def _reset_sequences(*models):
+    # 以明確 id 寫入後，PostgreSQL 的序列要跟上，之後一般新增才不會撞號
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        name = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), "
+            f"(SELECT coalesce(max(id), 1) FROM \"{name}\"))"
+        ))
+
+
+def _max_id(model) -> int:
+    return db.session.query(func.coalesce(func.max(model.id), 0)).scalar()
+
+
+def _unique_names(base: list, count: int, taken: set) -> list:
+    """依序取 base 中未被使用的名稱，不夠時加上編號。"""
+    names, n = [], 0
+    while len(names) < count:
+        name = base[n % len(base)] if n < len(base) else f"{base[n % len(base)]}{n // len(base) + 1}"
+        n += 1
+        if name not in taken:
+            taken.add(name)
+            names.append(name)
+    return names
+
+
+# =========================
+# 產生
+# =========================
+def generate(users: int = 100, recipes: int = 1000, categories: int = 12, ingredients: int = 200,
+             reviews_per_recipe: float = 3.0, zipf_s: float = 1.1, seed: int = 0,
+             batch_size: int = 2000, log=print) -> dict:
+    """在目前的資料庫追加合成資料（不刪除既有資料），回傳各表新增筆數。"""
+    rng = random.Random(seed)
+    counts = dict(users=0, categories=0, ingredients=0, recipes=0, needs=0, steps=0, reviews=0)
+
+    # ---- 使用者（雜湊只算一次，所有人共用同一組密碼）
+    base_uid = _max_id(User)
+    password_hash = generate_password_hash(PASSWORD)
+    bulk.insert_many(User, [
+        dict(id=uid, username=f"gen{uid}", email=f"gen{uid}@example.com", password_hash=password_hash)
+        for uid in range(base_uid + 1, base_uid + users + 1)
+    ], batch_size)
+    counts["users"] = users
+
+    # ---- 分類
+    base_cid = _max_id(Category)
+    taken = {name for (name,) in db.session.query(Category.name)}
+    cat_rows = [
+        dict(id=base_cid + i + 1, name=name)
+        for i, name in enumerate(_unique_names(CATEGORY_NAMES, categories, taken))
+    ]
+    bulk.insert_many(Category, cat_rows, batch_size)
+    counts["categories"] = categories
+
+    # ---- 食材（過敏原直接分配空的位元，Core 寫入不會觸發 models 的分配事件）
+    base_iid = _max_id(Ingredient)
+    taken = {name for (name,) in db.session.query(Ingredient.name)}
+    used_bits = {b for (b,) in db.session.query(Ingredient.allergen_bit).filter(Ingredient.allergen_bit.isnot(None))}
+    free_bits = iter(b for b in range(MAX_ALLERGEN_BITS) if b not in used_bits)
+    ing_rows = []
+    for i, name in enumerate(_unique_names(INGREDIENT_NAMES, ingredients, taken)):
+        bit = next(free_bits, None) if name.rstrip("0123456789") in ALLERGEN_NAMES else None
+        ing_rows.append(dict(id=base_iid + i + 1, name=name, is_allergen=bit is not None, allergen_bit=bit))
+    bulk.insert_many(Ingredient, ing_rows, batch_size)
+    counts["ingredients"] = ingredients
+
+    # 抽樣母體：既有 + 新增；熱門排名隨機打亂
+    all_users = [uid for (uid,) in db.session.query(User.id)]
+    all_cats = [cid for (cid,) in db.session.query(Category.id)]
+    all_ings = db.session.query(Ingredient.id, Ingredient.name, Ingredient.allergen_bit).all()
+    for pool in (all_users, all_cats, all_ings):
+        rng.shuffle(pool)
+    authors = Zipf(all_users, zipf_s, rng)
+    reviewers = Zipf(all_users, zipf_s, rng)
+    cats = Zipf(all_cats, zipf_s, rng)
+    ings = Zipf(all_ings, zipf_s, rng)
+    ing_names = [name for _, name, _ in all_ings]
+
+    # 每道食譜的評論數依熱門排名（Zipf）分配，總數約 recipes × reviews_per_recipe
+    base_rid = _max_id(Recipe)
+    ranks = list(range(1, recipes + 1))
+    rng.shuffle(ranks)
+    weight_total = sum(1.0 / (k ** zipf_s) for k in ranks)
+    review_scale = recipes * reviews_per_recipe / weight_total if recipes else 0
+
+    now = datetime.utcnow()
+    span = timedelta(days=730)
+    step_id, review_id = _max_id(CookInstruction), _max_id(Review)
+
+    for start in range(0, recipes, batch_size):
+        recipe_rows, need_rows, step_rows, review_rows, search_rows = [], [], [], [], []
+        for offset in range(start, min(start + batch_size, recipes)):
+            rid = base_rid + offset + 1
+            chosen = ings.distinct(rng.randint(3, 12))
+            main, second = chosen[0][1], chosen[1][1]
+            name = f"{rng.choice(STYLES)}{main}{rng.choice(DISHES)}（{rid}）"
+            cook_time = max(5, min(240, int(rng.lognormvariate(3.3, 0.6))))
+            description = rng.choice(DESCRIPTIONS).format(a=main, b=second, t=cook_time)
+            created = now - span * (1 - (offset + 1) / recipes) + timedelta(seconds=rng.random() * 60)
+
+            mask = 0
+            for iid, _, bit in chosen:
+                unit, low, high = rng.choice(UNITS)
+                need_rows.append(dict(recipe_id=rid, ingredient_id=iid, quantity=rng.randint(low, high), unit=unit))
+                if bit is not None:
+                    mask |= 1 << bit
+
+            steps = [
+                rng.choice(STEP_TEMPLATES).format(a=main, b=rng.choice(ing_names), n=rng.randint(3, 30))
+                for _ in range(rng.randint(3, 10))
+            ]
+            for position, step in enumerate(steps):
+                step_id += 1
+                step_rows.append(dict(id=step_id, recipe_id=rid, step=step, position=position))
+
+            expected = review_scale / (ranks[offset] ** zipf_s)
+            n_reviews = int(expected) + (rng.random() < expected - int(expected))
+            rating_sum, picked = 0, reviewers.distinct(n_reviews)
+            for uid in picked:
+                rating = rng.choices(RATINGS, weights=RATING_WEIGHTS)[0]
+                rating_sum += rating
+                review_id += 1
+                review_rows.append(dict(id=review_id, recipe_id=rid, user_id=uid, rating=rating,
+                                        comment=rng.choice(COMMENTS)))
+
+            recipe_rows.append(dict(
+                id=rid, name=name, description=description, cook_time_min=cook_time,
+                created_at=created, updated_at=created, user_id=authors.one(), cate_id=cats.one(),
+                review_count=len(picked), rating_sum=rating_sum, allergen_mask=mask,
+            ))
+            search_rows.append(dict(
+                recipe_id=rid,
+                name_terms=search._terms(name),
+                body_terms=search._terms(description, *(n for _, n, _ in chosen), *steps),
+            ))
+
+        bulk.insert_many(Recipe, recipe_rows, batch_size)
+        bulk.insert_many(Need, need_rows, batch_size)
+        bulk.insert_many(CookInstruction, step_rows, batch_size)
+        bulk.insert_many(Review, review_rows, batch_size)
+        bulk.insert_many(RecipeSearch, search_rows, batch_size)
+        db.session.commit()
+        counts["recipes"] += len(recipe_rows)
+        counts["needs"] += len(need_rows)
+        counts["steps"] += len(step_rows)
+        counts["reviews"] += len(review_rows)
+        log(f"  食譜 {counts['recipes']}/{recipes}")
+
+    _reset_sequences(User, Category, Ingredient, Recipe, CookInstruction, Review)
+    db.session.commit()
+    return counts
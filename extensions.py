@@ -2,7 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
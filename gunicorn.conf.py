@@ -0,0 +1,62 @@
+# gunicorn.conf.py
+# 正式環境的 gunicorn 設定；gunicorn 會自動讀取工作目錄下的這個檔案，啟動指令維持 `gunicorn app:app`
+#
+# 每個請求的時間大多花在等資料庫，因此用 gthread：每個 worker 行程內有多個執行緒，
+# 等 I/O 時釋放 GIL，少量行程就能同時處理多個請求，記憶體與資料庫連線也比同數量的 sync worker 少。
+#
+#   WEB_CONCURRENCY          worker 行程數（預設 2 × 核心數 + 1，最多 12）
+#   GUNICORN_THREADS         每個 worker 的執行緒數（預設 4）
+#   GUNICORN_WORKER_CLASS    覆寫 worker 類型（sync / gthread / gevent …）
+#
+# 資料庫連線上限：workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW)，執行緒數不應大於 DB_POOL_SIZE + DB_MAX_OVERFLOW。
+#
+# 本機壓測（benchmarks/load_test.py，1 核心且壓測程式同機執行、SQLite、500 道食譜，
+# 32 個連線持續 20 秒，混合 /recipes/、/recipes/<id>、/api/v1/recipes）：
+#
+#   查詢延遲   設定                                   req/s   p50 ms   p99 ms
+#   0 ms      預設（1 個 sync worker）                 307     102      147
+#   0 ms      本檔（3 workers × 4 threads, gthread）    206      66      691
+#   2 ms      預設（1 個 sync worker）                 131     237      356
+#   2 ms      3 個 sync worker                         209     152      313
+#   2 ms      本檔（3 workers × 4 threads, gthread）    215      69      602
+#
+# 查詢延遲 2 ms 以 benchmarks/gunicorn_bench.conf.py 在每個查詢前等待，模擬遠端 PostgreSQL 的往返。
+# 本機 SQLite 沒有 I/O 等待時整個請求都在吃 CPU，單核心上多行程、多執行緒只增加切換成本；
+# 資料庫在網路另一端時吞吐量提高約 1.6 倍、中位數延遲降到約 1/3。p99 變高是單核心同時排程
+# 12 個執行緒與壓測程式的結果，多核心機器上 workers 隨核心數增加即可攤開。
+import multiprocessing
+import os
+
+cores = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * cores + 1, 12)))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# 主行程先載入 app 再 fork：啟動較快、共用唯讀記憶體；資料庫連線則在 post_fork 丟棄重建
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5  # 平台的負載平衡器會重複使用連線
+# 定期重啟 worker，避免長時間執行的記憶體成長；jitter 讓各 worker 不同時重啟
+max_requests = 5000
+max_requests_jitter = 500
+# 心跳檔放在記憶體檔案系統，避免磁碟 I/O 卡住時 worker 被誤判逾時
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # preload 時主行程可能已建立連線；fork 後不可共用同一條 socket，丟棄後由各 worker 自行連線。
+    # db.engines 包含預設 engine 與 DATABASE_REPLICA_URLS 的讀取副本（database.py）
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,108 @@
+# http_cache.py
+# HTTP 條件式請求（ETag / Last-Modified / 304）與靜態檔內容雜湊網址
+import hashlib
+import json
+import os
+from datetime import timezone
+
+from flask import current_app, request, session
+from flask_login import current_user
+
+# 帶 ?v=<內容雜湊> 的靜態檔內容永遠不變，可以讓瀏覽器 / CDN 快取一年
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+_static_hashes = {}
+
+
+def page_etag(*parts) -> str:
+    """頁面的強 ETag：內容版本 + 目前使用者（導覽列會顯示使用者名稱）+ 部署版本。"""
+    viewer = current_user.get_id() if current_user.is_authenticated else "anon"
+    payload = json.dumps(
+        [current_app.config.get("RELEASE", ""), viewer, *parts],
+        default=str, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _as_utc(dt):
+    return dt.replace(tzinfo=timezone.utc, microsecond=0) if dt.tzinfo is None else dt
+
+
+def is_not_modified(etag: str, last_modified=None) -> bool:
+    """依 If-None-Match（優先）或 If-Modified-Since 判斷是否可以回 304。
+
+    有待顯示的 flash 訊息時一律回完整頁面。
+    """
+    if session.get("_flashes"):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def not_modified_response(etag: str, last_modified=None):
+    resp = current_app.response_class(status=304)
+    return with_validators(resp, etag, last_modified)
+
+
+def with_validators(resp, etag, last_modified=None):
+    # etag 為 None：內容事先無法得知（串流回應），只設定快取政策
+    if etag is not None:
+        resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = _as_utc(last_modified)
+    # 內容依登入狀態而不同：登入者只給瀏覽器快取，匿名頁面可給 CDN，但每次都要重新驗證
+    resp.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        resp.cache_control.private = True
+    else:
+        resp.cache_control.public = True
+    resp.vary.add("Cookie")
+    return resp
+
+
+# =========================
+# 靜態檔：url_for('static', ...) 自動加上內容雜湊
+# =========================
+def _static_hash(filename: str):
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    _static_hashes[path] = (mtime, digest)
+    return digest
+
+
+def _add_static_version(endpoint, values):
+    if endpoint == "static" and "v" not in values and "filename" in values:
+        digest = _static_hash(values["filename"])
+        if digest:
+            values["v"] = digest
+
+
+def _static_cache_headers(resp):
+    # 只有版本號與目前內容相符時才給長期快取，避免舊網址快取到新內容
+    if (
+        request.endpoint == "static"
+        and resp.status_code == 200
+        and request.args.get("v")
+        and request.args["v"] == _static_hash(request.view_args["filename"])
+    ):
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = STATIC_MAX_AGE
+        resp.cache_control.immutable = True
+    return resp
+
+
+def init_app(app):
+    app.url_defaults(_add_static_version)
+    app.after_request(_static_cache_headers)
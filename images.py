@@ -0,0 +1,173 @@
+# images.py
+# 食譜封面：上傳串流寫入磁碟、原圖以內容雜湊命名，縮圖（WebP，多種寬度）由背景工作以執行緒池產生
+#
+#   <MEDIA_ROOT>/originals/<key>           原圖（key = sha256 前 32 碼）
+#   <MEDIA_ROOT>/thumbs/<key>-<width>.webp 縮圖
+#   GET /media/<key>/<width>.webp           檔名由內容決定、永不改變 → immutable 長期快取
+#
+# 縮圖尚未產生（worker 還沒跑到）時，請求當下補產生，網址一律可用。
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, Request, abort, current_app, send_file, url_for
+
+from http_cache import STATIC_MAX_AGE
+
+media_bp = Blueprint("media", __name__)
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+_KEY = re.compile(r"^[0-9a-f]{32}$")
+_CHUNK = 64 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pil():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as exc:  # 選用套件
+        raise RuntimeError("封面上傳需要安裝 Pillow（pip install Pillow）") from exc
+    return Image, ImageOps
+
+
+def _media_dir(*parts) -> str:
+    path = os.path.join(current_app.config["MEDIA_ROOT"], *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def original_path(key: str) -> str:
+    return os.path.join(_media_dir("originals"), key)
+
+
+def thumbnail_path(key: str, width: int) -> str:
+    return os.path.join(_media_dir("thumbs"), f"{key}-{width}.webp")
+
+
+class MediaRequest(Request):
+    """上傳的檔案一律直接寫到 MEDIA_ROOT/tmp 的暫存檔，不在記憶體中緩衝。"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.TemporaryFile("wb+", dir=_media_dir("tmp"))
+
+
+# =========================
+# 上傳
+# =========================
+def store_upload(file_storage) -> str:
+    """把上傳檔分塊寫入磁碟並計算雜湊，確認是支援的圖片後回傳 key；不是圖片時丟 ValueError。"""
+    Image, _ = _pil()
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=_media_dir("tmp"))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file_storage.stream.read(_CHUNK), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        try:
+            with Image.open(tmp_path) as im:
+                fmt = im.format
+                im.verify()  # 只檢查檔頭與結構，不解碼整張圖
+        except Exception as exc:
+            raise ValueError("不是可辨識的圖片檔") from exc
+        if fmt not in ALLOWED_FORMATS:
+            raise ValueError(f"不支援的圖片格式：{fmt}")
+
+        key = digest.hexdigest()[:32]
+        dest = original_path(key)
+        if os.path.exists(dest):
+            os.remove(tmp_path)  # 相同內容已上傳過
+        else:
+            os.replace(tmp_path, dest)
+        return key
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# =========================
+# 縮圖
+# =========================
+def widths() -> tuple:
+    return tuple(current_app.config.get("IMAGE_WIDTHS", (320, 640, 1280)))
+
+
+def make_thumbnail(key: str, width: int) -> str:
+    """產生單一寬度的 WebP 縮圖（不放大），先寫暫存檔再改名，並行產生同一張也安全。"""
+    Image, ImageOps = _pil()
+    dest = thumbnail_path(key, width)
+    if os.path.exists(dest):
+        return dest
+    with Image.open(original_path(key)) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB")
+        if im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        fd, tmp_path = tempfile.mkstemp(dir=_media_dir("tmp"), suffix=".webp")
+        with os.fdopen(fd, "wb") as out:
+            im.save(out, "WEBP", quality=current_app.config.get("IMAGE_WEBP_QUALITY", 80), method=4)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def _executor() -> ThreadPoolExecutor:
+    # Pillow 在縮放與編碼時會釋放 GIL，執行緒池即可平行處理
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=current_app.config.get("IMAGE_THREADS", 4), thread_name_prefix="thumb"
+            )
+        return _pool
+
+
+def generate_thumbnails(key: str) -> list:
+    """以執行緒池同時產生所有寬度的縮圖。"""
+    app = current_app._get_current_object()
+
+    def run(width):
+        with app.app_context():
+            return make_thumbnail(key, width)
+
+    return list(_executor().map(run, widths()))
+
+
+# =========================
+# 模板與路由
+# =========================
+@media_bp.app_template_global()
+def cover_srcset(key: str) -> str:
+    return ", ".join(f"{url_for('media.thumbnail', key=key, width=w)} {w}w" for w in widths())
+
+
+@media_bp.app_template_global()
+def cover_src(key: str, width: int = 640) -> str:
+    # 預設圖：不大於 width 的最大寬度
+    available = [w for w in widths() if w <= width] or [min(widths())]
+    return url_for("media.thumbnail", key=key, width=max(available))
+
+
+@media_bp.route("/<key>/<int:width>.webp")
+def thumbnail(key: str, width: int):
+    if not _KEY.match(key) or width not in widths() or not os.path.exists(original_path(key)):
+        abort(404)
+    path = make_thumbnail(key, width)
+    resp = send_file(path, mimetype="image/webp", conditional=True)
+    resp.cache_control.no_cache = None
+    resp.cache_control.public = True
+    resp.cache_control.max_age = STATIC_MAX_AGE
+    resp.cache_control.immutable = True
+    return resp
+
+
+def init_app(app):
+    if not app.config.get("MEDIA_ROOT"):
+        app.config["MEDIA_ROOT"] = os.path.join(app.instance_path, "media")
+    app.request_class = MediaRequest
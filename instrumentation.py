@@ -0,0 +1,305 @@
+# instrumentation.py
+# 請求層級的量測（INSTRUMENTATION_ENABLED=true 時才啟用）：
+#
+#   - 每個請求記錄總時間、模板渲染時間、SQL 數量與總時間，以 Server-Timing 標頭回傳（瀏覽器開發者工具可看）
+#   - 最慢的幾個 SQL 以「指紋」（常數與參數換成 ?、IN 清單縮成一個）彙整；請求超過 INSTRUMENTATION_SLOW_MS 時寫入 log
+#   - 依 endpoint 彙整 p50 / p95 / p99，GET /metrics 以 Prometheus 文字格式輸出（限管理者或 METRICS_TOKEN）
+#   - PROFILE_SAMPLE_RATE > 0 時依比例抽樣以 cProfile 剖析請求，結果存到 PROFILE_DIR/*.prof
+#
+# 統計存在各個 worker 行程的記憶體中，/metrics 的每一列帶 worker（pid）標籤，由 Prometheus 彙總。
+import cProfile
+import heapq
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from flask import (
+    Blueprint, Response, abort, current_app, g, has_request_context, request,
+    before_render_template, template_rendered,
+)
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+metrics_bp = Blueprint("metrics", __name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1024          # 每個 endpoint 保留最近幾筆樣本計算百分位
+MAX_FINGERPRINTS = 200  # /metrics 輸出的 SQL 指紋上限（依總時間取前幾名）
+
+_enabled = False
+_profile_lock = threading.Lock()  # cProfile 同時只能有一個在執行
+
+
+# =========================
+# SQL 指紋
+# =========================
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\([^)]+\)s|%s|\$\d+|(?<!:):\w+|\?|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """把常數與參數換成 ?，IN (?, ?, ...) 縮成 IN (...)，讓同一種查詢歸成一類。"""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+# =========================
+# 彙整
+# =========================
+class Summary:
+    """Prometheus summary：每組標籤保留最近 WINDOW 筆計算百分位，另記總和與次數。"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [deque(maxlen=WINDOW), 0.0, 0]
+            series[0].append(value)
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {labels: (sorted(s[0]), s[1], s[2]) for labels, s in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+REQUEST_SECONDS = Summary("recipe_request_duration_seconds", "請求總時間")
+SQL_SECONDS = Summary("recipe_request_sql_seconds", "每個請求的 SQL 總時間")
+SQL_QUERIES = Summary("recipe_request_sql_queries", "每個請求的 SQL 數量")
+TEMPLATE_SECONDS = Summary("recipe_request_template_seconds", "每個請求的模板渲染時間")
+SUMMARIES = (REQUEST_SECONDS, SQL_SECONDS, SQL_QUERIES, TEMPLATE_SECONDS)
+
+# 指紋 -> [次數, 總秒數, 最長秒數]
+_statements = {}
+_statements_lock = threading.Lock()
+
+
+def _record_statement(fp: str, seconds: float):
+    with _statements_lock:
+        stats = _statements.get(fp)
+        if stats is None:
+            stats = _statements[fp] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+
+def reset():
+    for summary in SUMMARIES:
+        summary.clear()
+    with _statements_lock:
+        _statements.clear()
+
+
+# =========================
+# SQL 事件
+# =========================
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _enabled:
+        conn.info.setdefault("instrument_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not _enabled:
+        return
+    starts = conn.info.get("instrument_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    fp = fingerprint(statement)
+    _record_statement(fp, elapsed)
+    if has_request_context():
+        stats = g.get("instrument")
+        if stats is not None:
+            stats.add_statement(fp, elapsed)
+
+
+# =========================
+# 請求
+# =========================
+class RequestStats:
+    __slots__ = ("start", "sql_count", "sql_seconds", "template_seconds", "slowest", "_render_starts", "profiler")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.slowest = []  # 最慢的幾個 (秒數, 指紋)，min-heap
+        self._render_starts = []
+        self.profiler = None
+
+    def add_statement(self, fp: str, seconds: float):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        keep = current_app.config.get("INSTRUMENTATION_TOP_STATEMENTS", 5)
+        if len(self.slowest) < keep:
+            heapq.heappush(self.slowest, (seconds, fp))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, fp))
+
+
+def _on_before_render(sender, template, context, **extra):
+    stats = g.get("instrument")
+    if stats is not None:
+        stats._render_starts.append(time.perf_counter())
+
+
+def _on_rendered(sender, template, context, **extra):
+    stats = g.get("instrument")
+    if stats is not None and stats._render_starts:
+        elapsed = time.perf_counter() - stats._render_starts.pop()
+        if not stats._render_starts:  # 巢狀渲染只算最外層
+            stats.template_seconds += elapsed
+
+
+def _start_request():
+    stats = g.instrument = RequestStats()
+    rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    if rate and random.random() < rate and _profile_lock.acquire(blocking=False):
+        stats.profiler = cProfile.Profile()
+        stats.profiler.enable()
+
+
+def _finish_request(response):
+    stats = g.pop("instrument", None)
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.start
+    if stats.profiler is not None:
+        _save_profile(stats.profiler)
+
+    endpoint = request.endpoint or "unmatched"
+    labels = (endpoint, request.method)
+    REQUEST_SECONDS.observe(labels, total)
+    SQL_SECONDS.observe(labels, stats.sql_seconds)
+    SQL_QUERIES.observe(labels, stats.sql_count)
+    TEMPLATE_SECONDS.observe(labels, stats.template_seconds)
+
+    response.headers.add(
+        "Server-Timing",
+        f'app;dur={total * 1000:.1f}, db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries", '
+        f"tpl;dur={stats.template_seconds * 1000:.1f}",
+    )
+
+    slow_ms = current_app.config.get("INSTRUMENTATION_SLOW_MS", 500)
+    if slow_ms and total * 1000 >= slow_ms:
+        top = "\n".join(f"  {s * 1000:8.1f} ms  {fp}" for s, fp in sorted(stats.slowest, reverse=True))
+        current_app.logger.warning(
+            "slow request %s %s %.0f ms（SQL %d 筆 %.0f ms、模板 %.0f ms）\n%s",
+            request.method, request.full_path.rstrip("?"), total * 1000,
+            stats.sql_count, stats.sql_seconds * 1000, stats.template_seconds * 1000, top,
+        )
+    return response
+
+
+def _discard_profiler(exc):
+    # 請求途中出錯、after_request 沒有執行時，也要停掉 profiler 並釋放鎖
+    stats = g.pop("instrument", None)
+    if stats is not None and stats.profiler is not None:
+        stats.profiler.disable()
+        _profile_lock.release()
+
+
+def _save_profile(profiler):
+    try:
+        profiler.disable()
+        directory = current_app.config["PROFILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        name = f"{(request.endpoint or 'unmatched').replace('.', '_')}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(directory, name))
+    finally:
+        _profile_lock.release()
+
+
+# =========================
+# /metrics
+# =========================
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_metrics() -> str:
+    worker = os.getpid()
+    lines = []
+    for summary in SUMMARIES:
+        lines += [f"# HELP {summary.name} {summary.help}", f"# TYPE {summary.name} summary"]
+        for (endpoint, method), (values, total, count) in sorted(summary.snapshot().items()):
+            base = dict(endpoint=endpoint, method=method, worker=worker)
+            for q in QUANTILES:
+                lines.append(f"{summary.name}{_labels(**base, quantile=q)} {percentile(values, q):.6g}")
+            lines.append(f"{summary.name}_sum{_labels(**base)} {total:.6g}")
+            lines.append(f"{summary.name}_count{_labels(**base)} {count}")
+
+    with _statements_lock:
+        top = sorted(_statements.items(), key=lambda item: item[1][1], reverse=True)[:MAX_FINGERPRINTS]
+    for name, index, help_text, kind in (
+        ("recipe_sql_statement_seconds_total", 1, "各 SQL 指紋累計時間", "counter"),
+        ("recipe_sql_statements_total", 0, "各 SQL 指紋執行次數", "counter"),
+        ("recipe_sql_statement_max_seconds", 2, "各 SQL 指紋單次最長時間", "gauge"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(fingerprint=fp, worker=worker)} {stats[index]:.6g}" for fp, stats in top]
+    return "\n".join(lines) + "\n"
+
+
+def authorized() -> bool:
+    """METRICS_TOKEN 或 ADMIN_USERNAMES 中的登入帳號；/metrics 與 /cache/stats 共用。"""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") == f"Bearer {token}":
+        return True
+    admins = current_app.config.get("ADMIN_USERNAMES", ())
+    return current_user.is_authenticated and current_user.username in admins
+
+
+@metrics_bp.route("/metrics")
+def metrics():
+    if not authorized():
+        abort(404)  # 不透露端點存在
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_app(app):
+    global _enabled
+    if not app.config.get("INSTRUMENTATION_ENABLED"):
+        return
+    _enabled = True
+    if not app.config.get("PROFILE_DIR"):
+        app.config["PROFILE_DIR"] = os.path.join(app.instance_path, "profiles")
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_discard_profiler)
+    app.register_blueprint(metrics_bp)
@@ -0,0 +1,254 @@
+# jobs.py
+# 背景工作佇列：工作存放在既有資料庫的 job 表，由 `flask worker` 取出執行
+#
+#   jobs.enqueue("search.reindex", recipe_id=12)   # 與食譜寫入同一個 transaction，commit 後才看得到
+#   flask worker --concurrency 4                    # 常駐執行；--burst 清空佇列後結束
+#
+# 沒有部署 worker 時（JOBS_INLINE=true，預設）enqueue 直接在目前的 transaction 內執行處理函式，
+# 失敗則 rollback 到 savepoint 並改排入佇列；註冊時 inline=False 的工作（太重，不在請求內執行）一律排入佇列。
+# （recommend.update 由排程的 `flask recipes update-similar --queued` 消化，它同時清除已完成的工作）
+# 部署了 `flask worker` 行程後，網站行程設 JOBS_INLINE=false，全部交給 worker。
+#
+# 取工作：PostgreSQL 以 SELECT ... FOR UPDATE SKIP LOCKED，多個 worker 互不阻擋；
+# SQLite 不支援列鎖，改以單一 UPDATE ... WHERE status = 'queued' 認領（SQLite 寫入本來就是序列化的）。
+# 執行失敗依指數退避重試，超過 max_attempts 標記為 failed；worker 中斷留下的 running 工作逾時後重新認領。
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import or_, update, delete
+
+from extensions import db
+from models import Job
+
+HANDLERS = {}
+_QUEUE_ONLY = set()  # inline=False 的工作類型
+
+
+def handler(kind: str, inline: bool = True):
+    """註冊工作處理函式：@jobs.handler("search.reindex")；inline=False 表示 JOBS_INLINE 時也只排入佇列。"""
+    def register(fn):
+        HANDLERS[kind] = fn
+        if not inline:
+            _QUEUE_ONLY.add(kind)
+        return fn
+    return register
+
+
+def enqueue(kind: str, max_attempts: int = 5, delay: int = 0, **payload):
+    """把工作加入目前的 session；呼叫端負責 commit（與觸發它的寫入一起提交）。
+
+    delay：延後幾秒才可認領，讓處理函式有機會以 take_queued 把這段時間內的同類工作併成一批。
+    JOBS_INLINE 時直接執行，成功回傳 None，否則回傳排入佇列的 Job。
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"未註冊的工作類型：{kind}")
+    if current_app.config.get("JOBS_INLINE", True) and kind not in _QUEUE_ONLY and _run_inline(kind, payload):
+        return None
+    job = Job(kind=kind, payload=payload, max_attempts=max_attempts)
+    if delay:
+        job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+    db.session.add(job)
+    return job
+
+
+def _run_inline(kind: str, payload: dict) -> bool:
+    try:
+        with db.session.begin_nested():
+            HANDLERS[kind](**payload)
+    except Exception:
+        current_app.logger.exception("工作 %s 直接執行失敗，改排入佇列", kind)
+        return False
+    return True
+
+
+def take_queued(kind: str) -> list:
+    """在處理函式內呼叫：把同類型、仍在排隊（含尚未到期）的工作併入目前的工作，回傳它們的 payload。
+
+    這些工作標記為 done 的更新與處理結果在同一個 transaction：處理失敗 rollback 後它們仍在佇列中。
+    PostgreSQL 以 FOR UPDATE SKIP LOCKED 略過其他 worker 正在認領的列。
+    """
+    taken = db.select(Job.id, Job.payload).where(Job.kind == kind, Job.status == "queued")
+    if db.session.get_bind().dialect.name == "postgresql":
+        taken = taken.with_for_update(skip_locked=True)
+    rows = db.session.execute(taken).all()
+    if not rows:
+        return []
+    db.session.execute(
+        update(Job)
+        .where(Job.id.in_([job_id for job_id, _ in rows]), Job.status == "queued")
+        .values(status="done", last_error=None),
+        execution_options={"synchronize_session": False},
+    )
+    return [payload for _, payload in rows]
+
+
+# =========================
+# 認領 / 完成 / 重試
+# =========================
+def _claimable(now, lease: int):
+    # 到期的 queued 工作，或 worker 中斷後租約逾時的 running 工作
+    return or_(
+        (Job.status == "queued") & (Job.run_at <= now),
+        (Job.status == "running") & (Job.locked_at < now - timedelta(seconds=lease)),
+    )
+
+
+def claim(worker_id: str, limit: int, lease: int = 300) -> list:
+    """認領最多 limit 筆工作，回傳 [(id, kind, payload, token), ...]；token 用來確認完成時租約仍屬於自己。"""
+    now = datetime.utcnow()
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    candidates = (
+        db.select(Job.id)
+        .where(_claimable(now, lease))
+        .order_by(Job.run_at, Job.id)
+        .limit(limit)
+    )
+    if db.session.get_bind().dialect.name == "postgresql":
+        ids = db.session.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+        condition = Job.id.in_(ids) if ids else None
+    else:
+        # 子查詢與 UPDATE 在同一個敘述內，狀態條件再檢查一次，不會重複認領
+        condition = Job.id.in_(candidates.scalar_subquery()) & _claimable(now, lease)
+    if condition is None:
+        db.session.commit()
+        return []
+    db.session.execute(
+        update(Job)
+        .where(condition)
+        .values(status="running", locked_by=token, locked_at=now, attempts=Job.attempts + 1),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    rows = db.session.execute(
+        db.select(Job.id, Job.kind, Job.payload)
+        .where(Job.locked_by == token, Job.status == "running")
+        .order_by(Job.run_at, Job.id)
+    ).all()
+    db.session.commit()
+    return [(*r, token) for r in rows]
+
+
+def _finish(job_id: int, token: str, **values):
+    # 只在租約仍屬於自己時寫入：執行超過租約、已被其他 worker 重新認領的工作不覆寫對方的狀態
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == token)
+        .values(locked_by=None, locked_at=None, **values),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+
+
+def run_job(job_id: int, kind: str, payload: dict, token: str, retry_base: int = 10):
+    """執行一筆已認領的工作（需在 app context 內）；token 為 claim 回傳的認領憑證。"""
+    try:
+        HANDLERS[kind](**payload)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+        attempts, max_attempts = db.session.execute(
+            db.select(Job.attempts, Job.max_attempts).where(Job.id == job_id)
+        ).one()
+        if attempts >= max_attempts:
+            _finish(job_id, token, status="failed", last_error=error)
+        else:
+            delay = min(retry_base * 2 ** (attempts - 1), 3600)
+            _finish(
+                job_id, token, status="queued", last_error=error,
+                run_at=datetime.utcnow() + timedelta(seconds=delay),
+            )
+        return False
+    _finish(job_id, token, status="done", last_error=None)
+    return True
+
+
+def prune(keep_seconds: int) -> int:
+    """刪除建立超過 keep_seconds 且已完成的工作（failed 保留供檢查）。"""
+    cutoff = datetime.utcnow() - timedelta(seconds=keep_seconds)
+    result = db.session.execute(
+        delete(Job).where(Job.status == "done", Job.created_at < cutoff),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def stats() -> dict:
+    rows = db.session.execute(db.select(Job.status, db.func.count()).group_by(Job.status))
+    return {status: n for status, n in rows}
+
+
+# =========================
+# worker
+# =========================
+def run_worker(app, concurrency: int, burst: bool = False, poll_interval: float = 1.0, log=print):
+    """主執行緒負責認領，執行緒池執行工作；每個工作在自己的 app context（獨立 session）內執行。"""
+    cfg = app.config
+    lease = cfg.get("JOBS_LEASE_SECONDS", 300)
+    retry_base = cfg.get("JOBS_RETRY_BASE_SECONDS", 10)
+    keep = cfg.get("JOBS_KEEP_DONE_SECONDS", 86400)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        log("收到停止訊號，等待執行中的工作完成…")
+        stopping.set()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+    def execute(job):
+        with app.app_context():
+            ok = run_job(*job, retry_base=retry_base)
+        log(f"job {job[0]} {job[1]} {'done' if ok else 'failed'}")
+
+    running = set()
+    last_prune = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as pool:
+        while not stopping.is_set():
+            claimed = []
+            free = concurrency - len(running)
+            if free:
+                with app.app_context():
+                    claimed = claim(worker_id, free, lease)
+                    if time.monotonic() - last_prune > 3600:
+                        prune(keep)
+                        last_prune = time.monotonic()
+            running.update(pool.submit(execute, job) for job in claimed)
+
+            if running:
+                finished, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                running -= finished
+                for future in finished:
+                    if future.exception() is not None:  # 例如標記結果時資料庫連線中斷；租約逾時後會重新認領
+                        log(f"worker error: {future.exception()!r}")
+            elif claimed:
+                continue
+            elif burst:
+                break
+            else:
+                stopping.wait(poll_interval)
+        wait(running)
+
+
+def init_app(app):
+    @app.cli.command("worker")
+    @click.option("--concurrency", type=int, default=None, help="同時執行的工作數（預設 JOBS_CONCURRENCY）")
+    @click.option("--burst", is_flag=True, help="佇列清空後結束（部署腳本、開發時使用）")
+    @click.option("--poll-interval", type=float, default=1.0, show_default=True, help="佇列為空時的輪詢間隔（秒）")
+    def worker(concurrency, burst, poll_interval):
+        """執行背景工作佇列。"""
+        concurrency = concurrency or app.config.get("JOBS_CONCURRENCY", 4)
+        click.echo(f"worker 啟動（concurrency={concurrency}）")
+        run_worker(app, concurrency, burst=burst, poll_interval=poll_interval, log=click.echo)
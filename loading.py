@@ -0,0 +1,30 @@
+# loading.py
+# 載入策略：依頁面用途預先載入關聯，避免模板逐筆觸發 lazy load（N+1）
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Recipe, Review
+
+# card：清單卡片只需要分類徽章（評分已由 Recipe 彙總欄位提供）
+# detail：詳細頁顯示分類、作者與步驟
+# edit：編輯表單回填分類與步驟
+PROFILES = {
+    "card": (
+        joinedload(Recipe.category),
+    ),
+    "detail": (
+        joinedload(Recipe.category),
+        joinedload(Recipe.author),
+        selectinload(Recipe.steps),
+    ),
+    "edit": (
+        joinedload(Recipe.category),
+        selectinload(Recipe.steps),
+    ),
+}
+
+# 評論清單連同留言者一起載入
+REVIEW_WITH_USER = (joinedload(Review.user),)
+
+
+def load_profile(name: str):
+    return PROFILES[name]
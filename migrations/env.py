@@ -45,6 +45,17 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# search.py 在 SQLite 建立的 FTS5 虛擬表與其影子表（_data / _idx / _config / _docsize）
+# 由 migration 以 SQL 建立、不在 models 裡；autogenerate 比對時略過，否則會產生刪除搜尋索引的 migration
+FTS_TABLE_PREFIX = 'recipe_search_fts'
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith(FTS_TABLE_PREFIX):
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +76,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -93,6 +105,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
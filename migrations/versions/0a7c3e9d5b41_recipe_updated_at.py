@@ -0,0 +1,29 @@
+"""recipe updated_at
+
+Revision ID: 0a7c3e9d5b41
+Revises: f5b1d8c3e274
+Create Date: 2026-10-18 19:16:42.671930
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0a7c3e9d5b41"
+down_revision = "f5b1d8c3e274"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("recipe", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP"))
+        )
+
+    # 既有食譜以建立時間作為最後修改時間
+    op.execute("UPDATE recipe SET updated_at = created_at")
+
+
+def downgrade():
+    with op.batch_alter_table("recipe", schema=None) as batch_op:
+        batch_op.drop_column("updated_at")
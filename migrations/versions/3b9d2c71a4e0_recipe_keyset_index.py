@@ -0,0 +1,23 @@
+"""recipe keyset pagination index
+
+Revision ID: 3b9d2c71a4e0
+Revises: fe7e026c3b42
+Create Date: 2026-10-18 10:12:04.512337
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3b9d2c71a4e0"
+down_revision = "fe7e026c3b42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 游標分頁依 (created_at, id) 排序與比較
+    op.create_index("ix_recipe_created_at_id", "recipe", ["created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_recipe_created_at_id", table_name="recipe")
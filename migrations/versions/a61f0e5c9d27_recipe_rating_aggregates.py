@@ -0,0 +1,35 @@
+"""recipe rating aggregates
+
+Revision ID: a61f0e5c9d27
+Revises: 3b9d2c71a4e0
+Create Date: 2026-10-18 11:02:47.903114
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a61f0e5c9d27"
+down_revision = "3b9d2c71a4e0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("recipe", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("review_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("rating_sum", sa.Integer(), nullable=False, server_default="0"))
+
+    # 回填既有評論的彙總
+    op.execute(
+        """
+        UPDATE recipe SET
+            review_count = (SELECT COUNT(*) FROM review WHERE review.recipe_id = recipe.id),
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM review WHERE review.recipe_id = recipe.id)
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("recipe", schema=None) as batch_op:
+        batch_op.drop_column("rating_sum")
+        batch_op.drop_column("review_count")
@@ -0,0 +1,67 @@
+"""recipe allergen mask
+
+Revision ID: b8d2e6f1a347
+Revises: 0a7c3e9d5b41
+Create Date: 2026-10-18 20:02:13.584120
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b8d2e6f1a347"
+down_revision = "0a7c3e9d5b41"
+branch_labels = None
+depends_on = None
+
+MAX_ALLERGEN_BITS = 63
+
+
+def _restore_lower_name_index():
+    # SQLite 的 batch 模式會重建 ingredient 表，反射不到運算式索引（e2c94a7b1f58 的 lower(name)），重建後要補回；
+    # PostgreSQL 直接 ALTER TABLE，索引不受影響
+    if op.get_bind().dialect.name == "sqlite":
+        op.create_index("ix_ingredient_name_lower", "ingredient", [sa.text("lower(name)")])
+
+
+def upgrade():
+    with op.batch_alter_table("ingredient", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("allergen_bit", sa.SmallInteger(), nullable=True))
+        batch_op.create_unique_constraint("uq_ingredient_allergen_bit", ["allergen_bit"])
+    _restore_lower_name_index()
+
+    with op.batch_alter_table("recipe", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("allergen_mask", sa.BigInteger(), nullable=False, server_default="0")
+        )
+
+    # 既有過敏原依 id 順序分配位元，再逐一把位元併入含該食材的食譜
+    conn = op.get_bind()
+    allergen_ids = [
+        iid for (iid,) in conn.execute(
+            sa.text("SELECT id FROM ingredient WHERE is_allergen ORDER BY id")
+        )
+    ]
+    if len(allergen_ids) > MAX_ALLERGEN_BITS:
+        raise RuntimeError(f"過敏原最多 {MAX_ALLERGEN_BITS} 種，目前有 {len(allergen_ids)} 種")
+    for bit, iid in enumerate(allergen_ids):
+        conn.execute(
+            sa.text("UPDATE ingredient SET allergen_bit = :bit WHERE id = :iid"),
+            {"bit": bit, "iid": iid},
+        )
+        conn.execute(
+            sa.text(
+                "UPDATE recipe SET allergen_mask = allergen_mask | :flag "
+                "WHERE id IN (SELECT recipe_id FROM need WHERE ingredient_id = :iid)"
+            ),
+            {"flag": 1 << bit, "iid": iid},
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("recipe", schema=None) as batch_op:
+        batch_op.drop_column("allergen_mask")
+
+    with op.batch_alter_table("ingredient", schema=None) as batch_op:
+        batch_op.drop_constraint("uq_ingredient_allergen_bit", type_="unique")
+        batch_op.drop_column("allergen_bit")
+    _restore_lower_name_index()
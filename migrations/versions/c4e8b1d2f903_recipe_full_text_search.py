@@ -0,0 +1,69 @@
+"""recipe full text search
+
+Revision ID: c4e8b1d2f903
+Revises: a61f0e5c9d27
+Create Date: 2026-10-18 13:40:18.226905
+
+升級後執行 `flask recipes reindex-search` 為既有食譜建立檢索文件。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c4e8b1d2f903"
+down_revision = "a61f0e5c9d27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "recipe_search",
+        sa.Column("recipe_id", sa.Integer(), nullable=False),
+        sa.Column("name_terms", sa.Text(), nullable=False),
+        sa.Column("body_terms", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("recipe_id"),
+    )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            "CREATE INDEX ix_recipe_search_tsv ON recipe_search USING gin ("
+            "(setweight(to_tsvector('simple', name_terms), 'A') || "
+            "setweight(to_tsvector('simple', body_terms), 'B')))"
+        )
+    elif dialect == "sqlite":
+        # FTS5 外部內容表，由觸發器與 recipe_search 同步
+        op.execute(
+            "CREATE VIRTUAL TABLE recipe_search_fts USING fts5("
+            "name_terms, body_terms, content='recipe_search', content_rowid='recipe_id', tokenize='unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER recipe_search_ai AFTER INSERT ON recipe_search BEGIN "
+            "INSERT INTO recipe_search_fts(rowid, name_terms, body_terms) "
+            "VALUES (new.recipe_id, new.name_terms, new.body_terms); END"
+        )
+        op.execute(
+            "CREATE TRIGGER recipe_search_ad AFTER DELETE ON recipe_search BEGIN "
+            "INSERT INTO recipe_search_fts(recipe_search_fts, rowid, name_terms, body_terms) "
+            "VALUES ('delete', old.recipe_id, old.name_terms, old.body_terms); END"
+        )
+        op.execute(
+            "CREATE TRIGGER recipe_search_au AFTER UPDATE ON recipe_search BEGIN "
+            "INSERT INTO recipe_search_fts(recipe_search_fts, rowid, name_terms, body_terms) "
+            "VALUES ('delete', old.recipe_id, old.name_terms, old.body_terms); "
+            "INSERT INTO recipe_search_fts(rowid, name_terms, body_terms) "
+            "VALUES (new.recipe_id, new.name_terms, new.body_terms); END"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_recipe_search_tsv", table_name="recipe_search")
+    elif dialect == "sqlite":
+        for name in ("recipe_search_au", "recipe_search_ad", "recipe_search_ai"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS recipe_search_fts")
+    op.drop_table("recipe_search")
@@ -0,0 +1,38 @@
+"""job queue
+
+Revision ID: c93f1a6d0e52
+Revises: b8d2e6f1a347
+Create Date: 2026-10-18 20:41:07.310554
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c93f1a6d0e52"
+down_revision = "b8d2e6f1a347"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=64), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("locked_by", sa.String(length=64), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_job_status_run_at", "job", ["status", "run_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_job_status_run_at", table_name="job")
+    op.drop_table("job")
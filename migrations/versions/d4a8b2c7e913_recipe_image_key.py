@@ -0,0 +1,24 @@
+"""recipe image key
+
+Revision ID: d4a8b2c7e913
+Revises: c93f1a6d0e52
+Create Date: 2026-10-18 21:32:15.804217
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d4a8b2c7e913"
+down_revision = "c93f1a6d0e52"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("recipe") as batch_op:
+        batch_op.add_column(sa.Column("image_key", sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("recipe") as batch_op:
+        batch_op.drop_column("image_key")
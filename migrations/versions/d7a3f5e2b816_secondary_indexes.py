@@ -0,0 +1,50 @@
+"""secondary indexes for hot queries
+
+Revision ID: d7a3f5e2b816
+Revises: c4e8b1d2f903
+Create Date: 2026-10-18 15:05:51.730442
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d7a3f5e2b816"
+down_revision = "c4e8b1d2f903"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 分類 / 作者篩選 + 依 (created_at, id) 排序；也涵蓋外鍵查詢與分類計數
+    op.create_index("ix_recipe_cate_created", "recipe", ["cate_id", "created_at", "id"])
+    op.create_index("ix_recipe_user_created", "recipe", ["user_id", "created_at", "id"])
+
+    op.create_index("ix_cook_instruction_recipe_id", "cook_instruction", ["recipe_id"])
+    op.create_index("ix_need_ingredient_recipe", "need", ["ingredient_id", "recipe_id"])
+    op.create_index("ix_review_user_id", "review", ["user_id"])
+
+    # 建立唯一索引前先清掉重複評論（保留最新一筆），再重算評分彙總
+    op.execute(
+        """
+        DELETE FROM review WHERE id NOT IN (
+            SELECT MAX(id) FROM review GROUP BY recipe_id, user_id
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE recipe SET
+            review_count = (SELECT COUNT(*) FROM review WHERE review.recipe_id = recipe.id),
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM review WHERE review.recipe_id = recipe.id)
+        """
+    )
+    op.create_index("uq_review_recipe_user", "review", ["recipe_id", "user_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("uq_review_recipe_user", table_name="review")
+    op.drop_index("ix_review_user_id", table_name="review")
+    op.drop_index("ix_need_ingredient_recipe", table_name="need")
+    op.drop_index("ix_cook_instruction_recipe_id", table_name="cook_instruction")
+    op.drop_index("ix_recipe_user_created", table_name="recipe")
+    op.drop_index("ix_recipe_cate_created", table_name="recipe")
@@ -0,0 +1,23 @@
+"""ingredient lower(name) index
+
+Revision ID: e2c94a7b1f58
+Revises: d7a3f5e2b816
+Create Date: 2026-10-18 16:21:09.118250
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e2c94a7b1f58"
+down_revision = "d7a3f5e2b816"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 食材名稱不分大小寫的批次查詢：lower(name) IN (...)
+    op.create_index("ix_ingredient_name_lower", "ingredient", [sa.text("lower(name)")])
+
+
+def downgrade():
+    op.drop_index("ix_ingredient_name_lower", table_name="ingredient")
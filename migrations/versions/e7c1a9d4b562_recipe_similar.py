@@ -0,0 +1,36 @@
+"""recipe similar
+
+Revision ID: e7c1a9d4b562
+Revises: d4a8b2c7e913
+Create Date: 2026-10-18 23:05:41.317620
+
+升級後執行 `flask recipes rebuild-similar` 為既有食譜計算相似食譜。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e7c1a9d4b562"
+down_revision = "d4a8b2c7e913"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "recipe_similar",
+        sa.Column("recipe_id", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.SmallInteger(), nullable=False),
+        sa.Column("similar_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["recipe_id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["similar_id"], ["recipe.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("recipe_id", "rank"),
+    )
+    op.create_index("ix_recipe_similar_similar_id", "recipe_similar", ["similar_id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_recipe_similar_similar_id", table_name="recipe_similar")
+    op.drop_table("recipe_similar")
@@ -0,0 +1,23 @@
+"""restore ingredient lower(name) index on SQLite
+
+Revision ID: f3a6c2e8d914
+Revises: e7c1a9d4b562
+Create Date: 2026-10-18 23:41:07.402913
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f3a6c2e8d914"
+down_revision = "e7c1a9d4b562"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # b8d2e6f1a347 修正前，SQLite 上的 batch 重建會弄丟 ix_ingredient_name_lower；已經升級過的資料庫在這裡補回
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("CREATE INDEX IF NOT EXISTS ix_ingredient_name_lower ON ingredient (lower(name))")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,39 @@
+"""cook_instruction position
+
+Revision ID: f5b1d8c3e274
+Revises: e2c94a7b1f58
+Create Date: 2026-10-18 17:48:36.540971
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f5b1d8c3e274"
+down_revision = "e2c94a7b1f58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("cook_instruction", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("position", sa.Integer(), nullable=False, server_default="0"))
+
+    # 以原本的 id 順序回填步驟位置（每個食譜從 0 起算）
+    op.execute(
+        """
+        UPDATE cook_instruction SET position = (
+            SELECT COUNT(*) FROM cook_instruction AS prev
+            WHERE prev.recipe_id = cook_instruction.recipe_id AND prev.id < cook_instruction.id
+        )
+        """
+    )
+
+    op.drop_index("ix_cook_instruction_recipe_id", table_name="cook_instruction")
+    op.create_index("ix_cook_instruction_recipe_position", "cook_instruction", ["recipe_id", "position"])
+
+
+def downgrade():
+    op.drop_index("ix_cook_instruction_recipe_position", table_name="cook_instruction")
+    op.create_index("ix_cook_instruction_recipe_id", "cook_instruction", ["recipe_id"])
+    with op.batch_alter_table("cook_instruction", schema=None) as batch_op:
+        batch_op.drop_column("position")
@@ -1,7 +1,11 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, inspect
+from flask import current_app
+from sqlalchemy.orm import Session, make_transient_to_detached
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 from flask_login import UserMixin
 from extensions import db, login_manager
+from cache import cache
 
 
 # 中介表 Need：食譜與食材多對多，附帶 quantity/unit
@@ -13,6 +17,11 @@ class Need(db.Model):
     unit = db.Column(db.String(32), nullable=False)
     # 輔助唯一鍵已由複合主鍵涵蓋（recipe_id, ingredient_id）
 
+    __table_args__ = (
+        # 依食材反查食譜（過敏原排除子查詢），含 recipe_id 可只掃索引
+        db.Index("ix_need_ingredient_recipe", "ingredient_id", "recipe_id"),
+    )
+
 
 class User(UserMixin, db.Model):
     __tablename__ = "user"
@@ -25,15 +34,75 @@ class User(UserMixin, db.Model):
     reviews = db.relationship("Review", back_populates="user", cascade="all, delete-orphan")
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=_hash_method())
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
 
+    def password_needs_rehash(self) -> bool:
+        # 雜湊格式為 "<method>$<salt>$<hash>"，method 與目前設定不同就該重新雜湊
+        return self.password_hash.split("$", 1)[0] != _hash_method()
+
+
+def _hash_method() -> str:
+    # 補上 Werkzeug 的預設參數，才能與已存的雜湊前綴比對（"scrypt" → "scrypt:32768:8:1"、"scrypt:16384" → "scrypt:16384:8:1"）
+    method = current_app.config.get("PASSWORD_HASH_METHOD") or "scrypt"
+    parts = method.split(":")
+    if parts[0] == "scrypt":
+        parts += ["32768", "8", "1"][len(parts) - 1:]
+    elif parts[0] == "pbkdf2":
+        parts += ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)][len(parts) - 1:]
+    return ":".join(parts)
+
+
+# =========================
+# 登入使用者快取：每個已登入請求都要載入使用者，以主鍵快取 id / username / email 幾秒
+# =========================
+_USER_CACHE_FIELDS = ("id", "username", "email")
+
+
+def _user_cache_key(user_id) -> str:
+    return f"user:{user_id}"
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    ttl = current_app.config.get("USER_CACHE_TTL", 60)
+    key = _user_cache_key(int(user_id))
+    data = cache.get(key) if ttl else None
+    if data is None:
+        user = db.session.get(User, int(user_id))
+        if user is not None and ttl:
+            cache.set(key, {f: getattr(user, f) for f in _USER_CACHE_FIELDS}, ttl)
+        return user
+    # 以快取內容建立 detached 物件再併入 session（不查詢）；其餘欄位與關聯在存取時才載入
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+_USER_CACHE_PENDING = "user_cache_invalidate"  # session.info：這個 transaction 內變動過的使用者 id
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_user_invalidation(mapper, connection, target):
+    # flush 時只記下 id，commit 後才刪快取：提早刪除的話，其他請求會在 commit 前讀到舊資料並重新快取
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault(_USER_CACHE_PENDING, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_user_cache(session):
+    for user_id in session.info.pop(_USER_CACHE_PENDING, ()):
+        cache.delete(_user_cache_key(user_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_invalidation(session):
+    # 整個 transaction rollback：資料沒變，快取不必失效（savepoint rollback 不會觸發這個事件）
+    session.info.pop(_USER_CACHE_PENDING, None)
 
 
 class Category(db.Model):
@@ -49,6 +118,13 @@ class Ingredient(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=True, nullable=False)
     is_allergen = db.Column(db.Boolean, default=False, nullable=False)
+    # 過敏原在 Recipe.allergen_mask 中的位元（0–62）；is_allergen 為真時自動分配，取消時釋放
+    allergen_bit = db.Column(db.SmallInteger, unique=True)
+
+    __table_args__ = (
+        # 新增 / 編輯食譜時以 lower(name) IN (...) 一次解析所有食材
+        db.Index("ix_ingredient_name_lower", db.func.lower(name)),
+    )
 
     recipes = db.relationship(
         "Recipe",
@@ -64,6 +140,8 @@ class Recipe(db.Model):
     description = db.Column(db.Text)
     cook_time_min = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # 食譜、步驟、Need 或評論有變動時更新；作為 ETag / Last-Modified 的依據
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     cate_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
@@ -71,26 +149,142 @@ class Recipe(db.Model):
     author = db.relationship("User", back_populates="recipes")
     category = db.relationship("Category", back_populates="recipes")
 
-    steps = db.relationship("CookInstruction", back_populates="recipe", cascade="all, delete-orphan", order_by="CookInstruction.id")
+    steps = db.relationship("CookInstruction", back_populates="recipe", cascade="all, delete-orphan", order_by="CookInstruction.position")
     ingredients = db.relationship("Ingredient", secondary="need", back_populates="recipes")
     reviews = db.relationship("Review", back_populates="recipe", cascade="all, delete-orphan")
     image_url = db.Column(db.String(255))  
+    # 上傳的封面（images.py 的內容雜湊）；有值時優先於 image_url，以本站縮圖顯示
+    image_key = db.Column(db.String(32))
+
+    # 評分彙總（由 Review 的新增/修改/刪除同步維護，清單不必載入所有評論）
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+
+    # 含有哪些過敏原（以 Ingredient.allergen_bit 為位元）；「排除任一過敏原」只需 allergen_mask & m = 0
+    allergen_mask = db.Column(db.BigInteger, default=0, nullable=False)
+
+    # 全文檢索用的斷詞文件（一對一）；search_rank 只在搜尋查詢時由 with_expression 填入
+    search_doc = db.relationship("RecipeSearch", uselist=False, cascade="all, delete-orphan")
+    search_rank = db.query_expression()
+
+    @property
+    def avg_rating(self) -> float:
+        return self.rating_sum / self.review_count if self.review_count else 0.0
+
+    def touch(self):
+        """子資料（步驟、Need）以批次語法寫入時，手動更新 updated_at。"""
+        self.updated_at = datetime.utcnow()
+
+    __table_args__ = (
+        # 游標分頁排序鍵 (created_at, id)
+        db.Index("ix_recipe_created_at_id", "created_at", "id"),
+        # 分類篩選 / 分類計數、控制台（依作者）時同時滿足篩選與排序
+        db.Index("ix_recipe_cate_created", "cate_id", "created_at", "id"),
+        db.Index("ix_recipe_user_created", "user_id", "created_at", "id"),
+    )
 
 
 class CookInstruction(db.Model):
     __tablename__ = "cook_instruction"
     id = db.Column(db.Integer, primary_key=True)
     step = db.Column(db.Text, nullable=False)  # 文字內容
+    position = db.Column(db.Integer, default=0, nullable=False)  # 步驟順序（0 起算）
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), nullable=False)
 
     recipe = db.relationship("Recipe", back_populates="steps")
 
+    __table_args__ = (
+        # 依食譜取步驟並依順序排列
+        db.Index("ix_cook_instruction_recipe_position", "recipe_id", "position"),
+    )
+
+
+# 全文檢索文件：name_terms / body_terms 存放已斷詞（CJK 以單字 + 二字詞切分）的內容
+# PostgreSQL 以 tsvector 運算式 GIN 索引查詢；SQLite 以 FTS5 外部內容表 recipe_search_fts 查詢
+class RecipeSearch(db.Model):
+    __tablename__ = "recipe_search"
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id", ondelete="CASCADE"), primary_key=True)
+    name_terms = db.Column(db.Text, default="", nullable=False)
+    body_terms = db.Column(db.Text, default="", nullable=False)
+
+    __table_args__ = (
+        db.Index(
+            "ix_recipe_search_tsv",
+            db.text(
+                "(setweight(to_tsvector('simple', name_terms), 'A') || "
+                "setweight(to_tsvector('simple', body_terms), 'B'))"
+            ),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# SQLite：FTS5 外部內容表與同步觸發器（僅在 create_all 建立 recipe_search 時一併建立）
+RECIPE_SEARCH_FTS_DDL = (
+    "CREATE VIRTUAL TABLE recipe_search_fts USING fts5("
+    "name_terms, body_terms, content='recipe_search', content_rowid='recipe_id', tokenize='unicode61')",
+    "CREATE TRIGGER recipe_search_ai AFTER INSERT ON recipe_search BEGIN "
+    "INSERT INTO recipe_search_fts(rowid, name_terms, body_terms) "
+    "VALUES (new.recipe_id, new.name_terms, new.body_terms); END",
+    "CREATE TRIGGER recipe_search_ad AFTER DELETE ON recipe_search BEGIN "
+    "INSERT INTO recipe_search_fts(recipe_search_fts, rowid, name_terms, body_terms) "
+    "VALUES ('delete', old.recipe_id, old.name_terms, old.body_terms); END",
+    "CREATE TRIGGER recipe_search_au AFTER UPDATE ON recipe_search BEGIN "
+    "INSERT INTO recipe_search_fts(recipe_search_fts, rowid, name_terms, body_terms) "
+    "VALUES ('delete', old.recipe_id, old.name_terms, old.body_terms); "
+    "INSERT INTO recipe_search_fts(rowid, name_terms, body_terms) "
+    "VALUES (new.recipe_id, new.name_terms, new.body_terms); END",
+)
+for _stmt in RECIPE_SEARCH_FTS_DDL:
+    event.listen(RecipeSearch.__table__, "after_create", db.DDL(_stmt).execute_if(dialect="sqlite"))
+event.listen(
+    RecipeSearch.__table__, "before_drop",
+    db.DDL("DROP TABLE IF EXISTS recipe_search_fts").execute_if(dialect="sqlite"),
+)
+
+
+# 相似食譜：recommend.py 離線計算每道食譜的前 k 名鄰居，詳細頁以 (recipe_id, rank) 一次取出
+# 同一道食譜的清單總是整份重寫，computed_at 相同；詳細頁以它作為 ETag 的一部分
+class RecipeSimilar(db.Model):
+    __tablename__ = "recipe_similar"
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id", ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(db.SmallInteger, primary_key=True)  # 0 起算，分數由高到低
+    similar_id = db.Column(db.Integer, db.ForeignKey("recipe.id", ondelete="CASCADE"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # 刪除食譜時清掉指向它的鄰居
+        db.Index("ix_recipe_similar_similar_id", "similar_id"),
+    )
+
+
+# 背景工作佇列：與觸發它的寫入在同一個 transaction 內建立，由 `flask worker` 取出執行
+class Job(db.Model):
+    __tablename__ = "job"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(16), default="queued", nullable=False)  # queued / running / done / failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # 重試時延後
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(64))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # worker 依 (status, run_at) 取出到期的工作
+        db.Index("ix_job_status_run_at", "status", "run_at"),
+    )
+
 
 class Review(db.Model):
     __tablename__ = "review"
     id = db.Column(db.Integer, primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     comment = db.Column(db.Text)
     rating = db.Column(db.Integer, nullable=False)
 
@@ -99,4 +293,103 @@ class Review(db.Model):
 
     __table_args__ = (
         db.CheckConstraint("rating >= 1 AND rating <= 5", name="ck_review_rating_range"),
+        # 每位使用者對同一食譜只有一則評論；也作為依 recipe_id 查評論的索引
+        db.Index("uq_review_recipe_user", "recipe_id", "user_id", unique=True),
+    )
+
+
+# =========================
+# 評分彙總同步：與評論寫入在同一個 transaction 內以 UPDATE ... SET x = x + n 累加，並更新 updated_at
+# =========================
+def _bump_rating(connection, recipe_id, count_delta, sum_delta):
+    recipe = Recipe.__table__
+    connection.execute(
+        recipe.update()
+        .where(recipe.c.id == recipe_id)
+        .values(
+            review_count=recipe.c.review_count + count_delta,
+            rating_sum=recipe.c.rating_sum + sum_delta,
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+@event.listens_for(Review, "after_insert")
+def _review_inserted(mapper, connection, target):
+    _bump_rating(connection, target.recipe_id, 1, target.rating)
+
+
+@event.listens_for(Review, "after_update")
+def _review_updated(mapper, connection, target):
+    # 只改留言內容也要更新 updated_at（詳細頁會顯示）
+    state = inspect(target)
+    hist = state.attrs.rating.history
+    if not (hist.has_changes() or state.attrs.comment.history.has_changes()):
+        return
+    delta = hist.added[0] - hist.deleted[0] if hist.deleted and hist.added else 0
+    _bump_rating(connection, target.recipe_id, 0, delta)
+
+
+@event.listens_for(Review, "after_delete")
+def _review_deleted(mapper, connection, target):
+    _bump_rating(connection, target.recipe_id, -1, -target.rating)
+
+
+# =========================
+# 過敏原位元：Ingredient.is_allergen 變動時分配 / 釋放位元，並以一次 UPDATE 同步含該食材的食譜
+# （Need 的變動由 recipes/bulk.refresh_allergen_mask 處理）
+# =========================
+MAX_ALLERGEN_BITS = 63  # BIGINT 為有號整數，最高位不用
+
+
+def allergen_mask_for(bits) -> int:
+    mask = 0
+    for bit in bits:
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+@event.listens_for(Ingredient, "before_insert")
+@event.listens_for(Ingredient, "before_update")
+def _assign_allergen_bit(mapper, connection, target):
+    if target.is_allergen and target.allergen_bit is None:
+        ingredient = Ingredient.__table__
+        used = {
+            bit for (bit,) in connection.execute(
+                db.select(ingredient.c.allergen_bit).where(ingredient.c.allergen_bit.isnot(None))
+            )
+        }
+        # 同一次 flush 中已分配、尚未寫入資料庫的位元
+        session = inspect(target).session
+        used.update(
+            obj.allergen_bit for obj in (*session.new, *session.dirty)
+            if isinstance(obj, Ingredient) and obj.allergen_bit is not None
+        )
+        free = next((b for b in range(MAX_ALLERGEN_BITS) if b not in used), None)
+        if free is None:
+            raise ValueError(f"過敏原最多 {MAX_ALLERGEN_BITS} 種")
+        target.allergen_bit = free
+    elif not target.is_allergen and target.allergen_bit is not None:
+        target.allergen_bit = None
+
+
+@event.listens_for(Ingredient, "after_update")
+def _allergen_changed(mapper, connection, target):
+    hist = inspect(target).attrs.allergen_bit.history
+    if not hist.has_changes():
+        return
+    recipe, need = Recipe.__table__, Need.__table__
+    containing = db.select(need.c.recipe_id).where(need.c.ingredient_id == target.id)
+    mask = recipe.c.allergen_mask
+    for bit in hist.deleted:
+        if bit is not None:
+            mask = mask.op("&")(~(1 << bit))
+    for bit in hist.added:
+        if bit is not None:
+            mask = mask.op("|")(1 << bit)
+    connection.execute(
+        recipe.update()
+        .where(recipe.c.id.in_(containing))
+        .values(allergen_mask=mask, updated_at=datetime.utcnow())
     )
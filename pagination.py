@@ -0,0 +1,141 @@
+# pagination.py
+# 游標（keyset）分頁：依排序鍵比較取下一頁，避免 OFFSET 與整表載入
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import tuple_
+
+from models import Recipe
+
+PER_PAGE = 24
+STREAM_BATCH = 8  # keyset_stream 每次從資料庫取幾筆（yield_per）
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+class Sort(NamedTuple):
+    """排序鍵：columns 皆為遞減排序，attrs 為物件上對應的屬性，parsers 把游標值還原成型別。"""
+    columns: tuple
+    attrs: tuple
+    parsers: tuple
+
+
+# 預設：最新的在前
+RECENT = Sort(
+    columns=(Recipe.created_at, Recipe.id),
+    attrs=("created_at", "id"),
+    parsers=(datetime.fromisoformat, int),
+)
+
+
+def _dump(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(item, sort: Sort = RECENT) -> str:
+    raw = json.dumps([_dump(getattr(item, a)) for a in sort.attrs], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort: Sort = RECENT):
+    """把游標字串還原成排序鍵的值；格式不對就回傳 None（視為第一頁）。"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if len(values) != len(sort.parsers):
+            return None
+        return tuple(parse(v) for parse, v in zip(sort.parsers, values))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(query, after=None, before=None, per_page=PER_PAGE, sort: Sort = RECENT) -> Page:
+    """依 sort（全部遞減）取一頁。
+
+    after：往後翻，before：往前翻；兩者皆無則為第一頁。
+    多抓一筆用來判斷是否還有下一頁，不需要額外的 COUNT。
+    """
+    key = tuple_(*sort.columns)
+    after_key = decode_cursor(after, sort)
+    before_key = decode_cursor(before, sort) if after_key is None else None
+
+    if before_key is not None:
+        # 往前翻：反向排序取 per_page+1 筆，再倒回來
+        rows = (
+            query.filter(key > before_key)
+            .order_by(*(c.asc() for c in sort.columns))
+            .limit(per_page + 1)
+            .all()
+        )
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return Page(
+            items=items,
+            next_cursor=encode_cursor(items[-1], sort) if items else None,
+            prev_cursor=encode_cursor(items[0], sort) if items and has_more else None,
+        )
+
+    if after_key is not None:
+        query = query.filter(key < after_key)
+    rows = (
+        query.order_by(*(c.desc() for c in sort.columns))
+        .limit(per_page + 1)
+        .all()
+    )
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    return Page(
+        items=items,
+        next_cursor=encode_cursor(items[-1], sort) if items and has_more else None,
+        prev_cursor=encode_cursor(items[0], sort) if items and after_key is not None else None,
+    )
+
+
+class StreamPage:
+    """keyset_page 的串流版本：items 是產生器，邊迭代邊從資料庫取資料。
+
+    翻頁游標要等 items 迭代完才確定，模板須在清單之後才讀取 page.next_cursor / page.prev_cursor。
+    """
+
+    def __init__(self, query, per_page: int, sort: Sort, has_prev: bool):
+        self.next_cursor = None
+        self.prev_cursor = None
+        self.items = self._iterate(query, per_page, sort, has_prev)
+
+    def _iterate(self, query, per_page, sort, has_prev):
+        last = None
+        for n, item in enumerate(query):  # 最多 per_page + 1 筆，不提早 break，讓結果集正常讀完
+            if n == per_page:
+                self.next_cursor = encode_cursor(last, sort)
+                continue
+            if n == 0 and has_prev:
+                self.prev_cursor = encode_cursor(item, sort)
+            last = item
+            yield item
+
+
+def keyset_stream(query, after=None, before=None, per_page=PER_PAGE, sort: Sort = RECENT,
+                  batch_size: int = STREAM_BATCH):
+    """與 keyset_page 相同的分頁，但逐批（yield_per）取資料，渲染第一張卡片前不必等整頁載入。
+
+    往前翻（before）需要反向排序再倒回來，無法邊取邊輸出，直接回傳 keyset_page 的結果。
+    """
+    after_key = decode_cursor(after, sort)
+    if after_key is None and decode_cursor(before, sort) is not None:
+        return keyset_page(query, before=before, per_page=per_page, sort=sort)
+    if after_key is not None:
+        query = query.filter(tuple_(*sort.columns) < after_key)
+    query = (
+        query.order_by(*(c.desc() for c in sort.columns))
+        .limit(per_page + 1)
+        .yield_per(batch_size)
+    )
+    return StreamPage(query, per_page, sort, has_prev=after_key is not None)
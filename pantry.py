@@ -0,0 +1,218 @@
+# pantry.py
+# 「冰箱裡有什麼就煮什麼」：食材 → 食譜的記憶體反向索引
+#
+# 每道食譜在索引中有一個槽位（slot，依 recipe id 遞增分配，新食譜排在最後），
+# 每個食材以 array('I') 存放含有它的槽位；常見食材另外保留一份 Python int 位元圖。
+# 查詢時把手邊食材的位元圖以「位元切片加法」相加，得到每道食譜符合幾項的位元平面，
+# 再依「符合數 / 所需數」由高到低逐一取出，整個過程都是整數位元運算，不需要逐筆計數。
+#
+# 每個行程各有一份索引：本行程的新增 / 編輯 / 刪除會立即更新，
+# 其他 worker 的變動則在 PANTRY_REBUILD_SECONDS 後整份重建時反映。
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+from flask import current_app
+
+from extensions import db
+from models import Need
+
+# 含有的食譜數超過全部槽位的 1/DENSE_RATIO 時常駐位元圖；較少見的食材查詢時才由槽位轉換
+DENSE_RATIO = 256
+
+
+class PantryMatch(NamedTuple):
+    recipe_id: int
+    matched: int
+    needed: int
+    missing: list  # 缺少的 ingredient_id
+
+    @property
+    def coverage(self) -> float:
+        return self.matched / self.needed
+
+
+def _bitmap(slots) -> int:
+    if not slots:
+        return 0
+    buf = bytearray(max(slots) // 8 + 1)
+    for s in slots:
+        buf[s >> 3] |= 1 << (s & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _top_slots(bits: int, limit: int) -> list:
+    """由高到低取出最多 limit 個設為 1 的位元位置（槽位越大越新）。"""
+    slots = []
+    while bits and len(slots) < limit:
+        s = bits.bit_length() - 1
+        slots.append(s)
+        bits ^= 1 << s
+    return slots
+
+
+class PantryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.built_at = None
+        self._slot_of = {}      # recipe_id -> slot
+        self._recipe_at = []    # slot -> recipe_id（已刪除為 0）
+        self._needs = {}        # recipe_id -> array('I') ingredient_id
+        self._postings = {}     # ingredient_id -> array('I') slot（遞增）
+        self._dense = {}        # ingredient_id -> 位元圖（常見食材）
+        self._by_size = {}      # 所需食材數 -> 位元圖
+
+    # =========================
+    # 建立 / 維護
+    # =========================
+    def build(self):
+        """從 Need 整份重建（依 recipe_id 排序，一次查詢）。"""
+        fresh = PantryIndex()
+        rows = db.session.execute(
+            db.select(Need.recipe_id, Need.ingredient_id).order_by(Need.recipe_id)
+        )
+        current, ingredient_ids = None, []
+        for rid, iid in rows:
+            if rid != current:
+                if ingredient_ids:
+                    fresh._add(current, ingredient_ids)
+                current, ingredient_ids = rid, []
+            ingredient_ids.append(iid)
+        if ingredient_ids:
+            fresh._add(current, ingredient_ids)
+        fresh._refresh_dense()
+        fresh.built_at = time.monotonic()
+
+        with self._lock:
+            self.__dict__.update({k: v for k, v in fresh.__dict__.items() if k != "_lock"})
+
+    def _ensure_fresh(self):
+        max_age = current_app.config.get("PANTRY_REBUILD_SECONDS", 300)
+        if self.built_at is None or time.monotonic() - self.built_at > max_age:
+            self.build()
+
+    def _add(self, rid: int, ingredient_ids):
+        slot = len(self._recipe_at)
+        self._recipe_at.append(rid)
+        self._slot_of[rid] = slot
+        needs = array("I", sorted(set(ingredient_ids)))
+        self._needs[rid] = needs
+        for iid in needs:
+            self._postings.setdefault(iid, array("I")).append(slot)
+            if iid in self._dense:
+                self._dense[iid] |= 1 << slot
+        self._by_size[len(needs)] = self._by_size.get(len(needs), 0) | (1 << slot)
+
+    def _remove(self, rid: int):
+        slot = self._slot_of.pop(rid, None)
+        if slot is None:
+            return
+        self._recipe_at[slot] = 0
+        needs = self._needs.pop(rid)
+        for iid in needs:
+            posting = self._postings[iid]
+            posting.remove(slot)
+            if not posting:
+                del self._postings[iid]
+            if iid in self._dense:
+                self._dense[iid] &= ~(1 << slot)
+        self._by_size[len(needs)] &= ~(1 << slot)
+
+    def _refresh_dense(self):
+        threshold = max(len(self._recipe_at) // DENSE_RATIO, 1)
+        self._dense = {
+            iid: self._dense.get(iid) or _bitmap(slots)
+            for iid, slots in self._postings.items() if len(slots) >= threshold
+        }
+
+    def update_recipe(self, rid: int, ingredient_ids):
+        """食譜新增 / 編輯（已 commit）後呼叫；索引尚未建立時不需處理。"""
+        with self._lock:
+            if self.built_at is None:
+                return
+            self._remove(rid)
+            if ingredient_ids:
+                self._add(rid, ingredient_ids)
+
+    def remove_recipe(self, rid: int):
+        with self._lock:
+            if self.built_at is not None:
+                self._remove(rid)
+
+    # =========================
+    # 查詢
+    # =========================
+    def match(self, have, k: int = 20) -> list:
+        """依覆蓋率（符合數 / 所需數）由高到低回傳前 k 道食譜；同覆蓋率時符合數多、較新的在前。"""
+        self._ensure_fresh()
+        have = set(have)
+        with self._lock:
+            bitmaps = [
+                self._dense[iid] if iid in self._dense else _bitmap(self._postings[iid])
+                for iid in have if iid in self._postings
+            ]
+            if not bitmaps:
+                return []
+
+            # 位元切片加法：planes[j] 是「符合數的第 j 個位元」
+            planes = []
+            for bits in bitmaps:
+                for j, plane in enumerate(planes):
+                    planes[j], bits = plane ^ bits, plane & bits
+                    if not bits:
+                        break
+                else:
+                    if bits:
+                        planes.append(bits)
+
+            matched_any = 0
+            for bits in bitmaps:
+                matched_any |= bits
+
+            def exactly(c: int) -> int:
+                if c >> len(planes):
+                    return 0  # 超過位元平面能表示的最大符合數
+                bits = matched_any
+                for j, plane in enumerate(planes):
+                    bits = bits & plane if c >> j & 1 else bits & ~plane
+                return bits
+
+            # 相同比例（如 1/3 與 2/6）的浮點數值必定相同，可直接當排序鍵
+            levels = sorted(
+                (
+                    (c / size, c, size)
+                    for size in self._by_size
+                    for c in range(1, min(size, len(bitmaps)) + 1)
+                ),
+                reverse=True,
+            )
+            counts, results = {}, []
+            for _, c, size in levels:
+                if c not in counts:
+                    counts[c] = exactly(c)
+                if not counts[c]:
+                    continue
+                bits = counts[c] & self._by_size[size]
+                for slot in _top_slots(bits, k - len(results)):
+                    rid = self._recipe_at[slot]
+                    missing = [iid for iid in self._needs[rid] if iid not in have]
+                    results.append(PantryMatch(rid, c, size, missing))
+                if len(results) >= k:
+                    break
+            return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "recipes": len(self._slot_of),
+                "ingredients": len(self._postings),
+                "dense_ingredients": len(self._dense),
+                "slots": len(self._recipe_at),
+            }
+
+
+index = PantryIndex()
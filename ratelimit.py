@@ -0,0 +1,103 @@
+# ratelimit.py
+# 權杖桶（token bucket）限流：每個 key 一個桶，容量 burst，每秒補充 rate 個權杖，每次請求取走一個
+#
+#   RATELIMIT_STORAGE=memory | redis      # memory：每個 worker 各自計算；redis：多個 worker 共用
+#   RATELIMIT_REDIS_URL=redis://localhost:6379/1
+#
+#   wait = limiter.hit("login-ip:1.2.3.4", burst=20, per_minute=10)
+#   if wait: ...  # 需等待 wait 秒才有權杖，回 429
+#
+# 登入時先檢查限流再驗證密碼：被擋下的請求不會進到昂貴的雜湊計算。
+import math
+import threading
+import time
+
+
+class MemoryStorage:
+    """行程內的桶：{key: (權杖數, 上次更新時間, burst, rate)}。補滿的桶與不存在的桶等價，超過上限時先清掉。"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, burst: int, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))[:2]
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now, burst, rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        self._buckets = {
+            k: b for k, b in self._buckets.items() if b[0] + (now - b[1]) * b[3] < b[2]
+        }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisStorage:
+    """Redis 相容伺服器；以 Lua 腳本在伺服器端原子地補充與取用，桶閒置到補滿後自動過期。"""
+
+    SCRIPT = """
+    local burst, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, prefix: str = "recipes:rl:"):
+        try:
+            import redis
+        except ImportError as exc:  # 選用套件
+            raise RuntimeError("RATELIMIT_STORAGE=redis 需要安裝 redis 套件（pip install redis）") from exc
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, burst: int, rate: float) -> float:
+        # 以牆上時間計算，多台主機共用同一個桶
+        return float(self._take(keys=[self.prefix + key], args=[burst, rate, time.time()]))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+
+class Limiter:
+    def __init__(self):
+        self.storage = MemoryStorage()
+        self.enabled = True
+
+    def init_app(self, app):
+        kind = app.config.get("RATELIMIT_STORAGE", "memory")
+        if kind == "memory":
+            self.storage = MemoryStorage()
+        elif kind == "redis":
+            self.storage = RedisStorage(app.config["RATELIMIT_REDIS_URL"])
+        else:
+            raise RuntimeError(f"未知的 RATELIMIT_STORAGE：{kind}")
+        self.enabled = app.config.get("RATELIMIT_ENABLED", True)
+        app.extensions["limiter"] = self
+
+    def hit(self, key: str, burst: int, per_minute: float) -> int:
+        """取走一個權杖；允許時回傳 0，否則回傳需等待的秒數（無條件進位，供 Retry-After 使用）。"""
+        if not self.enabled:
+            return 0
+        wait = self.storage.take(key, burst, per_minute / 60.0)
+        return math.ceil(wait) if wait > 0 else 0
+
+
+limiter = Limiter()
@@ -0,0 +1,231 @@
+# recipes/bulk.py
+# 新增 / 編輯食譜時的批次寫入：一次解析所有食材名稱、一次補齊缺少的食材、步驟與 Need 以 executemany 寫入
+# 編輯時只套用差異（新增 / 修改 / 刪除），不整批刪除重建
+import csv
+import io
+import itertools
+
+from sqlalchemy import delete, func, insert, update
+
+from extensions import db
+from models import Ingredient, CookInstruction, Need, allergen_mask_for
+
+
+def parse_steps(text: str) -> list:
+    """每行一個步驟，空白行略過。"""
+    return [s.strip() for s in (text or "").splitlines() if s.strip()]
+
+
+def parse_ingredients(text: str) -> list:
+    """每行 `名稱,數量,單位`，回傳 [(name, qty, unit), ...]。
+
+    不合法的行略過；同一食材重複出現時只保留第一行（Need 以 recipe_id + ingredient_id 為主鍵）。
+    """
+    rows, seen = [], set()
+    for ln in (text or "").splitlines():
+        parts = [p.strip() for p in ln.split(",")]
+        if len(parts) < 3 or not parts[0]:
+            continue  # 不合法的行就略過
+        name, qty, unit = parts[0], parts[1], parts[2]
+        if name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        try:
+            qty_val = float(qty)
+        except ValueError:
+            qty_val = 0
+        rows.append((name, qty_val, unit))
+    return rows
+
+
+def insert_ignoring_conflicts(model, rows, conflict_columns):
+    """INSERT ... ON CONFLICT DO NOTHING；並行送出相同名稱時不會因唯一鍵衝突而失敗。"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.session.execute(insert(model), rows)
+        return
+    stmt = dialect_insert(model).on_conflict_do_nothing(index_elements=conflict_columns)
+    db.session.execute(stmt, rows)
+
+
+# SQLite 的 lower() 只轉換 ASCII 字母，「Äpfel」在資料庫端是「Äpfel」而非 Python 的「äpfel」；
+# 比對時把非 ASCII 的字母展開成大小寫組合，每種拼法經 SQLite lower() 後都在 IN 清單裡
+_MAX_CASE_LETTERS = 6  # 最多 2**6 種拼法
+
+
+def _sqlite_lower_variants(key: str) -> list:
+    """key（已 str.lower()）在 SQLite lower(name) 下可能的樣子：非 ASCII 字母的大小寫組合。"""
+    options = [
+        (ch, ch.upper()) if not ch.isascii() and len(ch.upper()) == 1 and ch.upper() != ch else (ch,)
+        for ch in key
+    ]
+    if sum(len(o) > 1 for o in options) > _MAX_CASE_LETTERS:
+        # 組合太多時只取全小寫、全大寫與字首大寫
+        return list({key, "".join(o[-1] for o in options), key[:1].upper() + key[1:]})
+    return ["".join(p) for p in itertools.product(*options)]
+
+
+def lower_in(column, keys):
+    """`lower(column) IN keys` 的條件；keys 為 str.lower() 後的名稱，Python 端以同一規則比對結果。
+
+    PostgreSQL 的 lower() 依 Unicode 轉換，直接比對；SQLite 只轉換 ASCII，改比對展開後的拼法。
+    兩者都走 lower(name) 的運算式索引。
+    """
+    keys = list(keys)
+    if db.session.get_bind().dialect.name == "sqlite":
+        keys = sorted({v for key in keys for v in _sqlite_lower_variants(key)})
+    return func.lower(column).in_(keys)
+
+
+def resolve_ingredients(names) -> dict:
+    """把食材名稱（不分大小寫，以 str.lower() 為準）對應到 Ingredient.id，不存在的一次補建。
+
+    回傳 {name.lower(): ingredient_id}；最多兩次查詢 + 一次 INSERT。
+    parse_ingredients 以同一個 key 去除重複，非 ASCII 的大小寫變體（Äpfel / äpfel）也對應到同一筆。
+    """
+    wanted = {}
+    for n in names:
+        wanted.setdefault(n.lower(), n)
+    if not wanted:
+        return {}
+
+    def lookup():
+        rows = (
+            db.session.query(Ingredient.id, Ingredient.name)
+            .filter(
+                lower_in(Ingredient.name, wanted)
+                | Ingredient.name.in_(list(wanted.values()))
+            )
+            .order_by(Ingredient.id)
+        )
+        found = {}
+        for iid, name in rows:
+            found.setdefault(name.lower(), iid)
+        return found
+
+    found = lookup()
+    missing = [n for key, n in wanted.items() if key not in found]
+    if missing:
+        insert_ignoring_conflicts(Ingredient, [dict(name=n) for n in missing], ["name"])
+        found = lookup()
+    return found
+
+
+def insert_many(model, rows: list, batch_size: int = 2000):
+    """大量寫入（合成資料、匯入）：PostgreSQL 以 COPY；其他資料庫以 Core INSERT 分批 executemany。"""
+    if not rows:
+        return
+    table = model.__table__
+    columns = list(rows[0])
+    bind = db.session.get_bind()
+    if bind.dialect.name == "postgresql":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            # NULL 以 \N 表示，空字串才不會被當成 NULL
+            writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+        buf.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buf
+        )
+        return
+    # 一個編譯好的 INSERT 搭配 executemany；多列 .values([...]) 每批都要重新編譯，量大時編譯比寫入還慢
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(table), rows[start:start + batch_size])
+
+
+def insert_steps(recipe_id: int, steps, start: int = 0):
+    if steps:
+        db.session.execute(
+            insert(CookInstruction),
+            [dict(recipe_id=recipe_id, step=s, position=start + i) for i, s in enumerate(steps)],
+        )
+
+
+def sync_steps(recipe_id: int, existing, steps) -> int:
+    """依位置比對既有步驟（依 position 排序）與表單內容，只寫入有變動的列。
+
+    回傳寫入的列數；0 表示步驟沒有變動。
+    """
+    existing = list(existing)
+    changed = [
+        dict(id=old.id, step=new, position=i)
+        for i, (old, new) in enumerate(zip(existing, steps))
+        if old.step != new or old.position != i
+    ]
+    if changed:
+        db.session.execute(update(CookInstruction), changed)
+
+    extra = [old.id for old in existing[len(steps):]]
+    if extra:
+        db.session.execute(
+            delete(CookInstruction).where(CookInstruction.id.in_(extra)),
+            execution_options={"synchronize_session": False},
+        )
+
+    insert_steps(recipe_id, steps[len(existing):], start=len(existing))
+    return len(changed) + len(extra) + max(len(steps) - len(existing), 0)
+
+
+def insert_needs(recipe_id: int, parsed, ingredient_ids: dict):
+    if parsed:
+        db.session.execute(
+            insert(Need),
+            [
+                dict(recipe_id=recipe_id, ingredient_id=ingredient_ids[name.lower()], quantity=qty, unit=unit)
+                for name, qty, unit in parsed
+            ],
+        )
+
+
+def sync_needs(recipe_id: int, parsed, ingredient_ids: dict) -> int:
+    """以 ingredient_id 比對既有 Need 與表單內容，只新增 / 修改 / 刪除有差異的列。
+
+    回傳寫入的列數；0 表示食材沒有變動。
+    """
+    current = {
+        iid: (qty, unit)
+        for iid, qty, unit in db.session.query(Need.ingredient_id, Need.quantity, Need.unit)
+        .filter(Need.recipe_id == recipe_id)
+    }
+    wanted = {ingredient_ids[name.lower()]: (qty, unit) for name, qty, unit in parsed}
+
+    added = [
+        dict(recipe_id=recipe_id, ingredient_id=iid, quantity=qty, unit=unit)
+        for iid, (qty, unit) in wanted.items() if iid not in current
+    ]
+    changed = [
+        dict(recipe_id=recipe_id, ingredient_id=iid, quantity=qty, unit=unit)
+        for iid, (qty, unit) in wanted.items() if iid in current and current[iid] != (qty, unit)
+    ]
+    removed = [iid for iid in current if iid not in wanted]
+
+    if added:
+        db.session.execute(insert(Need), added)
+    if changed:
+        db.session.execute(update(Need), changed)
+    if removed:
+        db.session.execute(
+            delete(Need).where(Need.recipe_id == recipe_id, Need.ingredient_id.in_(removed)),
+            execution_options={"synchronize_session": False},
+        )
+    return len(added) + len(changed) + len(removed)
+
+
+def refresh_allergen_mask(r) -> bool:
+    """Need 寫入後重新計算食譜的 allergen_mask（一次查詢）；回傳是否有變動。"""
+    bits = (
+        db.session.query(Ingredient.allergen_bit)
+        .join(Need, Need.ingredient_id == Ingredient.id)
+        .filter(Need.recipe_id == r.id, Ingredient.allergen_bit.isnot(None))
+    )
+    mask = allergen_mask_for(bit for (bit,) in bits)
+    if r.allergen_mask == mask:
+        return False
+    r.allergen_mask = mask
+    return True
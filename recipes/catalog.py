@@ -0,0 +1,358 @@
+# recipes/catalog.py
+# 食譜目錄的大量匯入 / 匯出：JSONL，一行一道食譜；分類、作者、食材與評論者都以名稱表示，可在不同資料庫間搬移
+#
+#   {"name": "法式吐司", "description": "早餐經典", "cook_time_min": 10, "category": "主食",
+#    "author": "sam", "created_at": "2026-01-02T08:00:00", "image_url": null,
+#    "steps": ["打散雞蛋", "浸泡吐司"],
+#    "ingredients": [{"name": "蛋", "quantity": 2, "unit": "顆", "allergen": true}],
+#    "reviews": [{"user": "amy", "rating": 5, "comment": "好吃"}]}
+#
+# 匯入：逐行解析（generator），每 batch_size 道食譜一個 transaction；名稱一次解析、缺的一次補建，
+# 各表以 executemany / COPY 寫入。已存在的食譜名稱略過，中斷後以同一個檔案重新執行即可接續
+# （--start-line 可跳過已提交的部分，不必重新解析）。
+# 資料庫中沒有的作者 / 評論者以無法登入的帳號建立（密碼雜湊為 "!"，之後可由管理者重設）。
+#
+# 匯出：以 yield_per 的伺服器端游標依 id 逐批讀取食譜，每批再以 IN 查詢取步驟、食材與評論，
+# 記憶體用量與總筆數無關；每道食譜帶 id，中斷後以 after_id 接續。
+import json
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import (
+    User, Category, Ingredient, Recipe, Need, CookInstruction, Review, RecipeSearch, allergen_mask_for,
+)
+from . import bulk
+import search
+
+LOCKED_PASSWORD_HASH = "!"  # 不是 Werkzeug 的雜湊格式，check_password_hash 一律回傳 False
+
+
+# =========================
+# 解析與驗證
+# =========================
+def _text(value, field: str, max_length: int = None, required: bool = False):
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"缺少 {field}")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} 必須是字串")
+    value = value.strip()
+    if required and not value:
+        raise ValueError(f"缺少 {field}")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} 超過 {max_length} 個字")
+    return value
+
+
+def _number(value, field: str, default=0):
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} 必須是數字")
+    if not math.isfinite(value):  # json.loads 接受 Infinity / NaN
+        raise ValueError(f"{field} 必須是有限的數字")
+    return value
+
+
+def validate(obj) -> dict:
+    """檢查並整理一筆食譜記錄；不合法時丟 ValueError。"""
+    if not isinstance(obj, dict):
+        raise ValueError("每行必須是 JSON 物件")
+    cook_time = _number(obj.get("cook_time_min"), "cook_time_min")
+    if int(cook_time) != cook_time or cook_time < 0:
+        raise ValueError("cook_time_min 必須是非負整數")
+    created_at = obj.get("created_at")
+    if created_at is not None:
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ValueError("created_at 必須是 ISO 8601 時間") from None
+        if created_at.tzinfo is not None:  # 資料庫存的是不帶時區的 UTC
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    steps = [_text(s, "steps[]") for s in obj.get("steps") or ()]
+
+    # 同一食材重複出現時只保留第一個（Need 以 recipe_id + ingredient_id 為主鍵），與表單相同
+    ingredients, seen = [], set()
+    for item in obj.get("ingredients") or ():
+        if not isinstance(item, dict):
+            raise ValueError("ingredients[] 必須是物件")
+        name = _text(item.get("name"), "ingredients[].name", 120, required=True)
+        if name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        ingredients.append(dict(
+            name=name,
+            quantity=float(_number(item.get("quantity"), "ingredients[].quantity")),
+            unit=_text(item.get("unit"), "ingredients[].unit", 32) or "",
+            allergen=bool(item.get("allergen")),
+        ))
+
+    # 每位使用者對同一食譜只有一則評論：保留最後一則
+    reviews = {}
+    for item in obj.get("reviews") or ():
+        if not isinstance(item, dict):
+            raise ValueError("reviews[] 必須是物件")
+        rating = _number(item.get("rating"), "reviews[].rating", None)
+        if rating not in (1, 2, 3, 4, 5):
+            raise ValueError("reviews[].rating 必須是 1 到 5 的整數")
+        user = _text(item.get("user"), "reviews[].user", 80, required=True)
+        comment = _text(item.get("comment"), "reviews[].comment") or ""  # 與評論表單相同，沒有內容存空字串
+        reviews[user] = dict(user=user, rating=int(rating), comment=comment)
+
+    return dict(
+        name=_text(obj.get("name"), "name", 120, required=True),
+        description=_text(obj.get("description"), "description"),
+        cook_time_min=int(cook_time),
+        category=_text(obj.get("category"), "category", 80, required=True),
+        author=_text(obj.get("author"), "author", 80, required=True),
+        created_at=created_at,
+        image_url=_text(obj.get("image_url"), "image_url", 255),
+        steps=[s for s in steps if s],
+        ingredients=ingredients,
+        reviews=list(reviews.values()),
+    )
+
+
+def read_records(lines, start_line: int = 1):
+    """逐行產生 (行號, 記錄或 ValueError)；空白行略過，start_line 之前的行不解析。"""
+    for line_no, line in enumerate(lines, 1):
+        if line_no < start_line or not line.strip():
+            continue
+        try:
+            yield line_no, validate(json.loads(line))
+        except ValueError as exc:  # json.JSONDecodeError 也是 ValueError
+            yield line_no, exc
+
+
+# =========================
+# 匯入
+# =========================
+def _resolve_categories(names) -> dict:
+    """分類名稱（不分大小寫，與表單相同）對應到 id，缺的一次補建；回傳 {name.lower(): id}。"""
+    wanted = {}
+    for n in names:
+        wanted.setdefault(n.lower(), n)
+
+    def lookup():
+        rows = (
+            db.session.query(Category.id, Category.name)
+            .filter(bulk.lower_in(Category.name, wanted))
+            .order_by(Category.id)
+        )
+        found = {}
+        for cid, name in rows:
+            found.setdefault(name.lower(), cid)
+        return found
+
+    found = lookup()
+    missing = [n for key, n in wanted.items() if key not in found]
+    if missing:
+        bulk.insert_ignoring_conflicts(Category, [dict(name=n) for n in missing], ["name"])
+        found = lookup()
+    return found
+
+
+def _resolve_users(usernames) -> tuple:
+    """使用者名稱對應到 id，缺的以無法登入的帳號補建；回傳 ({username: id}, 新建數)。"""
+    wanted = list(set(usernames))
+
+    def lookup():
+        return dict(db.session.query(User.username, User.id).filter(User.username.in_(wanted)))
+
+    found = lookup()
+    missing = [u for u in wanted if u not in found]
+    if missing:
+        bulk.insert_ignoring_conflicts(User, [
+            dict(username=u, email=f"{u}@users.invalid", password_hash=LOCKED_PASSWORD_HASH) for u in missing
+        ], ["username"])
+        found = lookup()
+    return found, len(missing)
+
+
+def _allergen_bits(ingredient_ids: dict, flagged: set) -> dict:
+    """把記錄中標示為過敏原的食材設為過敏原（經由 ORM，models 的事件會分配位元並同步既有食譜），
+    回傳 {ingredient_id: allergen_bit}（只含過敏原）。"""
+    ids = list(set(ingredient_ids.values()))
+    flagged_ids = [ingredient_ids[n] for n in flagged if n in ingredient_ids]
+    if flagged_ids:
+        for ing in Ingredient.query.filter(Ingredient.id.in_(flagged_ids), Ingredient.is_allergen.is_(False)):
+            ing.is_allergen = True
+        db.session.flush()
+    return dict(
+        db.session.query(Ingredient.id, Ingredient.allergen_bit)
+        .filter(Ingredient.id.in_(ids), Ingredient.allergen_bit.isnot(None))
+    )
+
+
+def import_batch(records: list) -> dict:
+    """寫入一批已驗證的記錄（呼叫端負責 commit）；名稱已存在的食譜略過。回傳各項筆數。"""
+    counts = dict(recipes=0, skipped=0, users=0, needs=0, steps=0, reviews=0)
+    existing = set(db.session.scalars(select(Recipe.name).where(Recipe.name.in_([r["name"] for r in records]))))
+    fresh = []
+    for rec in records:
+        if rec["name"] in existing:
+            counts["skipped"] += 1
+            continue
+        existing.add(rec["name"])  # 同一批內重複的名稱也只取第一筆
+        fresh.append(rec)
+    if not fresh:
+        return counts
+
+    category_ids = _resolve_categories(rec["category"] for rec in fresh)
+    user_ids, counts["users"] = _resolve_users(
+        [rec["author"] for rec in fresh] + [rv["user"] for rec in fresh for rv in rec["reviews"]]
+    )
+    ingredient_ids = bulk.resolve_ingredients(i["name"] for rec in fresh for i in rec["ingredients"])
+    bits = _allergen_bits(
+        ingredient_ids,
+        {i["name"].lower() for rec in fresh for i in rec["ingredients"] if i["allergen"]},
+    )
+
+    # 食譜：評分彙總與過敏原遮罩直接算好（Core 寫入不經過 ORM 事件），RETURNING 取回新 id
+    now = datetime.utcnow()
+    recipe_rows = []
+    for rec in fresh:
+        created = rec["created_at"] or now
+        recipe_rows.append(dict(
+            name=rec["name"], description=rec["description"], cook_time_min=rec["cook_time_min"],
+            created_at=created, updated_at=created, image_url=rec["image_url"],
+            user_id=user_ids[rec["author"]], cate_id=category_ids[rec["category"].lower()],
+            review_count=len(rec["reviews"]), rating_sum=sum(rv["rating"] for rv in rec["reviews"]),
+            allergen_mask=allergen_mask_for(bits.get(ingredient_ids[i["name"].lower()]) for i in rec["ingredients"]),
+        ))
+    table = Recipe.__table__
+    recipe_ids = dict(
+        (name, rid) for rid, name in
+        db.session.execute(insert(table).returning(table.c.id, table.c.name), recipe_rows)
+    )
+
+    need_rows, step_rows, review_rows, search_rows = [], [], [], []
+    for rec in fresh:
+        rid = recipe_ids[rec["name"]]
+        need_rows += [
+            dict(recipe_id=rid, ingredient_id=ingredient_ids[i["name"].lower()], quantity=i["quantity"], unit=i["unit"])
+            for i in rec["ingredients"]
+        ]
+        step_rows += [dict(recipe_id=rid, step=s, position=p) for p, s in enumerate(rec["steps"])]
+        review_rows += [
+            dict(recipe_id=rid, user_id=user_ids[rv["user"]], rating=rv["rating"], comment=rv["comment"])
+            for rv in rec["reviews"]
+        ]
+        search_rows.append(dict(
+            recipe_id=rid,
+            name_terms=search._terms(rec["name"]),
+            body_terms=search._terms(rec["description"], *(i["name"] for i in rec["ingredients"]), *rec["steps"]),
+        ))
+    for model, rows in ((Need, need_rows), (CookInstruction, step_rows), (Review, review_rows),
+                        (RecipeSearch, search_rows)):
+        bulk.insert_many(model, rows)
+
+    counts.update(recipes=len(fresh), needs=len(need_rows), steps=len(step_rows), reviews=len(review_rows))
+    return counts
+
+
+def import_lines(lines, batch_size: int = 1000, start_line: int = 1, log=print) -> dict:
+    """匯入 JSONL；每 batch_size 筆一個 transaction，提交後回報已完成到哪一行。
+
+    某一批違反資料庫約束（IntegrityError，例如其他程序同時新增了同名食譜）時 rollback 整批、記入 failed，
+    繼續下一批；之後以 --start-line 重新匯入該範圍即可。
+    """
+    totals = dict(recipes=0, skipped=0, invalid=0, failed=0, users=0, needs=0, steps=0, reviews=0)
+    batch, first_line, last_line = [], None, start_line - 1
+
+    def flush():
+        try:
+            counts = import_batch(batch)
+            db.session.commit()
+        except IntegrityError as exc:
+            db.session.rollback()
+            totals["failed"] += len(batch)
+            log(f"  第 {first_line}–{last_line} 行未匯入（整批 rollback）：{exc.orig}")
+        else:
+            for key, value in counts.items():
+                totals[key] += value
+            log(f"  已提交至第 {last_line} 行（新增 {totals['recipes']}、略過 {totals['skipped']}、錯誤 {totals['invalid']}）")
+        batch.clear()
+
+    for line_no, record in read_records(lines, start_line):
+        last_line = line_no
+        if isinstance(record, ValueError):
+            totals["invalid"] += 1
+            log(f"  第 {line_no} 行：{record}")
+            continue
+        if not batch:
+            first_line = line_no
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return totals
+
+
+# =========================
+# 匯出
+# =========================
+def _grouped(stmt) -> dict:
+    """第一欄為 recipe_id 的查詢結果，依 recipe_id 分組。"""
+    groups = {}
+    for row in db.session.execute(stmt):
+        groups.setdefault(row[0], []).append(row[1:])
+    return groups
+
+
+def export_records(after_id: int = 0, batch_size: int = 500):
+    """依 id 遞增逐道產生食譜記錄（dict，含 id）。"""
+    stmt = (
+        select(
+            Recipe.id, Recipe.name, Recipe.description, Recipe.cook_time_min, Recipe.created_at,
+            Recipe.image_url, Category.name, User.username,
+        )
+        .join(Category, Category.id == Recipe.cate_id)
+        .join(User, User.id == Recipe.user_id)
+        .where(Recipe.id > after_id)
+        .order_by(Recipe.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in db.session.execute(stmt).partitions():
+        ids = [row[0] for row in partition]
+        steps = _grouped(
+            select(CookInstruction.recipe_id, CookInstruction.step)
+            .where(CookInstruction.recipe_id.in_(ids))
+            .order_by(CookInstruction.recipe_id, CookInstruction.position)
+        )
+        needs = _grouped(
+            select(Need.recipe_id, Ingredient.name, Need.quantity, Need.unit, Ingredient.is_allergen)
+            .join(Ingredient, Ingredient.id == Need.ingredient_id)
+            .where(Need.recipe_id.in_(ids))
+            .order_by(Need.recipe_id, Ingredient.name)
+        )
+        reviews = _grouped(
+            select(Review.recipe_id, User.username, Review.rating, Review.comment)
+            .join(User, User.id == Review.user_id)
+            .where(Review.recipe_id.in_(ids))
+            .order_by(Review.recipe_id, Review.id)
+        )
+        for rid, name, description, cook_time, created_at, image_url, category, author in partition:
+            yield dict(
+                id=rid, name=name, description=description, cook_time_min=cook_time,
+                category=category, author=author,
+                created_at=created_at.isoformat(timespec="seconds") if created_at else None,
+                image_url=image_url,
+                steps=[step for (step,) in steps.get(rid, ())],
+                ingredients=[
+                    dict(name=n, quantity=q, unit=u, allergen=a) for n, q, u, a in needs.get(rid, ())
+                ],
+                reviews=[dict(user=u, rating=r, comment=c) for u, r, c in reviews.get(rid, ())],
+            )
+
+
+def export_lines(after_id: int = 0, batch_size: int = 500):
+    for record in export_records(after_id, batch_size):
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
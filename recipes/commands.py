@@ -0,0 +1,101 @@
+# recipes/commands.py
+# `flask recipes ...` 管理指令
+import time
+
+import click
+from flask import current_app
+
+from . import recipes_bp, catalog
+import jobs
+import recommend
+import search
+
+
+@recipes_bp.cli.command("reindex-search")
+@click.option("--batch-size", default=500, show_default=True, help="每個 transaction 處理的食譜數")
+def reindex_search(batch_size: int):
+    """重建所有食譜的全文檢索文件。"""
+    count = search.reindex_all(batch_size=batch_size)
+    click.echo(f"已重建 {count} 筆食譜的檢索文件")
+
+
+@recipes_bp.cli.command("generate")
+@click.option("--users", default=100, show_default=True)
+@click.option("--recipes", "recipe_count", default=1000, show_default=True)
+@click.option("--categories", default=12, show_default=True)
+@click.option("--ingredients", default=200, show_default=True)
+@click.option("--reviews-per-recipe", default=3.0, show_default=True, help="平均每道食譜的評論數（依熱門程度 Zipf 分配）")
+@click.option("--zipf", "zipf_s", default=1.1, show_default=True, help="Zipf 指數，越大越集中在少數熱門項目")
+@click.option("--seed", default=0, show_default=True, help="亂數種子，相同參數產生相同資料")
+@click.option("--batch-size", default=2000, show_default=True)
+def generate(users, recipe_count, categories, ingredients, reviews_per_recipe, zipf_s, seed, batch_size):
+    """在目前的資料庫追加合成資料（使用者密碼皆為 secret）。"""
+    import datagen
+
+    started = time.perf_counter()
+    counts = datagen.generate(
+        users=users, recipes=recipe_count, categories=categories, ingredients=ingredients,
+        reviews_per_recipe=reviews_per_recipe, zipf_s=zipf_s, seed=seed, batch_size=batch_size,
+        log=click.echo,
+    )
+    summary = "、".join(f"{k} {v}" for k, v in counts.items())
+    click.echo(f"完成（{time.perf_counter() - started:.1f} 秒）：{summary}")
+
+
+@recipes_bp.cli.command("rebuild-similar")
+def rebuild_similar():
+    """重新計算所有食譜的相似食譜清單。"""
+    started = time.perf_counter()
+    count = recommend.rebuild(log=click.echo)
+    click.echo(f"已重建 {count} 道食譜的相似食譜（{time.perf_counter() - started:.1f} 秒）")
+
+
+@recipes_bp.cli.command("update-similar")
+@click.argument("recipe_ids", nargs=-1, type=int)
+@click.option("--missing", is_flag=True, help="更新所有還沒有清單的食譜")
+@click.option("--queued", is_flag=True, help="一併處理排隊中的 recommend.update 工作，並清除已完成的舊工作")
+def update_similar(recipe_ids, missing, queued):
+    """增量更新指定食譜的相似食譜，並插入其他食譜的清單。
+
+    沒有部署 worker（JOBS_INLINE=true）時以排程執行 `--queued`：新增與編輯過的食譜都會排入佇列。
+    """
+    ids = list(recipe_ids) + (recommend.missing_recipe_ids() if missing else [])
+    if queued:
+        # 工作標記為 done 與第一個區塊的結果一起 commit；中途失敗時未 commit 的工作仍在佇列中
+        ids += [payload["recipe_id"] for payload in jobs.take_queued("recommend.update")]
+    ids = sorted(set(ids))
+    if ids:
+        written = recommend.update_many(ids)
+        click.echo(f"已更新 {len(ids)} 道食譜，改寫 {written} 份清單")
+    else:
+        click.echo("沒有需要更新的食譜")
+    if queued:
+        pruned = jobs.prune(current_app.config.get("JOBS_KEEP_DONE_SECONDS", 86400))
+        click.echo(f"已清除 {pruned} 筆完成的工作")
+
+
+@recipes_bp.cli.command("import")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--batch-size", default=1000, show_default=True, help="每個 transaction 寫入的食譜數")
+@click.option("--start-line", default=1, show_default=True, help="從第幾行開始（接續中斷的匯入）")
+def import_catalog(source, batch_size, start_line):
+    """從 JSONL 匯入食譜（SOURCE 為 - 時讀標準輸入）；已存在的食譜名稱略過。"""
+    started = time.perf_counter()
+    totals = catalog.import_lines(source, batch_size=batch_size, start_line=start_line, log=click.echo)
+    summary = "、".join(f"{k} {v}" for k, v in totals.items())
+    click.echo(f"完成（{time.perf_counter() - started:.1f} 秒）：{summary}")
+    if totals["recipes"]:
+        click.echo("可執行 `flask recipes update-similar --missing` 為新食譜計算相似食譜")
+
+
+@recipes_bp.cli.command("export")
+@click.argument("target", type=click.File("w", encoding="utf-8"), default="-")
+@click.option("--after-id", default=0, show_default=True, help="只匯出 id 大於此值的食譜（接續中斷的匯出）")
+@click.option("--batch-size", default=500, show_default=True, help="每次從資料庫讀取的食譜數")
+def export_catalog(target, after_id, batch_size):
+    """把食譜匯出為 JSONL（TARGET 預設為標準輸出）。"""
+    count = 0
+    for line in catalog.export_lines(after_id=after_id, batch_size=batch_size):
+        target.write(line)
+        count += 1
+    click.echo(f"已匯出 {count} 道食譜", err=True)
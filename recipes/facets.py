@@ -0,0 +1,101 @@
+# recipes/facets.py
+# 篩選面板的計數（faceted navigation），依目前的篩選條件計算：
+#   - 各分類的食譜數：套用其他條件、不套用分類本身，切換分類前就知道各有幾道
+#   - 各過敏原「排除之後」剩幾道：套用全部條件，等於再勾選它的結果數
+#   - 各烹調時間區間的食譜數：套用其他條件、不套用區間本身
+#
+# 三者來自同一個彙總查詢：關鍵字與過敏原條件篩選後依 (分類, 時間區間) 分組，每組再以
+# SUM(CASE ...) 計算各過敏原位元不在 allergen_mask 中的筆數；分組數最多為分類數 × 區間數，
+# 依所選的分類 / 區間在 Python 端加總。SQLite 沒有 GROUPING SETS，這個寫法兩種資料庫相同。
+#
+# 結果以正規化後的篩選條件為 key 快取 FACETS_TTL 秒；寫入時不主動失效，數字最多延遲這麼久。
+import hashlib
+import json
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy import case, func
+
+from cache import cache
+from models import Recipe, allergen_mask_for
+import search
+from .filters import COOK_TIME_BUCKETS, apply_filters, cook_time_filter
+
+
+class Facets(NamedTuple):
+    total: int        # 套用全部條件的結果數
+    categories: dict  # 分類 id -> 食譜數
+    allergens: dict   # 過敏原 id -> 排除後剩幾道（沒有分配位元的過敏原不計）
+    cook_time: dict   # 區間 key -> 食譜數
+
+
+def normalize(q, category_id=None, allergen_ids=(), cook_time=None) -> tuple:
+    """篩選條件的正規形式（快取 key）：關鍵字去除多餘空白並轉小寫、過敏原排序去重、未知的區間視為不篩選。"""
+    return (
+        " ".join((q or "").split()).lower(),
+        category_id or None,
+        tuple(sorted(set(allergen_ids or ()))),
+        cook_time if cook_time_filter(cook_time) is not None else None,
+    )
+
+
+def _bucket():
+    return case(*((cook_time_filter(key), key) for key, _, _, _ in COOK_TIME_BUCKETS))
+
+
+def compute(q, category_id, allergen_ids, cook_time, allergens) -> dict:
+    """以一次彙總查詢算出所有計數；allergens 為 [{'id', 'bit'}, ...]。回傳可 JSON 序列化的 dict。"""
+    query = Recipe.query
+    if q:
+        query, _ = search.match(query, q)
+    query = apply_filters(query, allergen_ids=allergen_ids)
+
+    bits = [(a["id"], a["bit"]) for a in allergens if a.get("bit") is not None]
+    bucket = _bucket().label("bucket")
+    kept = [
+        func.sum(case((Recipe.allergen_mask.op("&")(allergen_mask_for([bit])) == 0, 1), else_=0))
+        for _, bit in bits
+    ]
+    rows = (
+        query.with_entities(Recipe.cate_id, bucket, func.count(Recipe.id), *kept)
+        .group_by(Recipe.cate_id, bucket)
+        .all()
+    )
+
+    total = 0
+    categories, buckets, without = {}, {}, [0] * len(bits)
+    for cate_id, key, count, *counts in rows:
+        in_category = not category_id or cate_id == category_id
+        in_bucket = cook_time is None or key == cook_time
+        if in_bucket:
+            categories[cate_id] = categories.get(cate_id, 0) + count
+        if in_category:
+            buckets[key] = buckets.get(key, 0) + count
+        if in_category and in_bucket:
+            total += count
+            without = [a + int(b or 0) for a, b in zip(without, counts)]
+
+    # 清單形式（Redis backend 以 JSON 儲存，dict 的整數 key 會變成字串）
+    return {
+        "total": total,
+        "categories": sorted(categories.items()),
+        "allergens": [[aid, n] for (aid, _), n in zip(bits, without)],
+        "cook_time": [[key, buckets.get(key, 0)] for key, _, _, _ in COOK_TIME_BUCKETS],
+    }
+
+
+def get(q, category_id, allergen_ids, cook_time, allergens) -> Facets:
+    """目前篩選條件的計數（快取 FACETS_TTL 秒）。"""
+    key = normalize(q, category_id, allergen_ids, cook_time)
+    digest = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode()).hexdigest()
+    raw = cache.get_or_set(
+        f"facets:{digest}",
+        lambda: compute(*key, allergens),
+        ttl=current_app.config.get("FACETS_TTL", 60),
+    )
+    return Facets(
+        total=raw["total"],
+        categories=dict(raw["categories"]),
+        allergens=dict(raw["allergens"]),
+        cook_time=dict(raw["cook_time"]),
+    )
@@ -0,0 +1,59 @@
+# recipes/filters.py
+# 食譜清單的篩選條件（網頁清單與 API 共用）
+from extensions import db
+from models import Recipe, Need, Ingredient, allergen_mask_for
+
+# 烹調時間區間：(key, 標籤, 下限, 上限)，上下限皆含，None 表示不限
+COOK_TIME_BUCKETS = (
+    ("quick", "15 分鐘內", None, 15),
+    ("medium", "16–30 分鐘", 16, 30),
+    ("long", "31–60 分鐘", 31, 60),
+    ("slow", "超過 60 分鐘", 61, None),
+)
+_BUCKETS = {key: (low, high) for key, _, low, high in COOK_TIME_BUCKETS}
+
+
+def cook_time_filter(key):
+    """區間 key 對應的條件；未知的 key 回傳 None（不篩選）。"""
+    if key not in _BUCKETS:
+        return None
+    low, high = _BUCKETS[key]
+    conditions = []
+    if low is not None:
+        conditions.append(Recipe.cook_time_min >= low)
+    if high is not None:
+        conditions.append(Recipe.cook_time_min <= high)
+    return db.and_(*conditions)
+
+
+def apply_filters(query, category_id=None, allergen_ids=(), cook_time=None):
+    # 分類篩選
+    if category_id:
+        query = query.filter(Recipe.cate_id == category_id)
+
+    # 烹調時間區間
+    condition = cook_time_filter(cook_time)
+    if condition is not None:
+        query = query.filter(condition)
+
+    # 過敏原篩選（排除含有任一所選過敏原的食譜）
+    allergen_ids = sorted(set(allergen_ids or ()))
+    if allergen_ids:
+        bits = dict(
+            db.session.query(Ingredient.id, Ingredient.allergen_bit)
+            .filter(Ingredient.id.in_(allergen_ids))
+        )
+        # 已分配位元的過敏原：一個位元運算條件，沿著排序索引逐列判斷，不需要子查詢
+        mask = allergen_mask_for(bits.values())
+        if mask:
+            query = query.filter(Recipe.allergen_mask.op("&")(mask) == 0)
+        # 不是過敏原的食材沒有位元，退回 NOT IN 子查詢（多個 id 合併成一個）
+        others = [iid for iid in allergen_ids if iid in bits and bits[iid] is None]
+        if others:
+            query = query.filter(
+                ~Recipe.id.in_(
+                    db.session.query(Need.recipe_id)
+                    .filter(Need.ingredient_id.in_(others))
+                )
+            )
+    return query
@@ -1,5 +1,5 @@
 # recipes/forms.py
-from wtforms import Form, StringField, IntegerField, TextAreaField, validators
+from wtforms import Form, StringField, IntegerField, TextAreaField, FileField, BooleanField, validators
 
 class RecipeForm(Form):
     name = StringField("食譜名稱", [validators.DataRequired(), validators.Length(max=120)])
@@ -7,6 +7,9 @@ class RecipeForm(Form):
     cook_time_min = IntegerField("料理時間(分鐘)", [validators.DataRequired()])
     category = StringField("分類名稱", [validators.DataRequired(), validators.Length(max=80)])
     image_url = StringField("封面圖片 URL", [validators.Optional(), validators.Length(max=255)])
+    # 上傳封面（優先於 URL）；編輯時可勾選移除
+    image_file = FileField("上傳封面圖片")
+    remove_image = BooleanField("移除已上傳的封面")
 
     # 簡易輸入：每行一個步驟
     steps_text = TextAreaField("步驟（每行一個）", [validators.Optional()])
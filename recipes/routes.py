@@ -1,79 +1,230 @@
 # recipes/routes.py
-from flask import render_template, request, redirect, url_for, flash
+from flask import (
+    render_template, request, redirect, url_for, flash, abort, make_response,
+    get_template_attribute, session, current_app,
+)
+from markupsafe import Markup
+from werkzeug.datastructures import CombinedMultiDict
 from flask_login import login_required, current_user
 from sqlalchemy import func
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from . import recipes_bp                     # Blueprint 由 recipes/__init__.py 建立 
 from .forms import RecipeForm                # 表單（名稱需與 templates 對應）         
+from . import bulk
+from . import facets
+from .filters import apply_filters, COOK_TIME_BUCKETS
 from extensions import db
+from cache import cache
+import http_cache
+import streaming
+from pagination import keyset_page, keyset_stream, RECENT, PER_PAGE
+import search
+import pantry
+import jobs
+import autocomplete
+import recommend
+import images
+from loading import load_profile, REVIEW_WITH_USER
 from models import (
-    Recipe, Category, Ingredient, CookInstruction, Review, Need
+    Recipe, Category, Ingredient, Review, Need
 )
 
 # =========================
-# 食譜清單 + 篩選
+# 快取：側欄資料、食譜卡片、匿名使用者的詳細頁
 # =========================
-@recipes_bp.route('/')
-def index():
-    q = (request.args.get('q') or '').strip()
-    category_id = request.args.get('category_id', type=int)
-    allergen_id = request.args.get('allergen_id', type=int)  # 新增過敏原篩選
+SIDEBAR_KEY = "sidebar:v2"  # v2：分類不含食譜數、過敏原含位元（Redis 中舊格式的快取不再讀取）
 
-    # 抓出所有分類、過敏原資料
+
+def _sidebar_data():
+    # 只放可序列化的值（Redis backend 以 JSON 儲存）；各分類的食譜數依篩選條件另算（facets.py）
     categories = (
-        db.session.query(
-            Category,
-            db.func.count(Recipe.id).label('recipe_count')
-        )
-        .outerjoin(Recipe, Recipe.cate_id == Category.id)
-        .group_by(Category.id)
+        db.session.query(Category.id, Category.name)
         .order_by(Category.id)
         .all()
     )
+    allergens = (
+        db.session.query(Ingredient.id, Ingredient.name, Ingredient.allergen_bit)
+        .filter_by(is_allergen=True)
+        .order_by(Ingredient.id)
+        .all()
+    )
+    return {
+        'categories': [{'id': cid, 'name': name} for cid, name in categories],
+        'allergens': [{'id': aid, 'name': name, 'bit': bit} for aid, name, bit in allergens],
+    }
+
+
+def _card_version(r) -> tuple:
+    """卡片內容的版本；快取 key 與清單的 ETag 共用，ETag 描述的就是送出的卡片。"""
+    return r.id, r.updated_at.timestamp()
+
+
+@recipes_bp.app_template_global()
+def render_card(r):
+    """渲染（或取出快取的）食譜卡片，清單與控制台共用。
+
+    key 含 updated_at（評論也會更新它）：各 worker 的記憶體快取不必互相通知，
+    內容一改就換 key，舊版本等 TTL 到期；寫入尚未 commit 前讀到的舊卡片也不會沿用到新版本。
+    """
+    html = cache.get_or_set(
+        "card:%s:%s" % _card_version(r),
+        lambda: str(get_template_attribute('_macros.html', 'card')(r)),
+    )
+    return Markup(html)
 
-    allergens = Ingredient.query.filter_by(is_allergen=True).order_by(Ingredient.id).all()
+
+def _invalidate_recipe(rid: int, sidebar: bool = False):
+    """食譜內容或評論有變動（已 commit）後呼叫；卡片快取以 updated_at 分版本，不必刪除。"""
+    cache.delete(f"show:{rid}")
+    if sidebar:
+        cache.delete(SIDEBAR_KEY)
+
+
+# =========================
+# 食譜清單 + 篩選
+# =========================
+@recipes_bp.route('/')
+def index():
+    q = (request.args.get('q') or '').strip()
+    category_id = request.args.get('category_id', type=int)
+    allergen_ids = request.args.getlist('allergen_id', type=int)  # 過敏原篩選（可複選，排除含任一者）
+    cook_time = request.args.get('cook_time') or None  # 烹調時間區間（filters.COOK_TIME_BUCKETS）
+
+    # 抓出所有分類、過敏原資料（快取，新增 / 編輯 / 刪除食譜時失效）
+    sidebar = cache.get_or_set(SIDEBAR_KEY, _sidebar_data)
+    categories = sidebar['categories']
+    allergens = sidebar['allergens']
 
     # 建立查詢
-    query = Recipe.query
+    query = Recipe.query.options(*load_profile('card'))
 
-    # 關鍵字搜尋
+    # 關鍵字搜尋（全文檢索，依相關度排序）
+    sort = RECENT
     if q:
-        like = f"%{q}%"
-        query = query.filter(
-            (Recipe.name.ilike(like)) |
-            (Recipe.description.ilike(like))
-        )
+        query, sort = search.apply(query, q)
 
-    # 分類篩選
-    current_category = None
-    if category_id:
-        query = query.filter_by(cate_id=category_id)
-        current_category = Category.query.get(category_id)
-
-    # 過敏原篩選（排除含有該過敏原的食譜）
-    if allergen_id:
-        query = query.filter(
-            ~Recipe.id.in_(
-                db.session.query(Need.recipe_id)
-                .filter(Need.ingredient_id == allergen_id)
-            )
-        )
+    # 分類 / 過敏原篩選
+    query = apply_filters(query, category_id=category_id, allergen_ids=allergen_ids, cook_time=cook_time)
+    current_category = next((c for c in categories if c['id'] == category_id), None)
 
-    # 取得結果
-    recipes = query.order_by(Recipe.created_at.desc()).all()
+    # 篩選面板的計數：依目前條件一次算出，短暫快取
+    counts = facets.get(q, category_id, allergen_ids, cook_time, allergens)
 
-    return render_template(
-        'recipes/index.html',
-        recipes=recipes,
+    context = dict(
         categories=categories,
         allergens=allergens,
         current_category=current_category,
         q=q,
         selected_category_id=category_id,
-        selected_allergen_id=allergen_id
+        selected_allergen_ids=allergen_ids,
+        selected_cook_time=cook_time,
+        facets=counts,
+        cook_time_buckets=COOK_TIME_BUCKETS,
+    )
+    paging = dict(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=current_app.config.get('LISTING_PER_PAGE', PER_PAGE),
+        sort=sort,
     )
 
+    # 串流模式：表頭與篩選列先送出，卡片邊查邊渲染（沒有 ETag，見 config.LISTING_STREAM）
+    if current_app.config.get('LISTING_STREAM'):
+        page = keyset_stream(query, **paging)
+        resp = streaming.render('recipes/index.html', recipes=page.items, page=page, **context)
+        return http_cache.with_validators(resp, None)
+
+    # 取得結果（游標分頁，只載入當頁）
+    page = keyset_page(query, **paging)
+
+    # 條件式請求：本頁卡片的版本（與卡片快取 key 相同）、翻頁游標與側欄都沒變就回 304，不渲染模板
+    etag = http_cache.page_etag(
+        request.query_string.decode(),
+        [_card_version(r) for r in page.items],
+        page.next_cursor, page.prev_cursor,
+        sidebar, counts,
+    )
+    if http_cache.is_not_modified(etag):
+        return http_cache.not_modified_response(etag)
+
+    resp = make_response(render_template('recipes/index.html', recipes=page.items, page=page, **context))
+    return http_cache.with_validators(resp, etag)
+
+
+# =========================
+# 手邊食材配對：依覆蓋率列出食譜與缺少的食材
+# =========================
+def _split_names(text: str) -> list:
+    for sep in "，、\n":
+        text = text.replace(sep, ",")
+    return list(dict.fromkeys(n.strip() for n in text.split(",") if n.strip()))
+
+
+@recipes_bp.route('/pantry')
+def pantry_match():
+    have_text = (request.args.get('have') or '').strip()
+    names = _split_names(have_text)
+
+    # 只查既有食材（不建立新的）；以 lower(name) IN (...) 走 ix_ingredient_name_lower
+    known = {}
+    if names:
+        rows = (
+            db.session.query(Ingredient.id, Ingredient.name)
+            .filter(bulk.lower_in(Ingredient.name, {n.lower() for n in names}))
+        )
+        known = {name.lower(): iid for iid, name in rows}
+    unknown = [n for n in names if n.lower() not in known]
+
+    matches = pantry.index.match(known.values(), k=PER_PAGE) if known else []
+
+    # 當頁食譜與缺少的食材名稱各一次查詢
+    recipes = {
+        r.id: r for r in
+        Recipe.query.options(*load_profile('card')).filter(Recipe.id.in_([m.recipe_id for m in matches]))
+    }
+    missing_ids = {iid for m in matches for iid in m.missing}
+    missing_names = dict(
+        db.session.query(Ingredient.id, Ingredient.name).filter(Ingredient.id.in_(missing_ids))
+    ) if missing_ids else {}
+
+    results = [
+        (recipes[m.recipe_id], m, [missing_names[iid] for iid in m.missing])
+        for m in matches if m.recipe_id in recipes
+    ]
+    return render_template(
+        'recipes/pantry.html',
+        have=have_text,
+        results=results,
+        unknown=unknown,
+    )
+
+
+def _form_data():
+    # 上傳的封面在 request.files，其餘欄位在 request.form
+    return CombinedMultiDict((request.files, request.form))
+
+
+def _index_names(category, parsed, ingredient_ids):
+    """（已 commit）把這次用到的分類 (id, name) 與食材加入自動完成索引；已存在的會略過。"""
+    autocomplete.indexes["categories"].add([category])
+    autocomplete.indexes["ingredients"].add(
+        (ingredient_ids[name.lower()], name) for name, _, _ in parsed if name.lower() in ingredient_ids
+    )
+
+
+def _recommend_delay():
+    # 延後執行相似食譜更新，讓 worker 把這段時間內的編輯併成一批（見 recommend.py）
+    return current_app.config.get("RECOMMEND_UPDATE_DELAY_SECONDS", 30)
+
+
+def _save_cover(form):
+    """儲存上傳的封面並回傳 key；沒有上傳回傳 None，不是圖片丟 ValueError。"""
+    upload = form.image_file.data
+    if not (upload and getattr(upload, "filename", "")):
+        return None
+    return images.store_upload(upload)
+
 
 # =========================
 # 新增食譜
@@ -81,8 +232,13 @@ def index():
 @recipes_bp.route("/new", methods=["GET", "POST"])
 @login_required
 def new():
-    form = RecipeForm(request.form)
+    form = RecipeForm(_form_data() if request.method == "POST" else None)
     if request.method == "POST" and form.validate():
+        try:
+            image_key = _save_cover(form)
+        except (ValueError, RuntimeError) as exc:
+            flash(f"封面上傳失敗：{exc}", "danger")
+            return render_template("recipes/new.html", form=form)
         try:
             # 1) 分類（若不存在自動建立） 
             cate = Category.query.filter(
@@ -101,40 +257,30 @@ def new():
                 category=cate,
                 author=current_user,
                 image_url=form.image_url.data or None,
+                image_key=image_key,
             )
             db.session.add(r)
             db.session.flush()  # 取得 r.id
-
-            # 3) 步驟（每行一筆） 
-            steps = [s.strip() for s in (form.steps_text.data or "").splitlines() if s.strip()]
-            for s in steps:
-                db.session.add(CookInstruction(step=s, recipe=r))
-
-            # 4) 食材 + 用量（Need） 
-            ing_lines = [ln.strip() for ln in (form.ingredients_text.data or "").splitlines() if ln.strip()]
-            for ln in ing_lines:
-                parts = [p.strip() for p in ln.split(",")]
-                if len(parts) < 3:
-                    continue  # 不合法的行就略過
-                name, qty, unit = parts[0], parts[1], parts[2]
-                try:
-                    qty_val = float(qty)
-                except ValueError:
-                    qty_val = 0
-                ing = Ingredient.query.filter(
-                    func.lower(Ingredient.name) == func.lower(name)
-                ).first()
-                if not ing:
-                    ing = Ingredient(name=name)
-                    db.session.add(ing)
-                    db.session.flush()
-                db.session.add(Need(
-                    recipe_id=r.id, ingredient_id=ing.id,
-                    quantity=qty_val, unit=unit
-                ))
-
-            # 5) 一次提交 
+            if image_key:
+                jobs.enqueue("images.thumbnails", key=image_key)
+
+            # 3) 步驟（每行一筆，批次寫入） 
+            bulk.insert_steps(r.id, bulk.parse_steps(form.steps_text.data))
+
+            # 4) 食材 + 用量（Need）：名稱一次查完、缺的一次補建 
+            parsed = bulk.parse_ingredients(form.ingredients_text.data)
+            ingredient_ids = bulk.resolve_ingredients(name for name, _, _ in parsed)
+            bulk.insert_needs(r.id, parsed, ingredient_ids)
+            bulk.refresh_allergen_mask(r)
+
+            # 5) 全文檢索文件、相似食譜交給背景工作（工作與食譜一起提交） 
+            jobs.enqueue("search.reindex", recipe_id=r.id)
+            jobs.enqueue("recommend.update", recipe_id=r.id, delay=_recommend_delay())
+            category = (cate.id, cate.name)  # commit 後屬性會過期，先記下免得再查一次
             db.session.commit()
+            _invalidate_recipe(r.id, sidebar=True)
+            pantry.index.update_recipe(r.id, ingredient_ids.values())
+            _index_names(category, parsed, ingredient_ids)
             flash("已新增食譜", "success")
             return redirect(url_for("recipes.show", rid=r.id))
 
@@ -167,10 +313,15 @@ def new():
 @recipes_bp.route("/<int:rid>/edit", methods=["GET", "POST"])
 @login_required
 def edit(rid: int):
-    r = Recipe.query.get_or_404(rid)
-    form = RecipeForm(request.form if request.method == "POST" else None)
+    r = Recipe.query.options(*load_profile("edit")).get_or_404(rid)
+    form = RecipeForm(_form_data() if request.method == "POST" else None)
 
     if request.method == "POST" and form.validate():
+        try:
+            image_key = _save_cover(form)
+        except (ValueError, RuntimeError) as exc:
+            flash(f"封面上傳失敗：{exc}", "danger")
+            return render_template("recipes/edit.html", form=form, r=r)
         try:
             # 分類（若不存在自動建立） 
             cate = Category.query.filter(
@@ -181,51 +332,41 @@ def edit(rid: int):
                 db.session.add(cate)
                 db.session.flush()
 
-            # 更新食譜本體 // CHANGE
+            # 更新食譜本體（值沒變的欄位 ORM 不會寫入） // CHANGE
+            text_changed = (r.name, r.description) != (form.name.data, form.description.data)
             r.name = form.name.data
             r.description = form.description.data
             r.cook_time_min = form.cook_time_min.data or 0
             r.category = cate
             r.image_url = form.image_url.data or None
-
-            # 先清空舊步驟與 Need，再重建（簡化流程） // CHANGE
-            CookInstruction.query.filter_by(recipe_id=r.id).delete()
-            db.session.query(Need).filter_by(recipe_id=r.id).delete()
-
-            # 重建步驟 
-            steps = [s.strip() for s in (form.steps_text.data or "").splitlines() if s.strip()]
-            for s in steps:
-                db.session.add(CookInstruction(step=s, recipe=r))
-
-            db.session.flush()
-            db.session.query(CookInstruction).filter_by(recipe_id=r.id).delete()
-            for s in steps:
-                db.session.add(CookInstruction(step=s, recipe=r))
-
-            # 重建 Need 
-            ing_lines = [ln.strip() for ln in (form.ingredients_text.data or "").splitlines() if ln.strip()]
-            for ln in ing_lines:
-                parts = [p.strip() for p in ln.split(",")]
-                if len(parts) < 3:
-                    continue
-                name, qty, unit = parts[0], parts[1], parts[2]
-                try:
-                    qty_val = float(qty)
-                except ValueError:
-                    qty_val = 0
-                ing = Ingredient.query.filter(
-                    func.lower(Ingredient.name) == func.lower(name)
-                ).first()
-                if not ing:
-                    ing = Ingredient(name=name)
-                    db.session.add(ing)
-                    db.session.flush()
-                db.session.add(Need(
-                    recipe_id=r.id, ingredient_id=ing.id,
-                    quantity=qty_val, unit=unit
-                ))
-
+            if image_key:
+                r.image_key = image_key
+                jobs.enqueue("images.thumbnails", key=image_key)
+            elif form.remove_image.data:
+                r.image_key = None
+
+            # 步驟：依位置比對，只寫入有變動的列 
+            steps_written = bulk.sync_steps(r.id, r.steps, bulk.parse_steps(form.steps_text.data))
+
+            # Need：名稱一次查完、缺的一次補建，再依 ingredient_id 比對差異 
+            parsed = bulk.parse_ingredients(form.ingredients_text.data)
+            ingredient_ids = bulk.resolve_ingredients(name for name, _, _ in parsed)
+            needs_written = bulk.sync_needs(r.id, parsed, ingredient_ids)
+            if needs_written:
+                bulk.refresh_allergen_mask(r)
+
+            if steps_written or needs_written:
+                r.touch()  # 步驟 / Need 以批次語法寫入，ORM 不會自動更新 updated_at
+            if text_changed or steps_written or needs_written:
+                jobs.enqueue("search.reindex", recipe_id=r.id)
+            if needs_written:
+                jobs.enqueue("recommend.update", recipe_id=r.id, delay=_recommend_delay())
+            category = (cate.id, cate.name)  # commit 後屬性會過期，先記下免得再查一次
             db.session.commit()
+            _invalidate_recipe(r.id, sidebar=True)
+            if needs_written:
+                pantry.index.update_recipe(r.id, ingredient_ids.values())
+            _index_names(category, parsed, ingredient_ids)
             flash("已更新食譜", "success")
             return redirect(url_for("recipes.show", rid=r.id))
 
@@ -263,8 +404,11 @@ def edit(rid: int):
 @login_required
 def delete(rid: int):
     r = Recipe.query.get_or_404(rid)
+    recommend.forget(rid)
     db.session.delete(r)
     db.session.commit()
+    _invalidate_recipe(rid, sidebar=True)
+    pantry.index.remove_recipe(rid)
     flash("已刪除食譜", "info")
     return redirect(url_for("recipes.index"))
 
@@ -273,7 +417,28 @@ def delete(rid: int):
 # =========================
 @recipes_bp.route("/<int:rid>")
 def show(rid: int):
-    r = Recipe.query.get_or_404(rid)
+    # 條件式請求：先只查 updated_at 與相似食譜的計算時間，都沒變就回 304，不載入關聯也不渲染
+    row = (
+        db.session.query(Recipe.updated_at, recommend.computed_at(rid))
+        .filter(Recipe.id == rid)
+        .first()
+    )
+    if row is None:
+        abort(404)
+    updated_at = max(row[0], row[1] or row[0])
+    etag = http_cache.page_etag("show", rid, *row)
+    if http_cache.is_not_modified(etag, updated_at):
+        return http_cache.not_modified_response(etag, updated_at)
+
+    # 匿名且沒有待顯示訊息的讀者看到的是同一份頁面，直接回傳快取
+    # （背景工作改寫相似食譜時無法清掉各 worker 的快取，因此連同 ETag 一起存，版本不符就重新渲染）
+    cacheable = not current_user.is_authenticated and not session.get("_flashes")
+    if cacheable:
+        cached = cache.get(f"show:{rid}")
+        if cached is not None and cached[0] == etag:
+            return http_cache.with_validators(make_response(cached[1]), etag, updated_at)
+
+    r = Recipe.query.options(*load_profile("detail")).get_or_404(rid)
     # 連 Need + Ingredient 以顯示數量/單位 
     needs = (
         db.session.query(Need, Ingredient)
@@ -282,25 +447,26 @@ def show(rid: int):
         .all()
     )
 
-    # ---- 顯示評論：清單、統計（平均分數與筆數） ----
+    # ---- 顯示評論：清單；統計直接讀 Recipe 上的彙總欄位 ----
     reviews = (
         Review.query
+        .options(*REVIEW_WITH_USER)
         .filter(Review.recipe_id == r.id)
         .order_by(Review.rating.desc())
         .all()
     )
-    review_count, avg_rating = db.session.query(
-        func.count(Review.id),
-        func.coalesce(func.avg(Review.rating), 0.0)
-    ).filter(Review.recipe_id == r.id).first()
 
-    return render_template(
+    html = render_template(
         "recipes/show.html",
         r=r, needs=needs,
         reviews=reviews,
-        review_count=review_count,
-        avg_rating=round(float(avg_rating), 2)  # 例如 4.35
+        similar=recommend.similar_to(r.id),
+        review_count=r.review_count,
+        avg_rating=round(r.avg_rating, 2)  # 例如 4.35
     )
+    if cacheable:
+        cache.set(f"show:{rid}", [etag, html])
+    return http_cache.with_validators(make_response(html), etag, updated_at)
 # =========================
 # 新增評論
 # =========================
@@ -338,5 +504,15 @@ def add_or_update_review(rid: int):
         db.session.add(new_review)
         flash("已新增您的評論。", "success")
 
-    db.session.commit()
+    # Recipe.review_count / rating_sum 由 models 的 Review 事件在同一個 transaction 內更新
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 同一使用者同時送出兩次：uq_review_recipe_user 擋下重複新增，改為更新既有評論
+        db.session.rollback()
+        existing_review = Review.query.filter_by(recipe_id=rid, user_id=current_user.id).one()
+        existing_review.rating = rating
+        existing_review.comment = comment
+        db.session.commit()
+    _invalidate_recipe(rid)
     return redirect(url_for("recipes.show", rid=rid))
\ No newline at end of file
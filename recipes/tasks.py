@@ -0,0 +1,37 @@
+# recipes/tasks.py
+# 食譜寫入後的背景工作（由 `flask worker` 執行；沒有 worker 時見 jobs.py 的 JOBS_INLINE）
+from sqlalchemy.orm import selectinload
+
+from models import Recipe
+import images
+import jobs
+import recommend
+import search
+
+
+@jobs.handler("search.reindex")
+def reindex_recipe(recipe_id: int):
+    """重建單一食譜的檢索文件；食譜已刪除就略過。"""
+    r = (
+        Recipe.query.options(selectinload(Recipe.search_doc))
+        .filter(Recipe.id == recipe_id)
+        .first()
+    )
+    if r is not None:
+        search.index_recipe(r)
+
+
+@jobs.handler("images.thumbnails")
+def cover_thumbnails(key: str):
+    """產生上傳封面的各寬度縮圖。"""
+    images.generate_thumbnails(key)
+
+
+@jobs.handler("recommend.update", inline=False)  # 要載入整份特徵矩陣，不在請求內執行
+def update_similar(recipe_id: int):
+    """新增食譜或食材有變動後，增量更新相似食譜；食譜已刪除就略過。
+
+    排隊中的其他 recommend.update 一併處理，整批只載入一次特徵矩陣。
+    """
+    ids = {recipe_id, *(payload["recipe_id"] for payload in jobs.take_queued("recommend.update"))}
+    recommend.update_many(sorted(ids), commit=False)
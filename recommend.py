@@ -0,0 +1,305 @@
+# recommend.py
+# 相似食譜：以食材與評分計算食譜之間的相似度，預先把每道食譜的前 k 名存入 recipe_similar
+#
+#   - 食材向量：食譜 × 食材的稀疏矩陣（Need），以 IDF 加權，鹽、油這類到處都有的食材幾乎不影響相似度
+#   - 評分向量：食譜 × 使用者的稀疏矩陣（Review），評分減去該使用者的平均（adjusted cosine），
+#     被同一群人喜歡（或不喜歡）的食譜彼此相似
+#   - 兩者各自做 L2 正規化，乘上 sqrt(權重) 後橫向拼接成 Z；Z·Zᵀ 即為兩種 cosine 相似度的加權和
+#
+# N × N 的相似度矩陣不整份算出：每次取一個區塊的列與 Zᵀ 相乘（區塊列數使結果不超過 RECOMMEND_CHUNK_CELLS 格），
+# 取出各列前 k 名就丟掉，記憶體只與區塊大小有關。
+#
+#   flask recipes rebuild-similar                    # 整份重建，逐區塊提交，重建期間詳細頁仍讀得到舊清單
+#   flask recipes update-similar --missing           # 只補上還沒有清單的食譜（例如大量匯入後）
+#   flask recipes update-similar --queued            # 沒有 worker 時以排程消化佇列中的 recommend.update
+#   jobs.enqueue("recommend.update", recipe_id=12)   # 新增食譜 / 食材有變動後由 worker 增量更新
+#
+# 每次增量更新都要載入整份 Need / Review 建立特徵矩陣，成本與食譜總數成正比；
+# 因此工作延後 RECOMMEND_UPDATE_DELAY_SECONDS 才執行，執行時把排隊中的同類工作一起取出，整批只載入一次。
+#
+# 增量更新沿用當下整體的 IDF 與使用者平均，只改寫受影響的清單：這道食譜自己的，以及新分數擠得進前 k 名的其他食譜；
+# 其他清單的分數要到下次重建才反映資料分佈的變化。
+# 只有計算的行程（CLI、worker）需要 NumPy / SciPy；網站行程只讀 recipe_similar。
+import math
+from datetime import datetime
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from extensions import db
+from loading import load_profile
+from models import Need, Recipe, RecipeSimilar, Review
+
+WRITE_BATCH = 500  # 增量更新時每次改寫幾道食譜的清單
+
+
+def _numpy():
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as exc:
+        raise RuntimeError("計算相似食譜需要 numpy 與 scipy（pip install numpy scipy）") from exc
+    return np, sparse
+
+
+# =========================
+# 讀取：詳細頁
+# =========================
+def similar_to(recipe_id: int) -> list:
+    """依分數由高到低取出相似食譜（含卡片需要的分類），一次查詢。"""
+    return (
+        Recipe.query.options(*load_profile("card"))
+        .join(RecipeSimilar, RecipeSimilar.similar_id == Recipe.id)
+        .filter(RecipeSimilar.recipe_id == recipe_id)
+        .order_by(RecipeSimilar.rank)
+        .all()
+    )
+
+
+def computed_at(recipe_id):
+    """這道食譜清單的計算時間（純量子查詢，可與其他欄位一起查）；沒有清單時為 NULL。"""
+    return (
+        select(RecipeSimilar.computed_at)
+        .where(RecipeSimilar.recipe_id == recipe_id, RecipeSimilar.rank == 0)
+        .scalar_subquery()
+    )
+
+
+def forget(recipe_id: int):
+    """刪除食譜前呼叫：清掉它的清單與指向它的鄰居（SQLite 預設不執行外鍵的 ON DELETE CASCADE）。"""
+    table = RecipeSimilar.__table__
+    db.session.execute(
+        table.delete().where((table.c.recipe_id == recipe_id) | (table.c.similar_id == recipe_id))
+    )
+
+
+# =========================
+# 特徵矩陣
+# =========================
+class Features(NamedTuple):
+    ids: object     # 已排序的 recipe id（numpy 陣列），第 i 列對應 ids[i]
+    matrix: object  # scipy CSR：食材欄 + 使用者欄，每列 L2 正規化後依權重縮放
+
+    def positions(self, recipe_ids):
+        """回傳 (列位置陣列, 對應的 recipe id 陣列)，不存在的 id 略過。"""
+        np, _ = _numpy()
+        wanted = np.unique(np.asarray(list(recipe_ids), dtype=np.int64))
+        pos, valid = _rows_of(self.ids, wanted)
+        return pos[valid], wanted[valid]
+
+
+def _fetch(stmt, width: int):
+    np, _ = _numpy()
+    return np.array(db.session.execute(stmt).all(), dtype=np.int64).reshape(-1, width)
+
+
+def _rows_of(ids, recipe_ids):
+    """recipe_ids 在 ids 中的列位置；讀取期間新增、不在 ids 中的回傳遮罩為 False。"""
+    np, _ = _numpy()
+    pos = np.searchsorted(ids, recipe_ids)
+    valid = pos < len(ids)
+    valid[valid] = ids[pos[valid]] == recipe_ids[valid]
+    return pos, valid
+
+
+def _normalize(matrix):
+    np, sparse = _numpy()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(scale.astype(np.float32)) @ matrix
+
+
+def load_features(ingredient_weight: float) -> Features:
+    np, sparse = _numpy()
+    ids = np.fromiter(db.session.scalars(select(Recipe.id).order_by(Recipe.id)), dtype=np.int64)
+    n = len(ids)
+
+    # 食材：IDF = log((1 + N) / (1 + 含有該食材的食譜數)) + 1
+    need = _fetch(select(Need.recipe_id, Need.ingredient_id), 2)
+    rows, valid = _rows_of(ids, need[:, 0])
+    rows, need = rows[valid], need[valid]
+    _, cols = np.unique(need[:, 1], return_inverse=True)
+    df = np.bincount(cols)
+    idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+    ingredients = sparse.csr_matrix((idf[cols], (rows, cols)), shape=(n, len(df)), dtype=np.float32)
+
+    # 評分：減去每位使用者的平均評分；只評過一次（或評分都一樣）的使用者提供不了共同評分的訊號，整欄為 0
+    review = _fetch(select(Review.recipe_id, Review.user_id, Review.rating), 3)
+    rows, valid = _rows_of(ids, review[:, 0])
+    rows, review = rows[valid], review[valid]
+    _, users = np.unique(review[:, 1], return_inverse=True)
+    counts = np.bincount(users)
+    mean = np.bincount(users, weights=review[:, 2]) / np.maximum(counts, 1)
+    centered = (review[:, 2] - mean[users]).astype(np.float32)
+    ratings = sparse.csr_matrix((centered, (rows, users)), shape=(n, len(counts)), dtype=np.float32)
+    ratings.eliminate_zeros()
+
+    matrix = sparse.hstack([
+        _normalize(ingredients) * math.sqrt(ingredient_weight),
+        _normalize(ratings) * math.sqrt(1 - ingredient_weight),
+    ], format="csr", dtype=np.float32)
+    return Features(ids, matrix)
+
+
+# =========================
+# 相似度與前 k 名
+# =========================
+def _scores(features: Features, rows):
+    """rows 各列與所有食譜的相似度（稠密，len(rows) × N），自己設為 -inf。"""
+    np, _ = _numpy()
+    scores = (features.matrix[rows] @ features.matrix.T).toarray()
+    scores[np.arange(len(rows)), rows] = -np.inf
+    return scores
+
+
+def _top_k(features: Features, scores, k: int, min_score: float) -> list:
+    """每列分數最高的 k 個鄰居（低於 min_score 的不要）：[[(recipe_id, score), ...], ...]。"""
+    np, _ = _numpy()
+    k = min(k, scores.shape[1] - 1)
+    if k <= 0:
+        return [[] for _ in range(len(scores))]
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    return [
+        [(int(features.ids[j]), float(s)) for j, s in zip(cols, values) if s >= min_score]
+        for cols, values in zip(top, top_scores)
+    ]
+
+
+def _write(lists: dict, now: datetime):
+    """整份改寫 {recipe_id: [(similar_id, score), ...]} 的清單；呼叫端負責 commit。"""
+    if not lists:
+        return
+    table = RecipeSimilar.__table__
+    db.session.execute(table.delete().where(table.c.recipe_id.in_(list(lists))))
+    rows = [
+        dict(recipe_id=rid, rank=rank, similar_id=sid, score=score, computed_at=now)
+        for rid, neighbours in lists.items()
+        for rank, (sid, score) in enumerate(neighbours)
+    ]
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def _settings():
+    cfg = current_app.config
+    return (
+        cfg.get("RECOMMEND_TOP_K", 6),
+        cfg.get("RECOMMEND_MIN_SCORE", 0.05),
+        cfg.get("RECOMMEND_INGREDIENT_WEIGHT", 0.7),
+    )
+
+
+def chunk_size(n: int) -> int:
+    """每個區塊幾列，使 rows × N 的相似度矩陣不超過 RECOMMEND_CHUNK_CELLS 格。"""
+    return max(1, current_app.config.get("RECOMMEND_CHUNK_CELLS", 4_000_000) // max(n, 1))
+
+
+def rebuild(log=None) -> int:
+    """重新計算所有食譜的清單；每個區塊一個 transaction。回傳食譜數。"""
+    np, _ = _numpy()
+    k, min_score, weight = _settings()
+    features = load_features(weight)
+    n = len(features.ids)
+    chunk = chunk_size(n)
+    now = datetime.utcnow()
+    for start in range(0, n, chunk):
+        rows = np.arange(start, min(n, start + chunk))
+        lists = _top_k(features, _scores(features, rows), k, min_score)
+        _write({int(features.ids[r]): neighbours for r, neighbours in zip(rows, lists)}, now)
+        db.session.commit()
+        if log:
+            log(f"  {min(n, start + chunk)}/{n}")
+    return n
+
+
+def _fetch_floor(table, k: int):
+    """已滿 k 個的清單：[(recipe_id, 最低分), ...]（numpy 陣列）。"""
+    np, _ = _numpy()
+    result = db.session.execute(
+        select(table.c.recipe_id, func.min(table.c.score))
+        .group_by(table.c.recipe_id)
+        .having(func.count() >= k)
+    ).all()
+    return np.array(result, dtype=np.float64).reshape(-1, 2)
+
+
+def update_recipes(recipe_ids, features: Features = None) -> int:
+    """增量更新：算出這些食譜的清單，並把它們插入新分數擠得進前 k 名的其他食譜清單。
+
+    一次處理的食譜數要讓 len(recipe_ids) × N 的分數矩陣放得進記憶體（見 chunk_size）。
+    呼叫端負責 commit。回傳改寫的清單數。
+    """
+    np, _ = _numpy()
+    k, min_score, weight = _settings()
+    features = features or load_features(weight)
+    rows, ids = features.positions(recipe_ids)
+    if not len(rows):
+        return 0
+    scores = _scores(features, rows)
+    now = datetime.utcnow()
+    own = dict(zip(ids.tolist(), _top_k(features, scores, k, min_score)))
+
+    # 其他食譜目前清單的門檻：未滿 k 個時任何達到 min_score 的分數都能加入，否則要超過目前的最低分
+    table = RecipeSimilar.__table__
+    floor = np.full(len(features.ids), min_score, dtype=np.float32)
+    current = _fetch_floor(table, k)
+    if len(current):
+        pos, valid = _rows_of(features.ids, current[:, 0].astype(np.int64))
+        floor[pos[valid]] = np.maximum(current[valid, 1], min_score)
+
+    # 相似度對稱：其他食譜對這道食譜的分數就是這一列
+    candidates = {}
+    eligible = scores >= floor
+    eligible[:, rows] = False  # 這一批自己的清單上面已經重算
+    for rid, row, mask in zip(ids.tolist(), scores, eligible):
+        for j in np.flatnonzero(mask):
+            candidates.setdefault(int(features.ids[j]), []).append((rid, float(row[j])))
+
+    others = list(candidates)
+    for start in range(0, len(others), WRITE_BATCH):
+        batch = others[start:start + WRITE_BATCH]
+        existing = {}
+        for rid, sid, score in db.session.execute(
+            select(table.c.recipe_id, table.c.similar_id, table.c.score)
+            .where(table.c.recipe_id.in_(batch))
+            .order_by(table.c.recipe_id, table.c.rank)
+        ):
+            existing.setdefault(rid, []).append((sid, score))
+        merged = {}
+        for rid in batch:
+            fresh = dict(candidates[rid])
+            neighbours = [(sid, s) for sid, s in existing.get(rid, ()) if sid not in fresh]
+            merged[rid] = sorted(neighbours + list(fresh.items()), key=lambda p: -p[1])[:k]
+        _write(merged, now)
+
+    _write(own, now)
+    return len(own) + len(others)
+
+
+def update_many(recipe_ids, commit: bool = True) -> int:
+    """一次增量更新多道食譜：特徵矩陣只載入一次，依 chunk_size 分區塊計算。
+
+    commit=True（例如匯入後的 CLI）每個區塊一個 transaction；False 時由呼叫端 commit（背景工作）。
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return 0
+    features = load_features(_settings()[2])
+    chunk = chunk_size(len(features.ids))
+    written = 0
+    for start in range(0, len(recipe_ids), chunk):
+        written += update_recipes(recipe_ids[start:start + chunk], features)
+        if commit:
+            db.session.commit()
+    return written
+
+
+def missing_recipe_ids() -> list:
+    """還沒有清單的食譜（新增後尚未計算，或所有分數都低於門檻）。"""
+    has_list = select(RecipeSimilar.recipe_id).where(RecipeSimilar.recipe_id == Recipe.id).exists()
+    return db.session.scalars(select(Recipe.id).where(~has_list).order_by(Recipe.id)).all()
@@ -1,8 +1,12 @@
 # routes.py
 # CHANGE: 在 dashboard 顯示最近食譜
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify, abort
 from flask_login import login_required, current_user
 from models import Recipe  
+from pagination import keyset_page
+from loading import load_profile
+from cache import cache
+import instrumentation
 
 main_bp = Blueprint("main", __name__)
 
@@ -13,6 +17,25 @@ def index():
 @main_bp.route("/dashboard")
 @login_required
 def dashboard():
-    recipes = Recipe.query.order_by(Recipe.created_at.desc()).limit(8).all()  
-    return render_template("dashboard.html", user=current_user, recipes=recipes)  
+    # 只取自己的食譜，並以游標分頁（每頁 8 筆）
+    page = keyset_page(
+        Recipe.query.options(*load_profile("card")).filter(Recipe.user_id == current_user.id),
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=8,
+    )
+    return render_template(
+        "dashboard.html",
+        user=current_user,
+        recipes=page.items,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+    )
 
+
+# 快取命中統計（本行程）：與 /metrics 相同，限 METRICS_TOKEN 或 ADMIN_USERNAMES
+@main_bp.route("/cache/stats")
+def cache_stats():
+    if not instrumentation.authorized():
+        abort(404)  # 不透露端點存在
+    return jsonify(cache.stats())
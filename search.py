@@ -0,0 +1,118 @@
+# search.py
+# 食譜全文檢索：PostgreSQL 用 tsvector + GIN，SQLite 用 FTS5，其他資料庫退回 ILIKE
+#
+# 中文沒有空白分詞，資料庫內建的斷詞器會把整段中文當成一個詞。
+# 因此在寫入與查詢時都先在 Python 端斷詞：CJK 連續字元切成單字 + 二字詞（bigram），
+# 其餘文字以單字詞小寫化，最後以空白串接交給資料庫索引。
+import re
+
+from sqlalchemy import func, literal_column, table, column, text
+from sqlalchemy.orm import selectinload, with_expression
+
+from extensions import db
+from models import Recipe, RecipeSearch, Need, Ingredient, CookInstruction
+from pagination import Sort, RECENT
+
+_CJK = "㐀-䶿一-鿿豈-﫿぀-ヿ가-힯"
+_TOKEN = re.compile(f"([{_CJK}]+)|([^\\W{_CJK}_]+)")
+
+# PostgreSQL：與 ix_recipe_search_tsv 相同的運算式，查詢才會用到 GIN 索引
+_PG_TSV = literal_column(
+    "(setweight(to_tsvector('simple', recipe_search.name_terms), 'A') || "
+    "setweight(to_tsvector('simple', recipe_search.body_terms), 'B'))"
+)
+_FTS = table("recipe_search_fts", column("rowid"))
+
+
+def tokenize(text_: str, for_query: bool = False) -> list:
+    """CJK 連續字元切成二字詞（索引時另外加上單字），其他文字取小寫單字。
+
+    查詢時單一個中文字只能比對單字；兩字以上只用二字詞，避免比對過寬。
+    """
+    tokens = []
+    for cjk, word in _TOKEN.findall((text_ or "").lower()):
+        if word:
+            tokens.append(word)
+            continue
+        bigrams = [cjk[i:i + 2] for i in range(len(cjk) - 1)]
+        if for_query:
+            tokens.extend(bigrams or [cjk])
+        else:
+            tokens.extend(cjk)
+            tokens.extend(bigrams)
+    return tokens
+
+
+def _terms(*texts) -> str:
+    return " ".join(t for s in texts for t in tokenize(s))
+
+
+def index_recipe(r: Recipe):
+    """重建單一食譜的檢索文件；呼叫端負責 commit（與食譜寫入同一個 transaction）。"""
+    ingredient_names = [
+        name for (name,) in
+        db.session.query(Ingredient.name)
+        .join(Need, Need.ingredient_id == Ingredient.id)
+        .filter(Need.recipe_id == r.id)
+    ]
+    steps = [
+        step for (step,) in
+        db.session.query(CookInstruction.step).filter(CookInstruction.recipe_id == r.id)
+    ]
+    doc = r.search_doc or RecipeSearch(recipe_id=r.id)
+    doc.name_terms = _terms(r.name)
+    doc.body_terms = _terms(r.description, *ingredient_names, *steps)
+    r.search_doc = doc
+
+
+def match(query, q: str):
+    """把關鍵字條件套到 Recipe 查詢上，回傳 (query, score)。
+
+    score 為相關度運算式（越大越相關）；不支援全文檢索的資料庫退回 ILIKE，score 為 None。
+    """
+    tokens = tokenize(q, for_query=True)
+    dialect = db.session.get_bind().dialect.name
+
+    if tokens and dialect == "postgresql":
+        tsq = func.plainto_tsquery(literal_column("'simple'"), " ".join(tokens))
+        query = (
+            query.join(RecipeSearch, RecipeSearch.recipe_id == Recipe.id)
+            .filter(_PG_TSV.op("@@")(tsq))
+        )
+        return query, func.ts_rank(_PG_TSV, tsq)
+
+    if tokens and dialect == "sqlite":
+        # bm25 越小越相關，取負值讓分數一律「越大越前」；名稱欄權重較高
+        match_expr = " ".join(f'"{t}"' for t in tokens)
+        query = (
+            query.join(_FTS, _FTS.c.rowid == Recipe.id)
+            .filter(text("recipe_search_fts MATCH :match").bindparams(match=match_expr))
+        )
+        return query, -func.bm25(literal_column("recipe_search_fts"), 10.0, 1.0)
+
+    like = f"%{q}%"
+    return query.filter(Recipe.name.ilike(like) | Recipe.description.ilike(like)), None
+
+
+def apply(query, q: str):
+    """搜尋並依相關度排序，回傳 (query, sort)；分數放在 Recipe.search_rank。"""
+    query, score = match(query, q)
+    if score is None:
+        return query, RECENT
+    return query.options(with_expression(Recipe.search_rank, score)), relevance_sort(score)
+
+
+def relevance_sort(score) -> Sort:
+    # 依相關度排序（分數越高越前），同分再以 id 排；游標取 search_rank 屬性（或同名欄位）
+    return Sort(columns=(score, Recipe.id), attrs=("search_rank", "id"), parsers=(float, int))
+
+
+def reindex_all(batch_size: int = 500) -> int:
+    """重建全部檢索文件，每批一個 transaction。"""
+    ids = [rid for (rid,) in db.session.query(Recipe.id).order_by(Recipe.id)]
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        for r in Recipe.query.options(selectinload(Recipe.search_doc)).filter(Recipe.id.in_(chunk)):
+            index_recipe(r)
+        db.session.commit()
+    return len(ids)
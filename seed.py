@@ -2,6 +2,8 @@
 from app import create_app
 from extensions import db
 from models import User, Category, Ingredient, Recipe, CookInstruction, Review, Need
+import search
+from recipes import bulk
 
 app = create_app()
 with app.app_context():
@@ -45,8 +47,8 @@ with app.app_context():
 
         # 步驟
         r.steps.extend([
-            CookInstruction(step="打散雞蛋", recipe=r),
-            CookInstruction(step="吐司兩面沾蛋液", recipe=r),
+            CookInstruction(step="打散雞蛋", position=0, recipe=r),
+            CookInstruction(step="吐司兩面沾蛋液", position=1, recipe=r),
         ])
 
         # 用量（Need）
@@ -58,6 +60,11 @@ with app.app_context():
         # 評論
         db.session.add(Review(recipe=r, user=u, rating=5, comment="超好吃！"))
 
+        # 過敏原位元與全文檢索文件
+        db.session.flush()
+        bulk.refresh_allergen_mask(r)
+        search.index_recipe(r)
+
         db.session.commit()
 
     print("Seeding done. Recipe count =", Recipe.query.count())
@@ -0,0 +1,118 @@
+# shopping.py
+# 購物清單：合併多道食譜（可各自乘上份量倍數）的食材，單位換算成標準單位後加總
+#
+# Need.unit 是自由輸入的文字，去除空白、轉小寫後比對換算表：
+# 重量換算成 g、容量換算成 ml；表中沒有的單位（顆、片、少許…）保留原樣，同單位才相加。
+import math
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter, mul
+from typing import NamedTuple
+
+from extensions import db
+from models import Need, Ingredient
+
+# 別名 -> (標準單位, 換算倍數)
+UNIT_TABLE = {
+    # 重量
+    "g": ("g", 1.0), "克": ("g", 1.0), "公克": ("g", 1.0), "gram": ("g", 1.0), "grams": ("g", 1.0),
+    "kg": ("g", 1000.0), "公斤": ("g", 1000.0), "千克": ("g", 1000.0),
+    "mg": ("g", 0.001), "毫克": ("g", 0.001),
+    "斤": ("g", 600.0), "台斤": ("g", 600.0), "兩": ("g", 37.5),
+    "lb": ("g", 453.592), "磅": ("g", 453.592), "oz": ("g", 28.3495), "盎司": ("g", 28.3495),
+    # 容量
+    "ml": ("ml", 1.0), "毫升": ("ml", 1.0), "cc": ("ml", 1.0), "c.c.": ("ml", 1.0),
+    "l": ("ml", 1000.0), "公升": ("ml", 1000.0), "升": ("ml", 1000.0),
+    "杯": ("ml", 240.0), "cup": ("ml", 240.0), "cups": ("ml", 240.0),
+    "大匙": ("ml", 15.0), "湯匙": ("ml", 15.0), "tbsp": ("ml", 15.0),
+    "小匙": ("ml", 5.0), "茶匙": ("ml", 5.0), "tsp": ("ml", 5.0),
+    # 個數（只合併同義的寫法）
+    "個": ("個", 1.0), "pc": ("個", 1.0), "pcs": ("個", 1.0), "piece": ("個", 1.0), "pieces": ("個", 1.0),
+}
+
+# 顯示時數量夠大就換成較大的單位
+_DISPLAY_UP = {"g": ("kg", 1000.0), "ml": ("L", 1000.0)}
+
+MAX_RECIPES = 200
+
+
+class ShoppingItem(NamedTuple):
+    ingredient_id: int
+    name: str
+    quantity: float
+    unit: str
+    recipe_count: int
+
+
+@lru_cache(maxsize=256)
+def normalize_unit(unit: str):
+    """回傳 (標準單位, 換算倍數)；表中沒有的單位原樣保留（倍數 1）。結果依原始字串快取。"""
+    key = (unit or "").strip().lower()
+    return UNIT_TABLE.get(key, (key, 1.0))
+
+
+def _display(quantity: float, unit: str):
+    bigger = _DISPLAY_UP.get(unit)
+    if bigger and quantity >= bigger[1]:
+        return quantity / bigger[1], bigger[0]
+    return quantity, unit
+
+
+def shopping_list(multipliers: dict) -> list:
+    """multipliers：{recipe_id: 份量倍數}。一次查詢載入所有 Need，依食材名稱排序。
+
+    換算以欄為單位進行：每種原始單位只查一次換算表，乘法、排序與分組加總
+    都交給 map / sorted / groupby 在 C 層迭代，不在 Python 迴圈中逐列計算。
+    """
+    if not multipliers:
+        return []
+    rows = db.session.execute(
+        db.select(Need.ingredient_id, Ingredient.name, Need.recipe_id, Need.quantity, Need.unit)
+        .join(Ingredient, Ingredient.id == Need.ingredient_id)
+        .where(Need.recipe_id.in_(list(multipliers)))
+    ).all()
+    if not rows:
+        return []
+    ingredient_ids, names, recipe_ids, quantities, units = zip(*rows)
+
+    # 每種原始單位換算一次
+    distinct = {u: normalize_unit(u) for u in set(units)}
+    canonical = {u: c for u, (c, _) in distinct.items()}
+    factor = {u: f for u, (_, f) in distinct.items()}
+    scale = {rid: float(m) for rid, m in multipliers.items()}
+
+    amounts = map(
+        mul,
+        map(mul, quantities, map(factor.__getitem__, units)),
+        map(scale.__getitem__, recipe_ids),
+    )
+    # 依 (名稱, 標準單位, 食材) 排序後分組加總，結果直接是顯示順序
+    keyed = sorted(zip(zip(names, map(canonical.__getitem__, units), ingredient_ids), amounts))
+
+    items = []
+    for (name, unit, iid), group in groupby(keyed, key=itemgetter(0)):
+        group = list(group)
+        quantity, unit = _display(math.fsum(map(itemgetter(1), group)), unit)
+        # 同一食譜的同一食材只有一列 Need，列數即食譜數
+        items.append(ShoppingItem(iid, name, round(quantity, 2), unit, len(group)))
+    return items
+
+
+def parse_plan(raw: str) -> dict:
+    """解析 `12:2,15:0.5,18`（食譜 id:份量倍數，省略倍數為 1），同一食譜出現多次時倍數相加。
+
+    格式錯誤時丟出 ValueError。
+    """
+    plan = {}
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        rid, _, mult = part.partition(":")
+        rid, mult = int(rid), float(mult) if mult else 1.0
+        if not (math.isfinite(mult) and mult > 0):
+            raise ValueError("multiplier must be a positive number")
+        plan[rid] = plan.get(rid, 0.0) + mult
+    if len(plan) > MAX_RECIPES:
+        raise ValueError(f"at most {MAX_RECIPES} recipes per list")
+    return plan
@@ -0,0 +1,79 @@
+# streaming.py
+# 串流渲染大頁面（Flask stream_template）：表頭與篩選列先送出，其餘邊查詢邊渲染邊送出
+#
+# - 模板中的 {{ stream_flush() }} 是 flush 點（例如篩選列之後、開始查詢食譜之前），已渲染的內容立即送出；
+#   其他時候累積到 STREAM_BUFFER_BYTES 才送出一次，避免每個模板片段都是一次 write
+# - 用戶端接受 gzip 且 STREAM_GZIP=true 時在這裡壓縮，每次送出都以 Z_SYNC_FLUSH 結束，
+#   瀏覽器收到就能解壓顯示；反向代理看到 Content-Encoding 就不會再壓縮或為了壓縮而緩衝整份回應
+# - 狀態碼與標頭在第一個位元組前就已送出，渲染途中出錯無法再改成 500：
+#   記錄例外、rollback，在頁面接上一段錯誤訊息後正常結束回應
+# - 內容要渲染完才知道，串流回應沒有 ETag，也就沒有 304
+import zlib
+
+from flask import current_app, g, request, stream_template, stream_with_context
+from markupsafe import Markup
+
+from extensions import db
+
+_FLUSH = "<!--flush-->"
+ERROR_HTML = '<p class="flash error">頁面載入途中發生錯誤，請重新整理。</p>'
+
+
+def stream_flush():
+    """模板的 flush 點；一般（非串流）渲染時輸出空字串。"""
+    return Markup(_FLUSH if g.get("streaming") else "")
+
+
+def _guarded(chunks):
+    try:
+        yield from chunks
+    except Exception:
+        current_app.logger.exception("串流渲染失敗：%s %s", request.method, request.full_path.rstrip("?"))
+        db.session.rollback()
+        yield ERROR_HTML
+
+
+def _buffered(chunks, size: int):
+    buffer, length = [], 0
+    for chunk in chunks:
+        if chunk == _FLUSH:
+            if buffer:
+                yield "".join(buffer)
+                buffer, length = [], 0
+            continue
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31：gzip 格式
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def render(template_name: str, **context):
+    """以串流方式渲染模板，回傳 Response；內容在 WSGI 伺服器讀取回應時才渲染。"""
+    g.streaming = True
+    chunks = _buffered(
+        _guarded(stream_template(template_name, **context)),
+        current_app.config.get("STREAM_BUFFER_BYTES", 8192),
+    )
+    resp = current_app.response_class(mimetype="text/html")
+    if current_app.config.get("STREAM_GZIP", True) and request.accept_encodings["gzip"]:
+        chunks = _gzipped(chunks)
+        resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    resp.headers["X-Accel-Buffering"] = "no"  # nginx 類的反向代理不要整份緩衝
+    # stream_template 本身已保留請求 context；外層再包一次，讓 _guarded 在模板出錯後仍可記錄與 rollback
+    resp.response = stream_with_context(chunks)
+    return resp
+
+
+def init_app(app):
+    app.add_template_global(stream_flush)